@@ -7,10 +7,14 @@ defaults = {
     # Projection to use when plotting pole figures. 'stereographic' (equal
     # angle), 'lambert' (equal area) or arbitrary projection function
     'pole_projection': 'stereographic',
-    # Frequency of find grains algorithm reporting progress
-    'find_grain_report_freq': 100,
     # How to find grain in a HRDIC map, either 'floodfill' or 'warp'
     'hrdic_grain_finding_method': 'floodfill',
+    # Directory to cache analysis results in, to reuse them when the
+    # same analysis is run on the same data again. None disables caching
+    'cache_dir': None,
+    # Maximum size of the result cache in bytes, least recently used
+    # results are removed when exceeded
+    'cache_max_size': 2**30,
     'slip_system_file': {
         'FCC': 'cubic_fcc',
         'BCC': 'cubic_bcc',
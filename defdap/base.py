@@ -15,6 +15,7 @@
 
 import numpy as np
 import networkx as nx
+from scipy import ndimage
 
 from defdap.quat import Quat
 from defdap import plotting
@@ -22,7 +23,9 @@ from defdap.plotting import Plot, MapPlot, GrainPlot
 
 from skimage.measure import profile_line
 
-from defdap.utils import reportProgress
+from defdap.utils import (reportProgress, LazyAttribute, distanceTransform,
+                          labelStats, labelMap)
+from defdap.cache import cacheResults
 
 
 class Map(object):
@@ -36,15 +39,49 @@ class Map(object):
         List of grains.
     currGrainId : int
         ID of last selected grain.
+    grainPoints : numpy.ndarray
+        Compact storage of the (x, y) coordinates of the points in all
+        grains, sorted by grain then raster order, shape (numPoints, 2).
+    grainOffsets : numpy.ndarray
+        Position of the first point of each grain in `grainPoints`,
+        with a final entry for the total number of points. The points
+        of grain i are `grainPoints[grainOffsets[i]:grainOffsets[i+1]]`.
+    grainBoxes : numpy.ndarray
+        Bounding box of each grain (min x, min y, max x, max y), shape
+        (numGrains, 4).
+    sourceFiles : list of pathlib.Path
+        Files the map was loaded from, used to key cached results. Results
+        are not cached if None.
+    operationHistory : list
+        Operations applied to the map since loading that change the
+        results of later analyses, used to key cached results.
 
     """
+    # attributes derived from other attributes, keyed by name with the
+    # names of the attributes they depend on. Derived attributes are
+    # reset to None when an attribute they depend on is set. Attributes
+    # created with `defdap.utils.lazyAttribute` are added automatically.
+    derivedAttributes = {
+        'grainList': ('grains',),
+        'grainPoints': ('grains',),
+        'grainOffsets': ('grains',),
+        'grainBoxes': ('grains',),
+        'neighbourNetwork': ('grains',),
+        'proxigramArr': ('boundaries',),
+    }
+
     def __init__(self):
         self.xDim = None
         self.yDim = None
 
         self.grainList = None
         self.currGrainId = None  # ID of last selected grain
+        self.grainPoints = None
+        self.grainOffsets = None
+        self.grainBoxes = None
         self.homogPoints = []
+        self.sourceFiles = None
+        self.operationHistory = []
 
         self.proxigramArr = None
         self.neighbourNetwork = None
@@ -52,6 +89,67 @@ class Map(object):
         self.grainPlot = None
         self.profilePlot = None
 
+    def __setattr__(self, name, value):
+        super(Map, self).__setattr__(name, value)
+        self.invalidate(name)
+
+    @classmethod
+    def dependentAttributes(cls):
+        """Attributes directly derived from each attribute of the map
+        class, built from `derivedAttributes` and lazy attributes.
+
+        Returns
+        -------
+        dict
+            Names of the derived attributes keyed by the name of the
+            attribute they depend on.
+
+        """
+        if '_dependentAttributes' not in cls.__dict__:
+            dependencies = dict(cls.derivedAttributes)
+            for klass in cls.__mro__:
+                for name, attr in vars(klass).items():
+                    if isinstance(attr, LazyAttribute):
+                        dependencies.setdefault(name, attr.dependencies)
+
+            dependents = {}
+            for name, names in dependencies.items():
+                for dependency in names:
+                    dependents.setdefault(dependency, []).append(name)
+            cls._dependentAttributes = dependents
+
+        return cls._dependentAttributes
+
+    def invalidate(self, *names):
+        """Reset the attributes derived from the given attributes, and
+        the attributes derived from those in turn. Lazy attributes are
+        recalculated on next access, other derived attributes are set
+        to None and must be recalculated by the method setting them.
+        Called when any attribute of the map is set.
+
+        Parameters
+        ----------
+        names : str
+            Names of the changed attributes.
+
+        """
+        dependents = self.dependentAttributes()
+        toReset = [name for changed in names
+                   for name in dependents.get(changed, ())]
+        reset = set()
+        while toReset:
+            name = toReset.pop()
+            if name in reset:
+                continue
+            reset.add(name)
+
+            attr = getattr(type(self), name, None)
+            if isinstance(attr, LazyAttribute):
+                attr.__delete__(self)
+            elif getattr(self, name, None) is not None:
+                object.__setattr__(self, name, None)
+            toReset.extend(dependents.get(name, ()))
+
     def __len__(self):
         return len(self.grainList)
 
@@ -96,6 +194,60 @@ class Map(object):
                 return False
         return True
 
+    def buildGrainStorage(self, numGrains):
+        """Build compact storage of the points in each grain from the
+        grain label map. Grains with a `storageID` set read their points
+        from this storage.
+
+        Parameters
+        ----------
+        numGrains : int
+            Number of grains, labelled 1 to numGrains in `grains`.
+
+        """
+        grainLabels = self.grains.ravel()
+        pointOrder = np.argsort(grainLabels, kind='stable')
+        grainOffsets = np.searchsorted(grainLabels[pointOrder],
+                                       np.arange(1, numGrains + 2))
+        pointIdx = pointOrder[grainOffsets[0]:grainOffsets[-1]]
+        grainOffsets -= grainOffsets[0]
+
+        yLocs, xLocs = np.unravel_index(pointIdx, self.grains.shape)
+        self.grainPoints = np.stack((xLocs, yLocs), axis=1).astype(np.int32)
+        self.grainOffsets = grainOffsets
+
+        self.grainBoxes = np.empty((numGrains, 4), dtype=np.int32)
+        if numGrains > 0:
+            grainStarts = grainOffsets[:-1]
+            self.grainBoxes[:, :2] = np.minimum.reduceat(
+                self.grainPoints, grainStarts, axis=0
+            )
+            self.grainBoxes[:, 2:] = np.maximum.reduceat(
+                self.grainPoints, grainStarts, axis=0
+            )
+
+    def _restoreGrains(self, grains, grainIDs, grainClass):
+        """Set the grain label map and rebuild the grain list and grain
+        storage from it, for example after loading a saved map.
+
+        Parameters
+        ----------
+        grains : numpy.ndarray
+            Grain label map, grains labelled 1 to number of grains.
+        grainIDs : numpy.ndarray
+            ID of each grain.
+        grainClass : type
+            Class of grain objects to create.
+
+        """
+        self.grains = grains
+        self.buildGrainStorage(len(grainIDs))
+        self.grainList = []
+        for i, grainID in enumerate(grainIDs):
+            currentGrain = grainClass(int(grainID), self)
+            currentGrain.storageID = i
+            self.grainList.append(currentGrain)
+
     def plotGrainNumbers(self, dilateBoundaries=False, ax=None, **kwargs):
         """Plot a map with grains numbered.
 
@@ -408,57 +560,54 @@ class Map(object):
 
     @reportProgress("constructing neighbour network")
     def buildNeighbourNetwork(self):
-        """Construct a list of neighbours
+        """Construct a network of neighbouring grains. Grains are
+        neighbours if they are among the 4 nearest neighbours of the
+        same boundary point.
 
         """
         # create network
         nn = nx.Graph()
         nn.add_nodes_from(self.grainList)
 
-        yLocs, xLocs = np.nonzero(self.boundaries)
-        totalPoints = len(xLocs)
-
-        for iPoint, (x, y) in enumerate(zip(xLocs, yLocs)):
-            # report progress
-            yield iPoint / totalPoints
-
-            if (x == 0 or y == 0 or x == self.grains.shape[1] - 1 or
-                    y == self.grains.shape[0] - 1):
-                # exclude boundary pixels of map
-                continue
-
-            # use 4 nearest neighbour points as potential neighbour grains
-            # (this maybe needs changing considering the position of
-            # boundary pixels relative to the actual edges)
-            # use sets as they do not allow duplicate elements
-            # minus 1 on all as the grain image starts labeling at 1
-            neighbours = {
-                self.grains[y + 1, x] - 1,
-                self.grains[y - 1, x] - 1,
-                self.grains[y, x + 1] - 1,
-                self.grains[y, x - 1] - 1
-            }
-            # neighbours = set(neighbours)
-            # remove boundary points (-2) and points in small
-            # grains (-3) (Normally -1 and -2)
-            neighbours.discard(-2)
-            neighbours.discard(-3)
-
-            neighbours = tuple(neighbours)
-            nunNeig = len(neighbours)
-            if nunNeig <= 1:
-                continue
-            for i in range(nunNeig):
-                for j in range(i + 1, nunNeig):
-                    # Add  to network
-                    grain = self[neighbours[i]]
-                    neiGrain = self[neighbours[j]]
-                    try:
-                        # look up boundary
-                        nn[grain][neiGrain]
-                    except KeyError:
-                        # neighbour relation doesn't exist so add it
-                        nn.add_edge(grain, neiGrain)
+        # exclude boundary pixels of map
+        # (this maybe needs changing considering the position of
+        # boundary pixels relative to the actual edges)
+        boundaries = self.boundaries != 0
+        boundaries[[0, -1], :] = False
+        boundaries[:, [0, -1]] = False
+        yLocs, xLocs = np.nonzero(boundaries)
+
+        # use 4 nearest neighbour points as potential neighbour grains
+        # minus 1 on all as the grain image starts labeling at 1
+        neighbours = np.stack((
+            self.grains[yLocs + 1, xLocs],
+            self.grains[yLocs - 1, xLocs],
+            self.grains[yLocs, xLocs + 1],
+            self.grains[yLocs, xLocs - 1]
+        ), axis=1) - 1
+        yield 0.5
+
+        # every pair of different neighbours of each point, ignoring
+        # boundary points (-2) and points in small grains (-3)
+        # (Normally -1 and -2)
+        grainIDs, neiGrainIDs = [], []
+        for i in range(4):
+            for j in range(i + 1, 4):
+                valid = ((neighbours[:, i] != neighbours[:, j]) &
+                         (neighbours[:, i] >= 0) & (neighbours[:, j] >= 0))
+                grainIDs.append(neighbours[valid, i])
+                neiGrainIDs.append(neighbours[valid, j])
+        grainIDs = np.concatenate(grainIDs)
+        neiGrainIDs = np.concatenate(neiGrainIDs)
+
+        # unique pairs of neighbouring grains
+        pairs = np.unique(
+            np.stack((np.minimum(grainIDs, neiGrainIDs),
+                      np.maximum(grainIDs, neiGrainIDs)), axis=1),
+            axis=0
+        )
+        nn.add_edges_from((self[grainID], self[neiGrainID])
+                          for grainID, neiGrainID in pairs.tolist())
 
         self.neighbourNetwork = nn
 
@@ -526,14 +675,18 @@ class Map(object):
 
         return self.proxigramArr
 
+    @cacheResults('proxigramArr')
     @reportProgress("calculating proxigram")
-    def calcProxigram(self, numTrials=500, forceCalc=True):
-        """Calculate distance from a grain boundary at each point in map.
+    def calcProxigram(self, numTrials=None, forceCalc=True):
+        """Calculate distance from a grain boundary at each point in map,
+        using an exact Euclidean distance transform. Boundary points are
+        placed on the bottom right corner of their pixel.
 
         Parameters
         ----------
         numTrials : int, optional
-            number of trials.
+            Not used, kept for compatibility with the previous
+            implementation which calculated distances in batches.
         forceCalc : bool, optional
             Force calculation even is proxigramArr is populated.
 
@@ -541,89 +694,211 @@ class Map(object):
         if self.proxigramArr is not None and not forceCalc:
             return
 
-        proxBoundaries = np.copy(self.boundaries)
-        proxShape = proxBoundaries.shape
+        proxBoundaries = self.boundaries == -1
 
         # ebsd boundary arrays have extra boundary along right and
         # bottom edge. These need to be removed right edge
-        if np.all(proxBoundaries[:, -1] == -1):
+        if np.all(proxBoundaries[:, -1]):
             proxBoundaries[:, -1] = proxBoundaries[:, -2]
         # bottom edge
-        if np.all(proxBoundaries[-1, :] == -1):
+        if np.all(proxBoundaries[-1, :]):
             proxBoundaries[-1, :] = proxBoundaries[-2, :]
+        yield 0.5
+
+        self.proxigramArr = distanceTransform(proxBoundaries, halfOffset=True)
+
+    def calcGrainProxigram(self, grainID=None):
+        """Calculate distance from the boundary of the grain each point
+        belongs to, the distance to the nearest point of a different
+        grain. Or the signed distance from the boundary of a single
+        grain, positive inside and negative outside the grain.
+
+        Parameters
+        ----------
+        grainID : int, optional
+            ID of grain to calculate the signed distance for. Distances
+            for all grains are calculated if not given.
 
-        # create list of positions of each boundary point
-        indexBoundaries = []
-        for index, value in np.ndenumerate(proxBoundaries):
-            if value == -1:
-                indexBoundaries.append(index)
-        # add 0.5 to boundary coordiantes as they are placed on the
-        # bottom right edge pixels of grains
-        indexBoundaries = np.array(indexBoundaries) + 0.5
-
-        # array of x and y coordinate of each pixel in the map
-        coords = np.zeros((2, proxShape[0], proxShape[1]), dtype=float)
-        coords[0], coords[1] = np.meshgrid(
-            range(proxShape[0]), range(proxShape[1]), indexing='ij'
+        Returns
+        -------
+        numpy.ndarray
+            Distance in pixels at each point in the map. For all grains,
+            NaN at points not in a grain and inf in a grain filling the
+            map.
+
+        """
+        self.checkGrainsDetected()
+
+        if grainID is not None:
+            inGrain = self.grains == grainID + 1
+            return (distanceTransform(~inGrain) -
+                    distanceTransform(inGrain))
+
+        grainDistances = np.full(self.shape, np.nan)
+        for i, (x0, y0, x1, y1) in enumerate(self.grainBoxes):
+            # the nearest point in another grain is within the bounding
+            # box grown by one point
+            x0, y0 = max(x0 - 1, 0), max(y0 - 1, 0)
+            x1, y1 = min(x1 + 2, self.xDim), min(y1 + 2, self.yDim)
+            inGrain = self.grains[y0:y1, x0:x1] == i + 1
+
+            distances = distanceTransform(~inGrain)
+            grainDistances[y0:y1, x0:x1][inGrain] = distances[inGrain]
+
+        return grainDistances
+
+    def findTripleJunctions(self):
+        """Find triple junctions, corners between four points of the map
+        where three or more different grains meet.
+
+        Returns
+        -------
+        numpy.ndarray of bool
+            True at the top left point of each triple junction corner,
+            shape (yDim, xDim).
+
+        """
+        self.checkGrainsDetected()
+
+        corners = np.stack((self.grains[:-1, :-1], self.grains[:-1, 1:],
+                            self.grains[1:, :-1], self.grains[1:, 1:]))
+        corners = np.sort(corners, axis=0)
+        numGrains = (corners[0] > 0).astype(int)
+        numGrains += ((corners[1:] != corners[:-1]) & (corners[1:] > 0)).sum(
+            axis=0
         )
 
-        # array to store trial distance from each boundary point
-        trialDistances = np.full((numTrials + 1, proxShape[0], proxShape[1]),
-                                 1000, dtype=float)
+        junctions = np.zeros(self.shape, dtype=bool)
+        junctions[:-1, :-1] = numGrains >= 3
+
+        return junctions
+
+    def calcTripleJunctionDistance(self):
+        """Calculate distance from the nearest triple junction at each
+        point in the map, see :func:`findTripleJunctions`.
 
-        # loop over each boundary point (p) and calculate distance from
-        # p to all points in the map store minimum once numTrails have
-        # been made and start a new batch of trials
-        numBoundaryPoints = len(indexBoundaries)
-        j = 1
-        for i, indexBoundary in enumerate(indexBoundaries):
-            trialDistances[j] = np.sqrt((coords[0] - indexBoundary[0])**2
-                                        + (coords[1] - indexBoundary[1])**2)
+        Returns
+        -------
+        numpy.ndarray
+            Distance in pixels to the nearest triple junction.
 
-            if j == numTrials:
-                # find current minimum distances and store
-                trialDistances[0] = trialDistances.min(axis=0)
-                j = 0
-                # report progress
-                yield i / numBoundaryPoints
-            j += 1
+        """
+        return distanceTransform(self.findTripleJunctions(), halfOffset=True)
 
-        # find final minimum distances to a boundary
-        self.proxigramArr = trialDistances.min(axis=0)
+    def calcNearestBoundarySegments(self):
+        """Find the grain boundary segment nearest to each point in the
+        map. A segment is the boundary between a pair of grains, made of
+        the points with a neighbour below or to the right in the other
+        grain.
 
-        trialDistances = None
+        Returns
+        -------
+        segmentMap : numpy.ndarray of int
+            Index of the nearest segment to each point in the map, -1 if
+            there are no segments.
+        grainPairs : numpy.ndarray of int
+            IDs of the pair of grains of each segment,
+            shape (numSegments, 2).
 
-    def calcGrainAv(self, mapData, grainIds=-1):
-        """Calculate grain average of any DIC map data.
+        """
+        self.checkGrainsDetected()
+
+        segmentPoints = np.full(self.shape, -1)
+        pairs, locs = [], []
+        for grains, neighbours in (
+            (self.grains[:, :-1], self.grains[:, 1:]),
+            (self.grains[:-1], self.grains[1:]),
+        ):
+            isBoundary = ((grains > 0) & (neighbours > 0) &
+                          (grains != neighbours))
+            yLocs, xLocs = np.nonzero(isBoundary)
+            pairs.append(np.stack((
+                np.minimum(grains, neighbours)[isBoundary],
+                np.maximum(grains, neighbours)[isBoundary]
+            ), axis=1))
+            locs.append((yLocs, xLocs))
+
+        grainPairs, segmentIDs = np.unique(np.concatenate(pairs), axis=0,
+                                           return_inverse=True)
+        segmentIDs = segmentIDs.ravel()
+        yLocs = np.concatenate([loc[0] for loc in locs])
+        xLocs = np.concatenate([loc[1] for loc in locs])
+        # points on two segments are assigned to the last
+        segmentPoints[yLocs, xLocs] = segmentIDs
+
+        _, indices = distanceTransform(segmentPoints >= 0,
+                                       returnIndices=True)
+        segmentMap = np.full(self.shape, -1)
+        if len(grainPairs) > 0:
+            segmentMap = segmentPoints[indices[0], indices[1]]
+
+        return segmentMap, grainPairs.reshape(-1, 2) - 1
+
+    def calcGrainStats(self, mapData, stats=('mean',), weights=None,
+                       percentiles=(), ignoreNan=True, grainIds=-1):
+        """Calculate statistics of map data in each grain, for any
+        number of fields at once, from the grain label map. See
+        :func:`defdap.utils.labelStats`.
 
         Parameters
         ----------
         mapData : numpy.ndarray
-            Array of map data to grain average. This must be cropped!
+            Array of map data, shape (yDim, xDim) or with leading field
+            dimensions. This must be cropped!
+        stats : list of str
+            Statistics to calculate, from 'count', 'sum', 'mean', 'var',
+            'std', 'min', 'max', 'median' and 'percentile'.
+        weights : numpy.ndarray, optional
+            Weight of each point in the map for the sum, mean and
+            variance.
+        percentiles : list of float
+            Percentiles to calculate for the 'percentile' statistic.
+        ignoreNan : bool
+            If True, NaN values are ignored, otherwise statistics of
+            grains containing NaN values are NaN.
         grainIds : list, optional
-            grainIDs to perform operation on, set to -1 for all grains.
+            grainIDs to calculate statistics of, set to -1 for all
+            grains.
 
         Returns
         -------
-        numpy.ndarray
-            Array containing the grain average values.
+        dict
+            Statistics keyed by name, with the value for each grain
+            first.
 
         """
-
         # Check that grains have been detected in the map
         self.checkGrainsDetected()
 
-        if type(grainIds) is int and grainIds == -1:
-            grainIds = range(len(self))
+        grainStats = labelStats(self.grains, mapData, len(self), stats=stats,
+                                weights=weights, percentiles=percentiles,
+                                ignoreNan=ignoreNan)
 
-        grainAvData = np.zeros(len(grainIds))
+        if not (type(grainIds) is int and grainIds == -1):
+            grainIds = np.asarray(grainIds, dtype=int)
+            grainStats = {stat: values[grainIds]
+                          for stat, values in grainStats.items()}
 
-        for i, grainId in enumerate(grainIds):
-            grain = self[grainId]
-            grainData = grain.grainData(mapData)
-            grainAvData[i] = grainData.mean()
+        return grainStats
 
-        return grainAvData
+    def calcGrainAv(self, mapData, grainIds=-1):
+        """Calculate grain average of any DIC map data.
+
+        Parameters
+        ----------
+        mapData : numpy.ndarray
+            Array of map data to grain average. This must be cropped!
+        grainIds : list, optional
+            grainIDs to perform operation on, set to -1 for all grains.
+
+        Returns
+        -------
+        numpy.ndarray
+            Array containing the grain average values.
+
+        """
+        return self.calcGrainStats(mapData, ignoreNan=False,
+                                   grainIds=grainIds)['mean']
 
     def grainDataToMapData(self, grainData, grainIds=-1, bg=0):
         """Create a map array with each grain filled with the given
@@ -658,20 +933,123 @@ class Map(object):
         if grainData.shape[0] != len(grainIds):
             raise ValueError("The length of supplied grain data does not"
                              "match the number of grains.")
-        if len(grainData.shape) == 1:
-            mapShape = [self.yDim, self.xDim]
-        elif len(grainData.shape) == 2 and grainData.shape[1] == 3:
-            mapShape = [self.yDim, self.xDim, 3]
-        else:
+        if not (len(grainData.shape) == 1 or
+                (len(grainData.shape) == 2 and grainData.shape[1] == 3)):
             raise ValueError("The grain data supplied must be either a"
                              "single value or RGB values per grain.")
 
-        grainMap = np.full(mapShape, bg, dtype=grainData.dtype)
-        for grainId, grainValue in zip(grainIds, grainData):
-            for coord in self[grainId].coordList:
-                grainMap[coord[1], coord[0]] = grainValue
+        # value of every grain, grains not given are background
+        allGrainData = np.full((len(self),) + grainData.shape[1:], bg,
+                               dtype=grainData.dtype)
+        allGrainData[np.asarray(grainIds, dtype=int)] = grainData
+
+        return labelMap(self.grains, allGrainData, bg=bg)
+
+    def grainMapDataList(self, mapData, grainIds=-1, bg=np.nan):
+        """Extract the grain maps of many grains from the given map data
+        at once, see :func:`defdap.base.Grain.grainMapData`. The maps
+        are views of a single array.
+
+        Parameters
+        ----------
+        mapData : numpy.ndarray
+            Array of map data. This must be cropped!
+        grainIds : list of int or int, optional
+            IDs of grains to extract. Use -1 for all grains in the map.
+        bg : various, optional
+            Value to fill the background with. Must be same dtype as
+            input array.
+
+        Returns
+        -------
+        list of numpy.ndarray
+            Map of each grain, covering its bounding box.
+
+        """
+        # Check that grains have been detected in the map
+        self.checkGrainsDetected()
+
+        if type(grainIds) is int and grainIds == -1:
+            grainIds = range(len(self))
+        grains = [self[grainId] for grainId in grainIds]
+        if any(grain.storageID is None for grain in grains):
+            return [grain.grainMapData(mapData, bg=bg) for grain in grains]
+
+        storageIDs = np.array([grain.storageID for grain in grains],
+                              dtype=int)
+        boxes = self.grainBoxes[storageIDs].astype(int)
+        widths = boxes[:, 2] - boxes[:, 0] + 1
+        heights = boxes[:, 3] - boxes[:, 1] + 1
+        boxStarts = np.concatenate(([0], np.cumsum(widths * heights)))
+
+        # points of all the grains and the grain each belongs to
+        pointStarts = self.grainOffsets[storageIDs]
+        numPoints = self.grainOffsets[storageIDs + 1] - pointStarts
+        pointGrain = np.repeat(np.arange(len(grains)), numPoints)
+        pointIdx = (np.arange(numPoints.sum()) +
+                    np.repeat(pointStarts - np.cumsum(numPoints) + numPoints,
+                              numPoints))
+        xLocs, yLocs = self.grainPoints[pointIdx].T
+
+        mapData = np.asarray(mapData)
+        grainMaps = np.full(boxStarts[-1], bg, dtype=mapData.dtype)
+        grainMaps[boxStarts[pointGrain] +
+                  (yLocs - boxes[pointGrain, 1]) * widths[pointGrain] +
+                  xLocs - boxes[pointGrain, 0]] = mapData[yLocs, xLocs]
+
+        return [grainMaps[start:end].reshape(height, width)
+                for start, end, height, width
+                in zip(boxStarts[:-1], boxStarts[1:], heights, widths)]
+
+    def grainMapDataCoarse(self, mapData, kernelSize=2, bg=np.nan):
+        """Create a coarsened data map of all grains from the given map
+        data. Data is coarsened using a kernel at each point in a grain,
+        averaging only the data in the same grain, as
+        :func:`defdap.base.Grain.grainMapDataCoarse`. The kernel is
+        summed by offsetting the map by each kernel position.
+
+        Parameters
+        ----------
+        mapData : numpy.ndarray
+            Array of map data. This must be cropped!
+        kernelSize : int, optional
+            Size of kernel as the number of pixels to dilate by i.e 1
+            gives a 3x3 kernel.
+        bg : various, optional
+            Value to fill the background with.
+
+        Returns
+        -------
+        numpy.ndarray
+            Map of coarsened data of all grains.
+
+        """
+        # Check that grains have been detected in the map
+        self.checkGrainsDetected()
+
+        mapData = np.asarray(mapData, dtype=float)
+        inGrain = (self.grains > 0) & ~np.isnan(mapData)
+        data = np.where(inGrain, mapData, 0.)
+        yDim, xDim = self.grains.shape
+
+        total = np.zeros(self.grains.shape)
+        numPoints = np.zeros(self.grains.shape)
+        for dy in range(-kernelSize, kernelSize + 1):
+            for dx in range(-kernelSize, kernelSize + 1):
+                # points and their neighbours offset by (dy, dx)
+                points = (slice(max(-dy, 0), yDim - max(dy, 0)),
+                          slice(max(-dx, 0), xDim - max(dx, 0)))
+                neighbours = (slice(max(dy, 0), yDim + min(dy, 0)),
+                              slice(max(dx, 0), xDim + min(dx, 0)))
+                sameGrain = (inGrain[neighbours] &
+                             (self.grains[neighbours] == self.grains[points]))
+                total[points] += np.where(sameGrain, data[neighbours], 0.)
+                numPoints[points] += sameGrain
+
+        grainMapDataCoarse = np.full(self.grains.shape, bg, dtype=float)
+        grainMapDataCoarse[inGrain] = total[inGrain] / numPoints[inGrain]
 
-        return grainMap
+        return grainMapDataCoarse
 
     def plotGrainDataMap(
         self, mapData=None, grainData=None, grainIds=-1, bg=0, **kwargs
@@ -785,8 +1163,12 @@ class Grain(object):
 
     ownerMap : defdap.base.Map
 
-    coordList : list of tuples
-
+    coordList : list of tuples or numpy.ndarray
+        Coordinates (x, y) of points in the grain. A view of the owner
+        map grain storage if `storageID` is set.
+    storageID : int
+        Index of this grain in the compact grain storage of the owner
+        map, or None if the points are stored in this grain.
 
     """
     def __init__(self, grainID, ownerMap):
@@ -794,10 +1176,63 @@ class Grain(object):
         # cropped image if crop exists.
         self.grainID = grainID
         self.ownerMap = ownerMap
+        self.storageID = None
         self.coordList = []
 
     def __len__(self):
-        return len(self.coordList)
+        if self.storageID is not None:
+            offsets = self.ownerMap.grainOffsets
+            return int(offsets[self.storageID + 1] - offsets[self.storageID])
+        return len(self._coordList)
+
+    @property
+    def coordList(self):
+        if self.storageID is None:
+            # the list may be changed in place by the caller
+            self._coordArray = None
+            return self._coordList
+        offsets = self.ownerMap.grainOffsets
+        return self.ownerMap.grainPoints[
+            offsets[self.storageID]:offsets[self.storageID + 1]
+        ]
+
+    @coordList.setter
+    def coordList(self, value):
+        # points are now stored in this grain
+        self.storageID = None
+        self._coordList = value
+        self._coordArray = None
+
+    @property
+    def coordArray(self):
+        """Coordinates (x, y) of points in the grain as an array of
+        shape (numPoints, 2).
+
+        Returns
+        -------
+        numpy.ndarray
+
+        """
+        if self.storageID is None:
+            # converted once, and again after the points are changed
+            if self._coordArray is None:
+                self._coordArray = np.array(
+                    self._coordList, dtype=int
+                ).reshape(-1, 2)
+            return self._coordArray
+        return self.coordList
+
+    def addPoint(self, coord):
+        """Append a coordinate to a grain storing its own points.
+
+        Parameters
+        ----------
+        coord : tuple
+            (x, y) coordinate to append.
+
+        """
+        self._coordList.append(coord)
+        self._coordArray = None
 
     def __str__(self):
         return f"Grain(ID={self.grainID})"
@@ -812,12 +1247,16 @@ class Grain(object):
             minimum x, minimum y, maximum x, maximum y.
 
         """
-        coords = np.array(self.coordList, dtype=int)
+        if self.storageID is not None:
+            x0, y0, xmax, ymax = self.ownerMap.grainBoxes[self.storageID]
+            return int(x0), int(y0), int(xmax), int(ymax)
+
+        coords = self.coordArray
 
         x0, y0 = coords.min(axis=0)
         xmax, ymax = coords.max(axis=0)
 
-        return x0, y0, xmax, ymax
+        return int(x0), int(y0), int(xmax), int(ymax)
 
     def centreCoords(self, centreType="box", grainCoords=True):
         """
@@ -844,7 +1283,7 @@ class Grain(object):
             xCentre = round((xmax + x0) / 2)
             yCentre = round((ymax + y0) / 2)
         elif centreType == "com":
-            xCentre, yCentre = np.array(self.coordList).mean(axis=0).round()
+            xCentre, yCentre = self.coordArray.mean(axis=0).round()
         else:
             raise ValueError("centreType must be box or com")
 
@@ -871,12 +1310,12 @@ class Grain(object):
 
         """
         x0, y0, xmax, ymax = self.extremeCoords
+        coords = self.coordArray
 
         # initialise array with nans so area not in grain displays white
-        outline = np.full((ymax - y0 + 1, xmax - x0 + 1), bg, dtype=int)
-
-        for coord in self.coordList:
-            outline[coord[1] - y0, coord[0] - x0] = fg
+        outline = np.full((ymax - y0 + 1, xmax - x0 + 1), bg,
+                          dtype=np.result_type(bg, fg))
+        outline[coords[:, 1] - y0, coords[:, 0] - x0] = fg
 
         return outline
 
@@ -919,12 +1358,9 @@ class Grain(object):
             Array containing this grains values from the given map data.
 
         """
-        grainData = np.zeros(len(self), dtype=mapData.dtype)
-
-        for i, coord in enumerate(self.coordList):
-            grainData[i] = mapData[coord[1], coord[0]]
+        coords = self.coordArray
 
-        return grainData
+        return mapData[coords[:, 1], coords[:, 0]]
 
     def grainMapData(self, mapData=None, grainData=None, bg=np.nan):
         """Extract a single grain map from the given map data.
@@ -953,13 +1389,13 @@ class Grain(object):
                                  "be supplied.")
             else:
                 grainData = self.grainData(mapData)
+        grainData = np.asarray(grainData)
         x0, y0, xmax, ymax = self.extremeCoords
+        coords = self.coordArray
 
         grainMapData = np.full((ymax - y0 + 1, xmax - x0 + 1), bg,
-                               dtype=type(grainData[0]))
-
-        for coord, data in zip(self.coordList, grainData):
-            grainMapData[coord[1] - y0, coord[0] - x0] = data
+                               dtype=grainData.dtype)
+        grainMapData[coords[:, 1] - y0, coords[:, 0] - x0] = grainData
 
         return grainMapData
 
@@ -968,7 +1404,9 @@ class Grain(object):
         """
         Create a coarsed data map of this grain only from the given map
         data. Data is coarsened using a kernel at each pixel in the
-        grain using only data in this grain.
+        grain using only data in this grain. See
+        :func:`defdap.base.Map.grainMapDataCoarse` to coarsen all grains
+        at once.
 
         Parameters
         ----------
@@ -992,42 +1430,18 @@ class Grain(object):
 
         """
         grainMapData = self.grainMapData(mapData=mapData, grainData=grainData)
-        grainMapDataCoarse = np.full_like(grainMapData, np.nan)
-
-        for i, j in np.ndindex(grainMapData.shape):
-            if np.isnan(grainMapData[i, j]):
-                grainMapDataCoarse[i, j] = bg
-            else:
-                coarseValue = 0
-
-                if i - kernelSize >= 0:
-                    yLow = i - kernelSize
-                else:
-                    yLow = 0
-                if i + kernelSize + 1 <= grainMapData.shape[0]:
-                    yHigh = i + kernelSize + 1
-                else:
-                    yHigh = grainMapData.shape[0]
-                if j - kernelSize >= 0:
-                    xLow = j - kernelSize
-                else:
-                    xLow = 0
-                if j + kernelSize + 1 <= grainMapData.shape[1]:
-                    xHigh = j + kernelSize + 1
-                else:
-                    xHigh = grainMapData.shape[1]
-
-                numPoints = 0
-                for k in range(yLow, yHigh):
-                    for l in range(xLow, xHigh):
-                        if not np.isnan(grainMapData[k, l]):
-                            coarseValue += grainMapData[k, l]
-                            numPoints += 1
-
-                if numPoints > 0:
-                    grainMapDataCoarse[i, j] = coarseValue / numPoints
-                else:
-                    grainMapDataCoarse[i, j] = np.nan
+        inGrain = ~np.isnan(grainMapData)
+
+        # normalised convolution, the box filtered data divided by the
+        # box filtered mask of points with data
+        kernelWidth = 2 * kernelSize + 1
+        total = ndimage.uniform_filter(np.where(inGrain, grainMapData, 0.),
+                                       size=kernelWidth, mode='constant')
+        numPoints = ndimage.uniform_filter(inGrain.astype(float),
+                                           size=kernelWidth, mode='constant')
+
+        grainMapDataCoarse = np.full_like(grainMapData, bg)
+        grainMapDataCoarse[inGrain] = total[inGrain] / numPoints[inGrain]
 
         return grainMapDataCoarse
 
@@ -0,0 +1,296 @@
+# Copyright 2021 Mechanics of Microstructures Group
+#    at The University of Manchester
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pathlib
+import tempfile
+import zipfile
+
+import numpy as np
+
+from defdap import defaults
+from defdap._version import __version__
+
+# hashes of source files, keyed by (path, size, modification time)
+_fileHashes = {}
+
+# number of results loaded from the cache, keyed by method name
+cacheHits = collections.Counter()
+
+
+class ResultCache(object):
+    """On-disk cache of analysis results. Each entry is an .npz file of
+    arrays named by a key. Entries are written to a temporary file and
+    moved into place, so multiple processes can share a cache directory
+    without reading partly written entries. When the total size of the
+    entries exceeds `maxSize`, the least recently used are removed.
+
+    Parameters
+    ----------
+    cacheDir : str or pathlib.Path
+        Directory to store cache entries in, created if it does not
+        exist.
+    maxSize : int
+        Maximum total size of the cache entries in bytes.
+
+    """
+    def __init__(self, cacheDir, maxSize):
+        self.cacheDir = pathlib.Path(cacheDir)
+        self.maxSize = maxSize
+        self.cacheDir.mkdir(parents=True, exist_ok=True)
+
+    def entryPath(self, key):
+        return self.cacheDir / f"{key}.npz"
+
+    def load(self, key):
+        """Load an entry from the cache.
+
+        Parameters
+        ----------
+        key : str
+            Key of the entry.
+
+        Returns
+        -------
+        dict or None
+            Arrays of the entry keyed by name, or None if there is no
+            entry for the key.
+
+        """
+        path = self.entryPath(key)
+        try:
+            with np.load(str(path), allow_pickle=False) as entry:
+                data = {name: entry[name] for name in entry.files}
+            # mark as recently used
+            os.utime(str(path))
+        except (OSError, ValueError, zipfile.BadZipFile):
+            # missing, removed by another process or unreadable
+            return None
+
+        return data
+
+    def store(self, key, data):
+        """Add an entry to the cache, then remove the least recently
+        used entries if the cache is larger than its maximum size.
+
+        Parameters
+        ----------
+        key : str
+            Key of the entry.
+        data : dict
+            Arrays to store keyed by name.
+
+        """
+        fd, tmpPath = tempfile.mkstemp(suffix='.tmp', dir=str(self.cacheDir))
+        try:
+            with os.fdopen(fd, 'wb') as tmpFile:
+                np.savez(tmpFile, **data)
+            os.replace(tmpPath, str(self.entryPath(key)))
+        except BaseException:
+            os.remove(tmpPath)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the total size of
+        the cache is within its maximum size.
+
+        """
+        entries = []
+        for path in self.cacheDir.glob("*.npz"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        totalSize = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if totalSize <= self.maxSize:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            totalSize -= size
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        for path in self.cacheDir.glob("*.npz"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def getCache():
+    """Result cache set by the 'cache_dir' and 'cache_max_size'
+    defaults.
+
+    Returns
+    -------
+    defdap.cache.ResultCache or None
+        The cache, or None if caching is disabled.
+
+    """
+    if defaults['cache_dir'] is None:
+        return None
+    return ResultCache(defaults['cache_dir'], defaults['cache_max_size'])
+
+
+def hashFiles(filePaths):
+    """Hash of the contents of files. Hashes are remembered for each
+    file until its size or modification time changes.
+
+    Parameters
+    ----------
+    filePaths : list of str or pathlib.Path
+        Files to hash.
+
+    Returns
+    -------
+    str
+        Hex digest of the file contents.
+
+    """
+    fileHash = hashlib.sha256()
+    for filePath in filePaths:
+        filePath = pathlib.Path(filePath).resolve()
+        stat = filePath.stat()
+        statKey = (str(filePath), stat.st_size, stat.st_mtime_ns)
+        if statKey not in _fileHashes:
+            contentHash = hashlib.sha256()
+            with open(str(filePath), 'rb') as f:
+                for block in iter(functools.partial(f.read, 2**20), b''):
+                    contentHash.update(block)
+            _fileHashes[statKey] = contentHash.hexdigest()
+        fileHash.update(_fileHashes[statKey].encode())
+
+    return fileHash.hexdigest()
+
+
+def _keyPart(value):
+    """Convert a value to a JSON serialisable form for a cache key."""
+    if isinstance(value, np.ndarray):
+        return ['ndarray', str(value.dtype), list(value.shape),
+                hashlib.sha256(np.ascontiguousarray(value)).hexdigest()]
+    if isinstance(value, (list, tuple)):
+        return [_keyPart(val) for val in value]
+    if isinstance(value, dict):
+        return {str(key): _keyPart(val) for key, val in value.items()}
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    # objects without a stable representation never match
+    return repr(value)
+
+
+def cacheKey(*parts):
+    """Key for a cache entry from the defdap version and any JSON
+    serialisable parts, numpy arrays are hashed.
+
+    Returns
+    -------
+    str
+        Hex digest key.
+
+    """
+    keyData = json.dumps(_keyPart([__version__] + list(parts)),
+                         sort_keys=True)
+    return hashlib.sha256(keyData.encode()).hexdigest()
+
+
+def cacheResults(*attrs, restore=None, keyArrays=None, record=False):
+    """Decorator caching the results of a map method on disk, keyed on
+    the files the map was loaded from, the operations applied to the map
+    since, the method name and its arguments. Results are the map
+    attributes in `attrs`, which must be numpy arrays or None. Caching
+    is disabled unless the 'cache_dir' default is set, and for maps not
+    loaded from files (`sourceFiles` None). Place above
+    :func:`defdap.utils.reportProgress`, so a cache hit skips the method.
+    Cache hits are counted in `cacheHits`.
+
+    Parameters
+    ----------
+    attrs : str
+        Map attributes set by the method to cache.
+    restore : str, optional
+        Name of a map method to call after the attributes are restored
+        from the cache, to build any dependent state.
+    keyArrays : str, optional
+        Name of a map method returning an array of other state the
+        method depends on, added to the cache key.
+    record : bool
+        If True, the call is added to the map operation history, for
+        methods changing state that other methods depend on. Methods
+        with no `attrs` only record the call.
+
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if getattr(self, 'sourceFiles', None) is None:
+                return func(self, *args, **kwargs)
+
+            boundArgs = signature.bind(self, *args, **kwargs)
+            boundArgs.apply_defaults()
+            params = dict(list(boundArgs.arguments.items())[1:])
+            operation = [func.__name__, params]
+
+            cache = getCache() if attrs else None
+            if cache is None:
+                result = func(self, *args, **kwargs)
+            else:
+                key = cacheKey(
+                    hashFiles(self.sourceFiles), self.operationHistory,
+                    operation,
+                    None if keyArrays is None else getattr(self, keyArrays)()
+                )
+                data = cache.load(key)
+                if data is not None and set(data) == set(attrs) | {'isNone'}:
+                    isNone = data.pop('isNone')
+                    for (attr, value), none in zip(sorted(data.items()),
+                                                   isNone):
+                        setattr(self, attr, None if none else value)
+                    if restore is not None:
+                        getattr(self, restore)()
+                    cacheHits[func.__name__] += 1
+                    result = None
+                else:
+                    result = func(self, *args, **kwargs)
+                    values = {attr: getattr(self, attr) for attr in attrs}
+                    data = {attr: np.zeros(0) if value is None else value
+                            for attr, value in values.items()}
+                    data['isNone'] = np.array([values[attr] is None
+                                               for attr in sorted(values)])
+                    cache.store(key, data)
+
+            if record:
+                self.operationHistory.append(operation)
+
+            return result
+
+        return wrapper
+
+    return decorator
@@ -18,7 +18,7 @@ import numpy as np
 from numpy.linalg import norm
 
 from defdap import defaults
-from defdap.quat import Quat
+from defdap.quat import Quat, QuatArray
 
 
 class Phase(object):
@@ -82,6 +82,39 @@ class Phase(object):
             return self.latticeParams[2] / self.latticeParams[0]
         return None
 
+    @property
+    def burgersVector(self):
+        """Magnitude of the Burgers vector of the primary slip systems
+        in metres, calculated from the lattice parameters (in angstrom).
+        a/sqrt(2) is used for FCC, a*sqrt(3)/2 for BCC and a otherwise.
+
+        Returns
+        -------
+        float
+
+        """
+        a = self.latticeParams[0] * 1e-10
+        if self.crystalStructure is crystalStructures['cubic']:
+            if self.spaceGroup == 225:
+                return a / np.sqrt(2)
+            if self.spaceGroup == 229:
+                return a * np.sqrt(3) / 2
+        return a
+
+    @property
+    def schmidTensors(self):
+        """Schmid tensors of the slip systems of the phase, in the order
+        of the grouped slip systems flattened.
+
+        Returns
+        -------
+        numpy.ndarray, shape (numSlipSystems, 3, 3)
+
+        """
+        if self.slipSystems is None:
+            return np.empty((0, 3, 3))
+        return SlipSystem.stackSchmidTensors(self.slipSystems)
+
     def printSlipSystems(self):
         """Print a list of slip planes (with colours) and slip directions.
 
@@ -380,6 +413,18 @@ class SlipSystem(object):
         """
         return '[' + ''.join(map(strIdx, self.dirIdc)) + ']'
 
+    @property
+    def schmidTensor(self):
+        """Schmid tensor of the slip system in crystal coordinates, the
+        outer product of the slip direction and slip plane normal.
+
+        Returns
+        -------
+        numpy.ndarray, shape (3, 3)
+
+        """
+        return np.outer(self.slipDir, self.slipPlane)
+
     def generateFamily(self):
         """Generate the family of slip systems which this system belongs to.
 
@@ -556,6 +601,74 @@ class SlipSystem(object):
 
         return groupedSlipSystems
 
+    @staticmethod
+    def stackSchmidTensors(slipSystems):
+        """Stack the Schmid tensors of many slip systems into a single
+        array. Grouped slip systems are flattened in order.
+
+        Parameters
+        ----------
+        slipSystems : list of SlipSystem or list of list of SlipSystem
+            Slip systems, optionally grouped.
+
+        Returns
+        -------
+        numpy.ndarray, shape (numSlipSystems, 3, 3)
+
+        """
+        schmidTensors = []
+        for ss in slipSystems:
+            if isinstance(ss, SlipSystem):
+                schmidTensors.append(ss.schmidTensor)
+            else:
+                schmidTensors.extend(ssGroup.schmidTensor for ssGroup in ss)
+
+        return np.array(schmidTensors).reshape(-1, 3, 3)
+
+    @staticmethod
+    def calcResolvedShearStress(quats, stress, schmidTensors):
+        """Resolve a stress applied in sample coordinates onto slip
+        systems of crystals with the given orientations. For a unit
+        uniaxial stress the magnitude is the Schmid factor.
+
+        Parameters
+        ----------
+        quats : defdap.quat.QuatArray or numpy.ndarray
+            Orientations, as a QuatArray or an array of quaternion
+            components of shape (..., 4).
+        stress : numpy.ndarray
+            Stress tensor in sample coordinates, shape (3, 3), or a load
+            vector, shape (3,), for unit uniaxial stress along it.
+        schmidTensors : numpy.ndarray
+            Schmid tensors of the slip systems, shape
+            (numSlipSystems, 3, 3), see :func:`stackSchmidTensors`.
+
+        Returns
+        -------
+        numpy.ndarray
+            Resolved shear stress on each slip system, shape
+            (..., numSlipSystems).
+
+        """
+        if isinstance(quats, QuatArray):
+            quatComps = quats.quatCoef
+        else:
+            quatComps = np.moveaxis(np.asarray(quats, dtype=float), -1, 0)
+        rotMatrix = QuatArray(quatComps, allow_southern=True,
+                              copy=False).rotMatrix()
+
+        stress = np.asarray(stress, dtype=float)
+        if stress.shape == (3,):
+            loadVector = stress / norm(stress)
+            stress = np.outer(loadVector, loadVector)
+        elif stress.shape != (3, 3):
+            raise ValueError("stress must be a 3x3 tensor or a load vector.")
+
+        # stress in crystal coordinates (R.stress.R^T) contracted with
+        # each Schmid tensor
+        return np.einsum('ij...,jk,lk...,sil->...s', rotMatrix, stress,
+                         rotMatrix, schmidTensors, optimize=True)
+
     @staticmethod
     def printSlipSystemDirectory():
         """
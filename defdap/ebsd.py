@@ -22,13 +22,15 @@ from warnings import warn
 
 from defdap.file_readers import EBSDDataLoader
 from defdap.file_writers import EBSDDataWriter
-from defdap.quat import Quat
+from defdap.quat import Quat, QuatArray
 from defdap.crystal import SlipSystem
 from defdap import base
 
 from defdap import defaults
 from defdap.plotting import MapPlot
-from defdap.utils import reportProgress
+from defdap.cache import cacheResults
+from defdap.utils import (reportProgress, tileSlices, labelConnected,
+                          removeSmallLabels)
 
 
 class Map(base.Map):
@@ -48,7 +50,14 @@ class Map(base.Map):
         Euler angles for eaxh point of the map. Shape (3, yDim, xDim).
     bandContrastArray : numpy.ndarray
         Band contrast for each point of map. Shape (yDim, xDim).
-    quatArray : numpy.ndarray of defdap.quat.Quat
+    bandSlopeArray : numpy.ndarray
+        Band slope for each point of map. Shape (yDim, xDim).
+    meanAngularDeviationArray : numpy.ndarray
+        Mean angular deviation for each point of map. Shape (yDim, xDim).
+    numBandsArray : numpy.ndarray
+        Number of detected bands for each point of map, if given in the
+        data file. Shape (yDim, xDim).
+    quatArray : defdap.quat.QuatArray
         Quaterions for each point of map. Shape (yDim, xDim).
     phaseArray : numpy.ndarray
         Map of phase ids. 1-based, 0 is non-indexed points
@@ -63,11 +72,31 @@ class Map(base.Map):
         grainID starts at 0. Regions that are smaller than the minimum
         grain size are given value -2. Remnant boundary points are -1.
     misOri : numpy.ndarray
-        Map of misorientation.
-    misOriAxis : list of numpy.ndarray
-        Map of misorientation axis components.
+        Map of misorientation to the grain reference orientation, as
+        cos(angle/2). 1 outside of grains.
+    misOriAxis : numpy.ndarray
+        Map of misorientation axis components to the grain reference
+        orientation, as a rotation vector in radians, shape (3, y, x).
+    GOS : numpy.ndarray
+        Grain orientation spread of each grain in degrees, the mean
+        misorientation to the grain reference orientation.
+    grainSchmidFactors : numpy.ndarray
+        Schmid factor of each slip system of each grain, based on the
+        grain average orientation, shape (numGrains, numSlipSystems).
+    grainSchmidFactorSlipSystems : list
+        Slip systems used to calculate `grainSchmidFactors` for each
+        phase.
     kam : numpy.ndarray
-        Map of KAM.
+        Map of KAM in degrees.
+    tileSize : int
+        Number of map rows processed at a time by neighbourhood
+        operations (boundaries, KAM, Nye tensor, filtering and grain
+        finding), to bound peak memory use on large maps. All rows at
+        once if None.
+    neighbourMisOriCache : dict
+        Neighbour misorientation and symmetry index maps calculated by
+        :func:`calcNeighbourMisOri`, keyed by neighbour offset. Cleared
+        when a new `quatArray` is set.
     origin : tuple(int)
         Map origin (x, y). Used by linker class where origin is a
         homologue point of the maps.
@@ -77,7 +106,37 @@ class Map(base.Map):
         3x3 Nye tensor at each point.
 
     """
-    def __init__(self, fileName, dataType=None):
+    # derived map arrays saved in the DefDAP format, boundaries are
+    # restored before the grains and grain data after
+    defdapBoundaryAttrs = ('boundariesX', 'boundariesY', 'phaseBoundariesX',
+                           'phaseBoundariesY')
+    defdapGrainDataAttrs = ('misOri', 'misOriAxis', 'GOS')
+    defdapPointDataAttrs = ('kam', 'GND', 'Nye')
+    defdapDerivedAttrs = (defdapBoundaryAttrs + defdapGrainDataAttrs +
+                          defdapPointDataAttrs)
+
+    derivedAttributes = dict(base.Map.derivedAttributes, **{
+        'quatArray': ('eulerAngleArray',),
+        'boundariesX': ('quatArray', 'phaseArray'),
+        'boundariesY': ('quatArray', 'phaseArray'),
+        'phaseBoundariesX': ('phaseArray',),
+        'phaseBoundariesY': ('phaseArray',),
+        'boundaries': ('boundariesX', 'boundariesY'),
+        'boundaryLines': ('boundariesX', 'boundariesY'),
+        'phaseBoundaries': ('phaseBoundariesX', 'phaseBoundariesY'),
+        'phaseBoundaryLines': ('phaseBoundariesX', 'phaseBoundariesY'),
+        'grains': ('boundariesX', 'boundariesY'),
+        'misOri': ('grainList', 'quatArray'),
+        'misOriAxis': ('grainList', 'quatArray'),
+        'GOS': ('grainList', 'quatArray'),
+        'grainSchmidFactors': ('grainList',),
+        'grainSchmidFactorSlipSystems': ('grainList',),
+        'kam': ('quatArray', 'phaseArray'),
+        'GND': ('quatArray', 'phaseArray'),
+        'Nye': ('quatArray', 'phaseArray'),
+    })
+
+    def __init__(self, fileName, dataType=None, **kwargs):
         """
         Initialise class and load EBSD data.
 
@@ -87,6 +146,8 @@ class Map(base.Map):
             Path to EBSD file, including name, excluding extension.
         dataType : str, {'OxfordBinary', 'OxfordText'}
             Format of EBSD data file.
+        kwargs
+            Passed to the data loader, see :func:`loadData`.
 
         """
         # Call base class constructor
@@ -97,6 +158,9 @@ class Map(base.Map):
         self.stepSize = None
         self.eulerAngleArray = None
         self.bandContrastArray = None
+        self.bandSlopeArray = None
+        self.meanAngularDeviationArray = None
+        self.numBandsArray = None
         self.quatArray = None
         self.phaseArray = None
         self.phases = []
@@ -111,8 +175,12 @@ class Map(base.Map):
         self.grains = None
         self.misOri = None
         self.misOriAxis = None
+        self.GOS = None
+        self.grainSchmidFactors = None
+        self.grainSchmidFactorSlipSystems = None
         self.kam = None
         self.origin = (0, 0)
+        self.tileSize = None
         self.GND = None
         self.Nye = None
 
@@ -125,22 +193,33 @@ class Map(base.Map):
         self.plotDefault = self.plotEulerMap
         self.highlightAlpha = 1
 
-        self.loadData(fileName, dataType=dataType)
+        self.loadData(fileName, dataType=dataType, **kwargs)
 
     @reportProgress("loading EBSD data")
-    def loadData(self, fileName, dataType=None):
+    def loadData(self, fileName, dataType=None, **kwargs):
         """Load in EBSD data from file.
 
         Parameters
         ----------
         fileName : str
             Path to EBSD file, including name, excluding extension.
-        dataType : str, {'OxfordBinary', 'OxfordText'}
+        dataType : str, {'OxfordBinary', 'OxfordText', 'DefDAP'}
             Format of EBSD data file.
+        kwargs
+            Passed to the load method of the data loader. For 'DefDAP'
+            data, `datasets` selects which derived datasets to load. For
+            'OxfordBinary' data, `memmap=True` memory-maps the .crc
+            file so fields are only read when used and
+            `roi=(xMin, yMin, xMax, yMax)` only loads a region of the
+            map.
 
         """
         dataLoader = EBSDDataLoader.getLoader(dataType)
-        dataLoader.load(fileName)
+        dataLoader.load(fileName, **kwargs)
+        if dataLoader.sourceFiles:
+            self.sourceFiles = dataLoader.sourceFiles
+            self.operationHistory = [['loadData',
+                                      dict(kwargs, dataType=dataType)]]
 
         metadataDict = dataLoader.loadedMetadata
         self.xDim = metadataDict['xDim']
@@ -153,10 +232,20 @@ class Map(base.Map):
         self.bandContrastArray = dataDict['bandContrast']
         self.bandSlopeArray = dataDict['bandSlope']
         self.meanAngularDeviationArray = dataDict['meanAngularDeviation']
+        self.numBandsArray = dataDict.get('numBands')
         self.phaseArray = dataDict['phase']
         if int(metadataDict['EDX Windows']['Count']) > 0:
             self.EDX = dataDict['EDXDict']
 
+        # map state and derived data saved in the DefDAP format
+        self.origin = tuple(metadataDict.get('origin', self.origin))
+        self.primaryPhaseID = metadataDict.get('primaryPhaseID',
+                                               self.primaryPhaseID)
+        self.homogPoints = [tuple(point) for point in
+                            metadataDict.get('homogPoints', self.homogPoints)]
+        if dataLoader.loadedDerived:
+            self._restoreDerivedData(dataLoader.loadedDerived)
+
         # write final status
         yield "Loaded EBSD data (dimensions: {:} x {:} pixels, step " \
               "size: {:} um)".format(self.xDim, self.yDim, self.stepSize)
@@ -168,14 +257,24 @@ class Map(base.Map):
         ----------
         file_name : str
             Name of file to save to, it must not already exist.
-        data_type : str, {'OxfordText'}
-            Format of EBSD data file to save.
+        data_type : str, {'OxfordText', 'DefDAP'}
+            Format of EBSD data file to save. 'DefDAP' saves the map
+            including derived data (boundaries, grains, grain reference
+            orientations, misorientations, KAM and GND) to a compressed
+            .npz file that can be loaded again with this class.
         file_dir : str
             Directory to save the file to.
 
         """
         data_writer = EBSDDataWriter.get_writer(data_type)
 
+        if data_type == "DefDAP":
+            metadata, data = self._defdapData()
+            data_writer.metadata.update(metadata)
+            data_writer.data.update(data)
+            data_writer.write(file_name, file_dir=file_dir)
+            return
+
         data_writer.metadata['shape'] = self.shape
         data_writer.metadata['step_size'] = self.stepSize
         data_writer.metadata['phases'] = self.phases
@@ -183,9 +282,142 @@ class Map(base.Map):
         data_writer.data['phase'] = self.phaseArray
         data_writer.data['quat'] = self.quatArray
         data_writer.data['band_contrast'] = self.bandContrastArray
+        data_writer.data['band_slope'] = self.bandSlopeArray
+        data_writer.data['mean_angular_deviation'] = \
+            self.meanAngularDeviationArray
+        data_writer.data['num_bands'] = self.numBandsArray
 
         data_writer.write(file_name, file_dir=file_dir)
 
+    def _defdapData(self):
+        """Metadata and datasets of the map, including derived data,
+        for saving in the DefDAP format.
+
+        Returns
+        -------
+        dict, dict
+            Metadata and datasets.
+
+        """
+        metadata = {
+            'mapType': 'ebsd',
+            'xDim': self.xDim,
+            'yDim': self.yDim,
+            'stepSize': self.stepSize,
+            'phases': [{
+                'name': phase.name,
+                'laueGroup': phase.laueGroup,
+                'spaceGroup': phase.spaceGroup,
+                'latticeParams': list(phase.latticeParams)
+            } for phase in self.phases],
+            'origin': list(self.origin),
+            'primaryPhaseID': self.primaryPhaseID,
+            'homogPoints': [list(point) for point in self.homogPoints]
+        }
+
+        data = {
+            'phase': self.phaseArray,
+            'eulerAngle': self.eulerAngleArray,
+            'bandContrast': self.bandContrastArray,
+            'bandSlope': self.bandSlopeArray,
+            'meanAngularDeviation': self.meanAngularDeviationArray,
+            'numBands': self.numBandsArray,
+        }
+        if self.quatArray is not None:
+            data['quat'] = self.quatArray.quatCoef
+        for attr in self.defdapDerivedAttrs:
+            data[attr] = getattr(self, attr)
+
+        if self.checkGrainsDetected(raiseExc=False):
+            data['grains'] = self.grains
+            data['grainIDs'] = np.array([grain.grainID for grain in self])
+            data['grainPhaseIDs'] = np.array([
+                getattr(grain, 'phaseID', -1) for grain in self
+            ])
+            if all(grain.refOri is not None for grain in self):
+                data['grainRefOris'] = np.array([
+                    grain.refOri.quatCoef for grain in self
+                ])
+
+        return metadata, data
+
+    def _restoreDerivedData(self, derived):
+        """Set derived data of the map loaded from a DefDAP file.
+
+        Parameters
+        ----------
+        derived : dict
+            Derived datasets, keyed by name.
+
+        """
+        if 'quat' in derived:
+            self.quatArray = QuatArray(derived['quat'], allow_southern=True,
+                                       copy=False)
+        # set in order of dependency, so restoring data does not reset
+        # data derived from it that was restored before
+        for attr in self.defdapBoundaryAttrs:
+            if attr in derived:
+                setattr(self, attr, derived[attr])
+        if self.boundariesX is not None and self.phaseBoundariesX is not None:
+            self._buildBoundaryMaps()
+
+        if 'grains' in derived:
+            self._restoreGrains(derived['grains'], derived['grainIDs'], Grain)
+
+        for attr in self.defdapGrainDataAttrs + self.defdapPointDataAttrs:
+            if attr in derived:
+                setattr(self, attr, derived[attr])
+
+        if 'grains' not in derived:
+            return
+
+        for grain, phaseID in zip(self, derived['grainPhaseIDs']):
+            if phaseID >= 0:
+                grain.phaseID = int(phaseID)
+                grain.phase = self.phases[phaseID]
+        if 'grainRefOris' in derived:
+            for grain, refOri in zip(self, derived['grainRefOris']):
+                grain.refOri = Quat(refOri)
+
+        if self.misOri is not None:
+            self._buildGrainMisOriViews()
+
+    def _buildGrainMisOriViews(self):
+        """Set the misorientations of each grain from the map
+        misorientation arrays, as set by :func:`calcGrainMisOri`.
+
+        """
+        xLocs, yLocs = self.grainPoints.T
+        misOri = self.misOri[yLocs, xLocs]
+        misOriAxis = None
+        if self.misOriAxis is not None:
+            misOriAxis = self.misOriAxis[:, yLocs, xLocs].T
+        pointGrain = np.repeat(np.arange(len(self)),
+                               np.diff(self.grainOffsets))
+        averageMisOri = np.bincount(
+            pointGrain, weights=misOri, minlength=len(self)
+        ) / np.diff(self.grainOffsets)
+        for grain, start, end, avMisOri in zip(
+            self, self.grainOffsets[:-1], self.grainOffsets[1:],
+            averageMisOri
+        ):
+            grain.misOriList = misOri[start:end]
+            grain.misOriAxisList = (None if misOriAxis is None
+                                    else misOriAxis[start:end])
+            grain.averageMisOri = avMisOri
+
+    def _buildFoundGrains(self):
+        """Build the grain list from the grain label map, as set by
+        :func:`findGrains`.
+
+        """
+        self._restoreGrains(self.grains, np.arange(self.grains.max(initial=0)),
+                            Grain)
+        for grain, phaseID in zip(self, self.grainPhases() - 1):
+            if 0 <= phaseID < self.numPhases:
+                grain.phaseID = int(phaseID)
+                grain.phase = self.phases[phaseID]
+
     @property
     def crystalSym(self):
         """Crystal symmetry of the primary phase.
@@ -230,6 +462,18 @@ class Map(base.Map):
     def scale(self):
         return self.stepSize
 
+    @property
+    def quatArray(self):
+        return self._quatArray
+
+    @quatArray.setter
+    def quatArray(self, value):
+        # neighbour misorientations depend on the orientations so must
+        # be recalculated when a new quat array is set
+        self._quatArray = value
+        self.neighbourMisOriCache = {}
+
+    @cacheResults(record=True)
     @reportProgress("rotating EBSD data")
     def rotateData(self):
         """Rotate map by 180 degrees and transform quats accordingly.
@@ -237,6 +481,11 @@ class Map(base.Map):
         """
         self.eulerAngleArray = self.eulerAngleArray[:, ::-1, ::-1]
         self.bandContrastArray = self.bandContrastArray[::-1, ::-1]
+        self.bandSlopeArray = self.bandSlopeArray[::-1, ::-1]
+        self.meanAngularDeviationArray = \
+            self.meanAngularDeviationArray[::-1, ::-1]
+        if self.numBandsArray is not None:
+            self.numBandsArray = self.numBandsArray[::-1, ::-1]
         self.phaseArray = self.phaseArray[::-1, ::-1]
         self.buildQuatArray(force=True)     # Force rebuild quat array
 
@@ -244,8 +493,7 @@ class Map(base.Map):
         transformQuat = Quat.fromAxisAngle(np.array([0, 0, 1]), np.pi).conjugate
 
         # Perform vectorised multiplication
-        quats = Quat.multiplyManyQuats(self.quatArray.flatten(), transformQuat)
-        self.quatArray = np.array(quats).reshape(self.yDim, self.xDim)
+        self.quatArray = self.quatArray * transformQuat
 
         yield 1.
 
@@ -396,48 +644,178 @@ class Map(base.Map):
 
         return plot
 
-    def calcKam(self):
-        """
-        Calculates Kernel Average Misorientaion (KAM) for the EBSD map,
-        based on a 3x3 kernel. Crystal symmetric equivalences are not
-        considered. Stores result in self.kam.
-
-        """
-        quatComps = np.empty((4, self.yDim, self.xDim))
+    def calcNeighbourMisOri(self, offset, cache=True):
+        """Calculate the misorientation between each point and its
+        neighbour at `offset`, taking into account the crystal symmetry
+        of the phase of the points. Results are cached until a new
+        `quatArray` is set.
 
-        for i, row in enumerate(self.quatArray):
-            for j, quat in enumerate(row):
-                quatComps[:, i, j] = quat.quatCoef
+        Parameters
+        ----------
+        offset : tuple(int)
+            Offset (y, x) to the neighbour in pixels, i.e. (0, 1) for
+            the neighbour in the positive x direction.
+        cache : bool
+            If True, store the result for reuse.
 
-        self.kam = np.empty((self.yDim, self.xDim))
+        Returns
+        -------
+        misOri : numpy.ndarray
+            Misorientation angle in degrees, shape (yDim, xDim). NaN
+            where the neighbour is outside the map, either point is
+            non-indexed or the points are of different phases.
+        symIdx : numpy.ndarray
+            Index of the symmetry operator applied to the neighbour that
+            gives the minimum misorientation, shape (yDim, xDim).
 
-        # Start with rows. Calculate misorientation with neighbouring rows.
-        # First and last row only in one direction
-        self.kam[0, :] = abs(np.einsum("ij,ij->j", quatComps[:, 0, :], quatComps[:, 1, :]))
-        self.kam[-1, :] = abs(np.einsum("ij,ij->j", quatComps[:, -1, :], quatComps[:, -2, :]))
-        for i in range(1, self.yDim - 1):
-            self.kam[i, :] = (abs(np.einsum("ij,ij->j", quatComps[:, i, :], quatComps[:, i + 1, :])) +
-                              abs(np.einsum("ij,ij->j", quatComps[:, i, :], quatComps[:, i - 1, :]))) / 2
+        """
+        dy, dx = offset = tuple(int(i) for i in offset)
+        if offset in self.neighbourMisOriCache:
+            return self.neighbourMisOriCache[offset]
 
-        self.kam[self.kam > 1] = 1
+        self.buildQuatArray()
+        ySize, xSize = self.shape
+
+        misOri = np.full((ySize, xSize), np.nan)
+        symIdx = np.zeros((ySize, xSize), dtype=np.int8)
+
+        # rows of points that have a neighbour in the map
+        rows0 = slice(max(0, -dy), ySize - max(0, dy))
+        for tile, _, _ in tileSlices(rows0.stop - rows0.start, self.tileSize):
+            # slices selecting each point and its neighbour
+            sl0 = (slice(rows0.start + tile.start, rows0.start + tile.stop),
+                   slice(max(0, -dx), xSize - max(0, dx)))
+            sl1 = (slice(sl0[0].start + dy, sl0[0].stop + dy),
+                   slice(max(0, dx), xSize + min(0, dx)))
+
+            phase0 = self.phaseArray[sl0]
+            valid = (phase0 != 0) & (phase0 == self.phaseArray[sl1])
+            for phaseID, phase in enumerate(self.phases, start=1):
+                phaseMask = valid & (phase0 == phaseID)
+                if not phaseMask.any():
+                    continue
+                currMisOri, currSymIdx = \
+                    self.quatArray[sl0][phaseMask].misOriSymIdx(
+                        self.quatArray[sl1][phaseMask],
+                        phase.crystalStructure.name
+                    )
+                # convert to misorientation angle in degrees
+                misOri[sl0][phaseMask] = \
+                    2 * np.arccos(currMisOri) * 180 / np.pi
+                symIdx[sl0][phaseMask] = currSymIdx
+
+        result = (misOri, symIdx)
+        if cache:
+            self.neighbourMisOriCache[offset] = result
+
+        return result
+
+    @cacheResults('kam')
+    @reportProgress("calculating KAM")
+    def calcKam(self, kernelOrder=1, misOriCutoff=None, symmetric=True,
+                sameGrain=False):
+        """Calculates Kernel Average Misorientaion (KAM) for the EBSD map.
+        The misorientation from each point to the points on the ring of
+        a square kernel at distance `kernelOrder` from it is averaged.
+        Non-indexed points and neighbours of a different phase are not
+        included. Stores result in self.kam in degrees, with NaN where
+        a point has no valid neighbours.
 
-        # Do the same for columns
-        self.kam[:, 0] += abs(np.einsum("ij,ij->j", quatComps[:, :, 0], quatComps[:, :, 1]))
-        self.kam[:, -1] += abs(np.einsum("ij,ij->j", quatComps[:, :, -1], quatComps[:, :, -2]))
-        for i in range(1, self.xDim - 1):
-            self.kam[:, i] += (abs(np.einsum("ij,ij->j", quatComps[:, :, i], quatComps[:, :, i + 1])) +
-                               abs(np.einsum("ij,ij->j", quatComps[:, :, i], quatComps[:, :, i - 1]))) / 2
+        Parameters
+        ----------
+        kernelOrder : int
+            Order of neighbours to use, 1 for the 8 nearest neighbours,
+            2 for the 16 next nearest and so on.
+        misOriCutoff : float, optional
+            Neighbours with a misorientation above this value (in
+            degrees) are excluded, for example to ignore grain
+            boundaries.
+        symmetric : bool
+            If True, consider crystal symmetric equivalences using the
+            crystal structure of the phase of each point.
+        sameGrain : bool
+            If True, only consider neighbours in the same grain. Grains
+            must already have been found.
 
-        self.kam /= 2
-        self.kam[self.kam > 1] = 1
+        """
+        self.buildQuatArray()
 
-    def plotKamMap(self, **kwargs):
+        kernelOrder = int(kernelOrder)
+        if kernelOrder < 1:
+            raise ValueError("Kernel order must be 1 or greater.")
+        if sameGrain and self.grains is None:
+            raise Exception("Grains must be found before using sameGrain.")
+
+        ySize, xSize = self.shape
+
+        kamSum = np.zeros(self.shape)
+        kamCount = np.zeros(self.shape, dtype=int)
+
+        # only half of the ring is required as misorientation is
+        # symmetric, each value is added to both points of the pair
+        n = kernelOrder
+        shifts = [(dy, dx) for dy in range(0, n + 1)
+                  for dx in range(-n, n + 1)
+                  if max(abs(dy), abs(dx)) == n and (dy > 0 or dx > 0)]
+
+        for i, (dy, dx) in enumerate(shifts):
+            # slices selecting each point and its neighbour
+            sl0 = (slice(0, ySize - dy),
+                   slice(max(0, -dx), xSize - max(0, dx)))
+            sl1 = (slice(dy, ySize),
+                   slice(max(0, dx), xSize + min(0, dx)))
+
+            if symmetric:
+                # nearest neighbours are shared with other calculations
+                misOri, _ = self.calcNeighbourMisOri(
+                    (dy, dx), cache=kernelOrder == 1
+                )
+                misOri = misOri[sl0]
+                valid = ~np.isnan(misOri)
+            else:
+                phase0 = self.phaseArray[sl0]
+                valid = (phase0 != 0) & (phase0 == self.phaseArray[sl1])
+                misOri = np.empty(valid.shape)
+                for tile, _, _ in tileSlices(len(misOri), self.tileSize):
+                    quats0 = self.quatArray[sl0][tile]
+                    quats1 = self.quatArray[sl1][tile]
+                    misOri[tile] = np.minimum(np.abs(quats0.dot(quats1)), 1.)
+                # convert to misorientation angle in degrees
+                misOri = 2 * np.arccos(misOri) * 180 / np.pi
+
+            if sameGrain:
+                valid &= self.grains[sl0] == self.grains[sl1]
+            if misOriCutoff is not None:
+                valid &= misOri <= misOriCutoff
+            misOri = np.where(valid, misOri, 0)
+
+            kamSum[sl0] += misOri
+            kamSum[sl1] += misOri
+            kamCount[sl0] += valid
+            kamCount[sl1] += valid
+
+            yield (i + 1) / len(shifts)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.kam = kamSum / kamCount
+
+    def plotKamMap(self, kernelOrder=1, misOriCutoff=None, symmetric=True,
+                   sameGrain=False, **kwargs):
         """Plot Kernel Average Misorientaion (KAM) for the EBSD map.
 
         Parameters
         ----------
+        kernelOrder : int
+            Order of neighbours to use, see :func:`calcKam`.
+        misOriCutoff : float, optional
+            Maximum misorientation (in degrees) of neighbours to include.
+        symmetric : bool
+            If True, consider crystal symmetric equivalences.
+        sameGrain : bool
+            If True, only consider neighbours in the same grain.
         kwargs
-            All arguments are passed to :func:`defdap.plotting.MapPlot.create`.
+            All other arguments are passed to
+            :func:`defdap.plotting.MapPlot.create`.
 
         Returns
         -------
@@ -451,114 +829,103 @@ class Map(base.Map):
         }
         plotParams.update(kwargs)
 
-        self.calcKam()
-        # Convert to degrees and plot
-        kam = 2 * np.arccos(self.kam) * 180 / np.pi
+        self.calcKam(kernelOrder=kernelOrder, misOriCutoff=misOriCutoff,
+                     symmetric=symmetric, sameGrain=sameGrain)
 
-        plot = MapPlot.create(self, kam, **plotParams)
+        plot = MapPlot.create(self, self.kam, **plotParams)
 
         return plot
 
+    @cacheResults('Nye', 'GND')
     @reportProgress("calculating Nye tensor")
-    def calcNye(self):
+    def calcNye(self, chunkSize=None):
         """
         Calculates Nye tensor and related GND density for the EBSD map.
         Stores result in self.Nye and self.GND. Uses the crystal
-        symmetry of the primary phase.
+        symmetry and Burgers vector of the phase of each point.
+        Neighbours that are non-indexed or of a different phase are
+        not included and the result is NaN at non-indexed points.
+
+        Parameters
+        ----------
+        chunkSize : int, optional
+            Number of map rows to process at a time, to limit memory
+            use on large maps. `tileSize` of the map by default.
 
         """
         self.buildQuatArray()
-        syms = self.primaryPhase.crystalStructure.symmetries
-        numSyms = len(syms)
-
-        # array to store quat components of initial and symmetric equivalents
-        quatComps = np.empty((numSyms, 4, self.yDim, self.xDim))
-
-        # populate with initial quat components
-        for i, row in enumerate(self.quatArray):
-            for j, quat in enumerate(row):
-                quatComps[0, :, i, j] = quat.quatCoef
-
-        # loop of over symmetries and apply to initial quat components
-        # (excluding first symmetry as this is the identity transformation)
-        for i, sym in enumerate(syms[1:], start=1):
-            # sym[i] * quat for all points (* is quaternion product)
-            quatComps[i, 0] = (quatComps[0, 0] * sym[0] - quatComps[0, 1] * sym[1] -
-                               quatComps[0, 2] * sym[2] - quatComps[0, 3] * sym[3])
-            quatComps[i, 1] = (quatComps[0, 0] * sym[1] + quatComps[0, 1] * sym[0] -
-                               quatComps[0, 2] * sym[3] + quatComps[0, 3] * sym[2])
-            quatComps[i, 2] = (quatComps[0, 0] * sym[2] + quatComps[0, 2] * sym[0] -
-                               quatComps[0, 3] * sym[1] + quatComps[0, 1] * sym[3])
-            quatComps[i, 3] = (quatComps[0, 0] * sym[3] + quatComps[0, 3] * sym[0] -
-                               quatComps[0, 1] * sym[2] + quatComps[0, 2] * sym[1])
-
-            # swap into positve hemisphere if required
-            quatComps[i, :, quatComps[i, 0] < 0] *= -1
-
-        # Arrays to store neigbour misorientation in positive x and y direction
-        misOrix = np.zeros((numSyms, self.yDim, self.xDim))
-        misOriy = np.zeros((numSyms, self.yDim, self.xDim))
-
-        # loop over symmetries calculating misorientation to initial
-        for i in range(numSyms):
-            for j in range(self.xDim - 1):
-                misOrix[i, :, j] = abs(np.einsum("ij,ij->j", quatComps[0, :, :, j], quatComps[i, :, :, j + 1]))
-
-            for j in range(self.yDim - 1):
-                misOriy[i, j, :] = abs(np.einsum("ij,ij->j", quatComps[0, :, j, :], quatComps[i, :, j + 1, :]))
-
-        misOrix[misOrix > 1] = 1
-        misOriy[misOriy > 1] = 1
-
-        # find min misorientation (max here as misorientaion is cos of this)
-        argmisOrix = np.argmax(misOrix, axis=0)
-        argmisOriy = np.argmax(misOriy, axis=0)
-        misOrix = np.max(misOrix, axis=0)
-        misOriy = np.max(misOriy, axis=0)
-
-        # convert to misorientation in degrees
-        misOrix = 360 * np.arccos(misOrix) / np.pi
-        misOriy = 360 * np.arccos(misOriy) / np.pi
-
-        # calculate relative elastic distortion tensors at each point in the two directions
-        betaderx = np.zeros((3, 3, self.yDim, self.xDim))
-        betadery = betaderx
-        for i in range(self.xDim - 1):
-            for j in range(self.yDim - 1):
-                q0x = Quat(quatComps[0, 0, j, i], quatComps[0, 1, j, i],
-                           quatComps[0, 2, j, i], quatComps[0, 3, j, i])
-                qix = Quat(quatComps[argmisOrix[j, i], 0, j, i + 1],
-                           quatComps[argmisOrix[j, i], 1, j, i + 1],
-                           quatComps[argmisOrix[j, i], 2, j, i + 1],
-                           quatComps[argmisOrix[j, i], 3, j, i + 1])
-                misoquatx = qix.conjugate * q0x
-                # change stepsize to meters
-                betaderx[:, :, j, i] = (Quat.rotMatrix(misoquatx) - np.eye(3)) / self.stepSize / 1e-6
-                q0y = Quat(quatComps[0, 0, j, i], quatComps[0, 1, j, i],
-                           quatComps[0, 2, j, i], quatComps[0, 3, j, i])
-                qiy = Quat(quatComps[argmisOriy[j, i], 0, j + 1, i],
-                           quatComps[argmisOriy[j, i], 1, j + 1, i],
-                           quatComps[argmisOriy[j, i], 2, j + 1, i],
-                           quatComps[argmisOriy[j, i], 3, j + 1, i])
-                misoquaty = qiy.conjugate * q0y
-                # change stepsize to meters
-                betadery[:, :, j, i] = (Quat.rotMatrix(misoquaty) - np.eye(3)) / self.stepSize / 1e-6
-
-        # Calculate the Nye Tensor
-        alpha = np.empty((3, 3, self.yDim, self.xDim))
-        bavg = 1.4e-10  # Burgers vector
-        alpha[0, 2] = (betadery[0, 0] - betaderx[0, 1]) / bavg
-        alpha[1, 2] = (betadery[1, 0] - betaderx[1, 1]) / bavg
-        alpha[2, 2] = (betadery[2, 0] - betaderx[2, 1]) / bavg
-        alpha[:, 1] = betaderx[:, 2] / bavg
-        alpha[:, 0] = -1 * betadery[:, 2] / bavg
+        ySize, xSize = self.shape
+        if chunkSize is None:
+            chunkSize = self.tileSize
+
+        # change stepsize to meters
+        stepSize = self.stepSize * 1e-6
+
+        # symmetry operators giving the min misorientation to neighbours
+        misOriX, symIdxX = self.calcNeighbourMisOri((0, 1))
+        misOriY, symIdxY = self.calcNeighbourMisOri((1, 0))
+
+        def calcDistortionDerivative(out, sl0, sl1, misOri, symIdx):
+            # relative elastic distortion between each point in `sl0`
+            # and its neighbour in `sl1`, for each phase
+            phase0 = self.phaseArray[sl0]
+            valid = ~np.isnan(misOri[sl0])
+
+            for phaseID, phase in enumerate(self.phases, start=1):
+                phaseMask = valid & (phase0 == phaseID)
+                if not phaseMask.any():
+                    continue
+                quats0 = self.quatArray[sl0][phaseMask]
+                quats1 = self.quatArray[sl1][phaseMask]
+
+                # symmetric equivalent of neighbour with min misorientation
+                quatsSym = quats1.applySym(phase.crystalStructure.name,
+                                           symIdx[sl0][phaseMask])
+                misOriQuats = quatsSym.conjugate * quats0
+
+                out[:, :, phaseMask] = (
+                    misOriQuats.rotMatrix() - np.eye(3)[..., np.newaxis]
+                ) / stepSize
+
+        # Burgers vector of each point
+        bMap = np.full((ySize, xSize), np.nan)
+        for phaseID, phase in enumerate(self.phases, start=1):
+            bMap[self.phaseArray == phaseID] = phase.burgersVector
+
+        alpha = np.zeros((3, 3, ySize, xSize))
+        for rows, _, _ in tileSlices(ySize, chunkSize):
+            # calculate relative elastic distortion tensors at each
+            # point in the two directions
+            numRows = rows.stop - rows.start
+            betaderx = np.zeros((3, 3, numRows, xSize))
+            betadery = np.zeros((3, 3, numRows, xSize))
+            calcDistortionDerivative(
+                betaderx[:, :, :, :-1],
+                (rows, slice(0, xSize - 1)), (rows, slice(1, xSize)),
+                misOriX, symIdxX
+            )
+            rowsY = slice(rows.start, min(rows.stop, ySize - 1))
+            calcDistortionDerivative(
+                betadery[:, :, :rowsY.stop - rowsY.start],
+                (rowsY, slice(None)),
+                (slice(rowsY.start + 1, rowsY.stop + 1), slice(None)),
+                misOriY, symIdxY
+            )
+
+            # Calculate the Nye Tensor
+            b = bMap[rows]
+            alphaRows = alpha[:, :, rows]
+            alphaRows[0, 2] = (betadery[0, 0] - betaderx[0, 1]) / b
+            alphaRows[1, 2] = (betadery[1, 0] - betaderx[1, 1]) / b
+            alphaRows[2, 2] = (betadery[2, 0] - betaderx[2, 1]) / b
+            alphaRows[:, 1] = betaderx[:, 2] / b
+            alphaRows[:, 0] = -1 * betadery[:, 2] / b
+
+            yield rows.stop / ySize
 
         # Calculate 3 possible L1 norms of Nye tensor for total
         # disloction density
-        alpha_total3 = np.empty((self.yDim, self.xDim))
-        alpha_total5 = np.empty((self.yDim, self.xDim))
-        alpha_total9 = np.empty((self.yDim, self.xDim))
-        alpha_total3 = 30 / 10. *(
+        alpha_total3 = 30 / 10. * (
                 abs(alpha[0, 2]) + abs(alpha[1, 2]) +
                 abs(alpha[2, 2])
         )
@@ -572,16 +939,14 @@ class Map(base.Map):
                 abs(alpha[0, 1]) + abs(alpha[1, 1]) + abs(alpha[2, 1])
         )
         alpha_total3[abs(alpha_total3) < 1] = 1e12
-        alpha_total5[abs(alpha_total3) < 1] = 1e12
-        alpha_total9[abs(alpha_total3) < 1] = 1e12
+        alpha_total5[abs(alpha_total5) < 1] = 1e12
+        alpha_total9[abs(alpha_total9) < 1] = 1e12
 
         # choose from the different alpha_totals according to preference;
         # see Ruggles GND density paper
         self.GND = alpha_total9
         self.Nye = alpha
 
-        yield 1.
-
     def plotGNDMap(self, **kwargs):
         """Plots a map of geometrically necessary dislocation (GND) density
 
@@ -638,88 +1003,147 @@ class Map(base.Map):
 
         yield 1.
 
-    def filterData(self, misOriTol=5):
-        # Kuwahara filter
-        print("8 quadrants")
-        misOriTol *= np.pi / 180
-        misOriTol = np.cos(misOriTol / 2)
-
-        # store quat components in array
-        quatComps = np.empty((4,) + self.shape)
-        for idx in np.ndindex(self.shape):
-            quatComps[(slice(None),) + idx] = self.quatArray[idx].quatCoef
-
-        # misorientation in each quadrant surrounding a point
-        misOris = np.zeros((8,) + self.shape)
-
-        for i in range(2, self.shape[0] - 2):
-            for j in range(2, self.shape[1] - 2):
-
-                refQuat = quatComps[:, i, j]
-                quadrants = [
-                    quatComps[:, i - 2:i + 1, j - 2:j + 1],   # UL
-                    quatComps[:, i - 2:i + 1, j - 1:j + 2],   # UC
-                    quatComps[:, i - 2:i + 1, j:j + 3],       # UR
-                    quatComps[:, i - 1:i + 2, j:j + 3],       # MR
-                    quatComps[:, i:i + 3, j:j + 3],           # LR
-                    quatComps[:, i:i + 3, j - 1:j + 2],       # LC
-                    quatComps[:, i:i + 3, j - 2:j + 1],       # LL
-                    quatComps[:, i - 1:i + 2, j - 2:j + 1]    # ML
-                ]
-
-                for k, quats in enumerate(quadrants):
-                    misOrisQuad = np.abs(
-                        np.einsum("ijk,i->jk", quats, refQuat)
-                    )
-                    misOrisQuad = misOrisQuad[misOrisQuad > misOriTol]
-                    misOris[k, i, j] = misOrisQuad.mean()
-
-        minMisOriQuadrant = np.argmax(misOris, axis=0)
-        # minMisOris = np.max(misOris, axis=0)
-        # minMisOris[minMisOris > 1.] = 1.
-        # minMisOris = 2 * np.arccos(minMisOris)
-
-        quatCompsNew = np.copy(quatComps)
+    @cacheResults(record=True)
+    @reportProgress("filtering orientation data")
+    def filterData(self, misOriTol=5, windowSize=3, symmetric=True,
+                   tileSize=None):
+        """Filter orientation noise with a Kuwahara filter. For each
+        point, the 8 square windows of size `windowSize` that contain
+        it (the 4 corner, 4 edge-centred) are considered and the point
+        is replaced by the average orientation of the window with the
+        lowest mean misorientation to it. Only neighbours of the same
+        phase and within `misOriTol` of the point are used. Non-indexed
+        points are not changed.
 
-        for i in range(2, self.shape[0] - 2):
-            for j in range(2, self.shape[1] - 2):
-                # if minMisOris[i, j] < misOriTol:
-                #     continue
-
-                refQuat = quatComps[:, i, j]
-                quadrants = [
-                    quatComps[:, i - 2:i + 1, j - 2:j + 1],   # UL
-                    quatComps[:, i - 2:i + 1, j - 1:j + 2],   # UC
-                    quatComps[:, i - 2:i + 1, j:j + 3],       # UR
-                    quatComps[:, i - 1:i + 2, j:j + 3],       # MR
-                    quatComps[:, i:i + 3, j:j + 3],           # LR
-                    quatComps[:, i:i + 3, j - 1:j + 2],       # LC
-                    quatComps[:, i:i + 3, j - 2:j + 1],       # LL
-                    quatComps[:, i - 1:i + 2, j - 2:j + 1]    # ML
-                ]
-                quats = quadrants[minMisOriQuadrant[i, j]]
-
-                misOrisQuad = np.abs(
-                    np.einsum("ijk,i->jk", quats, refQuat)
-                )
-                quats = quats[:, misOrisQuad > misOriTol]
-
-                avOri = np.einsum("ij->i", quats)
-                # avOri /= np.sqrt(np.dot(avOri, avOri))
+        Parameters
+        ----------
+        misOriTol : float
+            Maximum misorientation (in degrees) of neighbours to include.
+        windowSize : int
+            Size of the filter windows, must be odd and at least 3.
+        symmetric : bool
+            If True, consider crystal symmetric equivalences using the
+            crystal structure of the phase of each point.
+        tileSize : int, optional
+            Number of map rows to filter at a time, to limit memory use.
+            `tileSize` of the map or 64 by default.
 
-                quatCompsNew[:, i, j] = avOri
+        """
+        self.buildQuatArray()
 
-        quatCompsNew /= np.sqrt(np.einsum("ijk,ijk->jk", quatCompsNew, quatCompsNew))
+        windowSize = int(windowSize)
+        if windowSize < 3 or windowSize % 2 == 0:
+            raise ValueError("Window size must be odd and at least 3.")
+        if tileSize is None:
+            tileSize = 64 if self.tileSize is None else self.tileSize
 
-        quatArrayNew = np.empty(self.shape, dtype=Quat)
+        misOriTol = np.cos(misOriTol * np.pi / 180 / 2)
+        halo = windowSize - 1
+        numOffsets = 2 * windowSize - 1
 
-        for idx in np.ndindex(self.shape):
-            quatArrayNew[idx] = Quat(quatCompsNew[(slice(None),) + idx])
+        quatComps = self.quatArray.quatCoef
+        ySize, xSize = self.shape
 
-        self.quatArray = quatArrayNew
+        # position of each window in the grid of neighbour offsets
+        windowPositions = [(a, b) for a in (0, halo // 2, halo)
+                           for b in (0, halo // 2, halo)
+                           if (a, b) != (halo // 2, halo // 2)]
 
-        return quats
+        quatCompsNew = np.copy(quatComps)
 
+        for rows, paddedRows, _ in tileSlices(ySize, tileSize, halo):
+            rowStart, rowEnd = rows.start, rows.stop
+            tileShape = (rowEnd - rowStart, xSize)
+
+            # tile with its halo, padded with non-indexed points so all
+            # windows fit in the map
+            padding = (halo - (rowStart - paddedRows.start),
+                       halo - (paddedRows.stop - rowEnd))
+            quatCompsPad = np.pad(quatComps[:, paddedRows],
+                                  ((0, 0), padding, (halo, halo)))
+            phaseArrayPad = np.pad(self.phaseArray[paddedRows],
+                                   (padding, (halo, halo)))
+
+            refQuats = QuatArray(quatComps[:, rowStart:rowEnd],
+                                 allow_southern=True, copy=False)
+            refPhase = self.phaseArray[rowStart:rowEnd]
+
+            # misorientation to and aligned orientation of every
+            # neighbour, indexed by offset in the neighbourhood
+            misOris = np.zeros((numOffsets, numOffsets) + tileShape)
+            alignedQuats = np.zeros((numOffsets, numOffsets, 4) + tileShape)
+            valid = np.zeros((numOffsets, numOffsets) + tileShape,
+                             dtype=bool)
+
+            for dy in range(numOffsets):
+                for dx in range(numOffsets):
+                    neighSlice = (slice(dy, dy + tileShape[0]),
+                                  slice(dx, dx + xSize))
+                    neighQuats = QuatArray(
+                        quatCompsPad[(slice(None),) + neighSlice],
+                        allow_southern=True, copy=False
+                    )
+                    currValid = ((refPhase != 0) &
+                                 (phaseArrayPad[neighSlice] == refPhase))
+
+                    if symmetric:
+                        for phaseID, phase in enumerate(self.phases, start=1):
+                            phaseMask = currValid & (refPhase == phaseID)
+                            if not phaseMask.any():
+                                continue
+                            misOri, neighSym = refQuats[phaseMask].misOri(
+                                neighQuats[phaseMask],
+                                phase.crystalStructure.name, returnQuat=2
+                            )
+                            misOris[dy, dx][phaseMask] = misOri
+                            alignedQuats[dy, dx][:, phaseMask] = \
+                                neighSym.quatCoef
+                    else:
+                        misOris[dy, dx] = np.abs(refQuats.dot(neighQuats))
+                        alignedQuats[dy, dx] = neighQuats.quatCoef
+
+                    # flip neighbours onto the same side as the point so
+                    # they can be averaged
+                    dots = np.einsum("i...,i...->...", alignedQuats[dy, dx],
+                                     refQuats.quatCoef)
+                    alignedQuats[dy, dx] *= np.where(dots < 0, -1., 1.)
+
+                    valid[dy, dx] = currValid & (misOris[dy, dx] > misOriTol)
+
+            misOris *= valid
+            alignedQuats *= valid[:, :, np.newaxis]
+
+            # mean misorientation and summed orientation in each window
+            windowMisOris = np.empty((len(windowPositions),) + tileShape)
+            windowQuats = np.empty((len(windowPositions), 4) + tileShape)
+            for i, (a, b) in enumerate(windowPositions):
+                window = (slice(a, a + windowSize), slice(b, b + windowSize))
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    windowMisOris[i] = (misOris[window].sum(axis=(0, 1)) /
+                                        valid[window].sum(axis=(0, 1)))
+                windowQuats[i] = alignedQuats[window].sum(axis=(0, 1))
+
+            # choose window with minimum misorientation (max here as
+            # misorientaion is cos of this)
+            windowMisOris[np.isnan(windowMisOris)] = -1
+            bestWindow = np.argmax(windowMisOris, axis=0)
+            avOris = np.take_along_axis(
+                windowQuats, bestWindow[np.newaxis, np.newaxis], axis=0
+            )[0]
+
+            indexed = refPhase != 0
+            quatCompsNew[:, rowStart:rowEnd][:, indexed] = avOris[:, indexed]
+
+            yield rowEnd / ySize
+
+        quatCompsNew /= np.sqrt(np.einsum("ijk,ijk->jk",
+                                          quatCompsNew, quatCompsNew))
+
+        self.quatArray = QuatArray(quatCompsNew, copy=False)
+
+    @cacheResults('boundariesX', 'boundariesY', 'phaseBoundariesX',
+                  'phaseBoundariesY', restore='_buildBoundaryMaps',
+                  record=True)
     @reportProgress("finding grain boundaries")
     def findBoundaries(self, boundDef=10):
         """Find grain and phase boundaries
@@ -730,64 +1154,16 @@ class Map(base.Map):
             Critical misorientation.
 
         """
-        # TODO: what happens with non-indexed points
-        # TODO: grain boundaries should be calculated per crystal structure
-        syms = self.primaryPhase.crystalStructure.symmetries
-        numSyms = len(syms)
-
-        # array to store quat components of initial and symmetric equivalents
-        quatComps = np.empty((numSyms, 4, self.yDim, self.xDim))
-
-        # populate with initial quat components
-        for i, row in enumerate(self.quatArray):
-            for j, quat in enumerate(row):
-                quatComps[0, :, i, j] = quat.quatCoef
-
-        # loop of over symmetries and apply to initial quat components
-        # (excluding first symmetry as this is the identity transformation)
-        for i, sym in enumerate(syms[1:], start=1):
-            # sym[i] * quat for all points (* is quaternion product)
-            quatComps[i, 0] = (quatComps[0, 0] * sym[0] - quatComps[0, 1] * sym[1] -
-                               quatComps[0, 2] * sym[2] - quatComps[0, 3] * sym[3])
-            quatComps[i, 1] = (quatComps[0, 0] * sym[1] + quatComps[0, 1] * sym[0] -
-                               quatComps[0, 2] * sym[3] + quatComps[0, 3] * sym[2])
-            quatComps[i, 2] = (quatComps[0, 0] * sym[2] + quatComps[0, 2] * sym[0] -
-                               quatComps[0, 3] * sym[1] + quatComps[0, 1] * sym[3])
-            quatComps[i, 3] = (quatComps[0, 0] * sym[3] + quatComps[0, 3] * sym[0] -
-                               quatComps[0, 1] * sym[2] + quatComps[0, 2] * sym[1])
-
-            # swap into positive hemisphere if required
-            quatComps[i, :, quatComps[i, 0] < 0] *= -1
-
-        # Arrays to store neighbour misorientation in positive x and y
-        # directions
-        misOriX = np.ones((numSyms, self.yDim, self.xDim))
-        misOriY = np.ones((numSyms, self.yDim, self.xDim))
-
-        # loop over symmetries calculating misorientation to initial
-        for i in range(numSyms):
-            for j in range(self.xDim - 1):
-                misOriX[i, :, j] = abs(
-                    np.einsum("ij,ij->j", quatComps[0, :, :, j], quatComps[i, :, :, j + 1]))
-
-            for j in range(self.yDim - 1):
-                misOriY[i, j, :] = abs(np.einsum("ij,ij->j", quatComps[0, :, j, :], quatComps[i, :, j + 1, :]))
-
-        misOriX[misOriX > 1] = 1
-        misOriY[misOriY > 1] = 1
-
-        # find min misorientation (max here as misorientaion is cos of this)
-        misOriX = np.max(misOriX, axis=0)
-        misOriY = np.max(misOriY, axis=0)
-
-        # convert to misorientation in degrees
-        misOriX = 2 * np.arccos(misOriX) * 180 / np.pi
-        misOriY = 2 * np.arccos(misOriY) * 180 / np.pi
+        # misorientation to neighbours in positive x and y directions,
+        # NaN for non-indexed points and phase boundaries
+        misOriX, _ = self.calcNeighbourMisOri((0, 1))
+        misOriY, _ = self.calcNeighbourMisOri((1, 0))
 
         # GRAIN boundary POINTS where misOriX or misOriY are greater
         # than set value
-        self.boundariesX = misOriX > boundDef
-        self.boundariesY = misOriY > boundDef
+        with np.errstate(invalid='ignore'):
+            self.boundariesX = misOriX > boundDef
+            self.boundariesY = misOriY > boundDef
 
         # PHASE boundary POINTS
         self.phaseBoundariesX = np.not_equal(
@@ -798,13 +1174,23 @@ class Map(base.Map):
             self.phaseArray, np.roll(self.phaseArray, -1, axis=0))
         self.phaseBoundariesY[-1, :] = False
 
+        # add PHASE boundary POINTS to GRAIN boundary POINTS
+        self.boundariesX = np.logical_or(self.boundariesX, self.phaseBoundariesX)
+        self.boundariesY = np.logical_or(self.boundariesY, self.phaseBoundariesY)
+
+        self._buildBoundaryMaps()
+
+        yield 1.
+
+    def _buildBoundaryMaps(self):
+        """Build boundary maps and lines from the boundary points in
+        the x and y directions.
+
+        """
         self.phaseBoundaries = np.logical_or(
             self.phaseBoundariesX, self.phaseBoundariesY)
         self.phaseBoundaries = -self.phaseBoundaries.astype(int)
 
-        # add PHASE boundary POINTS to GRAIN boundary POINTS
-        self.boundariesX = np.logical_or(self.boundariesX, self.phaseBoundariesX)
-        self.boundariesY = np.logical_or(self.boundariesY, self.phaseBoundariesY)
         self.boundaries = np.logical_or(self.boundariesX, self.boundariesY)
         self.boundaries = -self.boundaries.astype(int)
 
@@ -818,52 +1204,85 @@ class Map(base.Map):
             boundary_points_y=zip(*self.phaseBoundariesY.transpose().nonzero())
         )
 
-        yield 1.
-
     @reportProgress("constructing neighbour network")
     def buildNeighbourNetwork(self):
+        """Construct a network of neighbouring grains, with the
+        boundary segment between each pair of grains stored on the edge
+        joining them.
+
+        """
         # create network
         nn = nx.Graph()
         nn.add_nodes_from(self.grainList)
 
-        for i, boundaries in enumerate((self.boundariesX, self.boundariesY)):
-            yLocs, xLocs = np.nonzero(boundaries)
-            totalPoints = len(xLocs)
-
-            for iPoint, (x, y) in enumerate(zip(xLocs, yLocs)):
-                # report progress, assumes roughly equal number of x and
-                # y boundary points
-                yield 0.5 * (i + iPoint / totalPoints)
-
-                if (x == 0 or y == 0 or x == self.grains.shape[1] - 1 or
-                        y == self.grains.shape[0] - 1):
-                    # exclude boundary pixels of map
-                    continue
-
-                grainID = self.grains[y, x] - 1
-                neiGrainID = self.grains[y + i, x - i + 1] - 1
-
-                if neiGrainID == grainID:
-                    # ignore if neighbour is same as grain
-                    continue
-                if neiGrainID < 0 or grainID < 0:
-                    # ignore if not a grain (boundary points -1 and
-                    # points in small grains -2)
-                    continue
-
-                grain = self[grainID]
-                neiGrain = self[neiGrainID]
+        # exclude boundary pixels of map
+        interior = np.zeros(self.shape, dtype=bool)
+        interior[1:-1, 1:-1] = True
 
-                try:
-                    # look up boundary segment if it exists
-                    bSeg = nn[grain][neiGrain]['boundary']
-                except KeyError:
-                    # neighbour relation doesn't exist so add it
-                    bSeg = BoundarySegment(self, grain, neiGrain)
-                    nn.add_edge(grain, neiGrain, boundary=bSeg)
-
-                # add the boundary point
-                bSeg.addBoundaryPoint((x, y), i, grain)
+        # grains either side of all x (kind 0) and y (kind 1) boundary
+        # points, points are ordered by kind then raster order
+        grainIDs, neiGrainIDs, xLocs, yLocs, kinds = [], [], [], [], []
+        for i, boundaries in enumerate((self.boundariesX, self.boundariesY)):
+            yLoc, xLoc = np.nonzero(boundaries & interior)
+
+            grainID = self.grains[yLoc, xLoc] - 1
+            neiGrainID = self.grains[yLoc + i, xLoc - i + 1] - 1
+
+            # ignore if neighbour is same as grain or either is not a
+            # grain (boundary points -1 and points in small grains -2)
+            valid = ((neiGrainID != grainID) & (grainID >= 0) &
+                     (neiGrainID >= 0))
+
+            grainIDs.append(grainID[valid])
+            neiGrainIDs.append(neiGrainID[valid])
+            xLocs.append(xLoc[valid])
+            yLocs.append(yLoc[valid])
+            kinds.append(np.full(np.count_nonzero(valid), i))
+        grainIDs = np.concatenate(grainIDs)
+        neiGrainIDs = np.concatenate(neiGrainIDs)
+        xLocs = np.concatenate(xLocs)
+        yLocs = np.concatenate(yLocs)
+        kinds = np.concatenate(kinds)
+        yield 0.2
+
+        # identify the pair of grains for each point, independent of
+        # which side of the boundary the point is on
+        pairKeys = (np.minimum(grainIDs, neiGrainIDs) * len(self) +
+                    np.maximum(grainIDs, neiGrainIDs))
+        _, pairFirst, pairIdx = np.unique(pairKeys, return_index=True,
+                                          return_inverse=True)
+        pairIdx = pairIdx.ravel()
+        numPairs = len(pairFirst)
+
+        # first grain of a segment is the grain containing the first
+        # point found on the boundary
+        ownerGrain1 = grainIDs == grainIDs[pairFirst][pairIdx]
+
+        # sort points by pair then kind, keeping raster order
+        pointOrder = np.lexsort((kinds, pairIdx))
+        groupOffsets = np.zeros(2 * numPairs + 1, dtype=int)
+        np.cumsum(np.bincount(2 * pairIdx + kinds, minlength=2 * numPairs),
+                  out=groupOffsets[1:])
+        points = list(zip(xLocs[pointOrder].tolist(),
+                          yLocs[pointOrder].tolist()))
+        owners = ownerGrain1[pointOrder].tolist()
+        yield 0.4
+
+        # create segments in the order the pairs are first found
+        edges = []
+        for iPair, k in enumerate(np.argsort(pairFirst).tolist()):
+            grain = self[grainIDs[pairFirst[k]]]
+            neiGrain = self[neiGrainIDs[pairFirst[k]]]
+            bSeg = BoundarySegment(self, grain, neiGrain)
+            for kind in (0, 1):
+                start, end = groupOffsets[2 * k + kind:2 * k + kind + 2]
+                bSeg.addBoundaryPoints(points[start:end], kind,
+                                       owners[start:end])
+            edges.append((grain, neiGrain, {'boundary': bSeg}))
+
+            yield 0.4 + 0.6 * (iPair + 1) / numPairs
+
+        nn.add_edges_from(edges)
 
         self.neighbourNetwork = nn
 
@@ -923,6 +1342,7 @@ class Map(base.Map):
 
         return plot
 
+    @cacheResults('grains', restore='_buildFoundGrains', record=True)
     @reportProgress("finding grains")
     def findGrains(self, minGrainSize=10):
         """Find grains and assign IDs.
@@ -933,51 +1353,28 @@ class Map(base.Map):
             Minimum grain area in pixels.
 
         """
-        # Initialise the grain map
-        # TODO: Look at grain map compared to boundary map
-        # self.grains = np.copy(self.boundaries)
-        self.grains = np.zeros_like(self.boundaries)
-
+        # Label connected regions of indexed points that are not
+        # separated by a boundary
+        grains, _ = labelConnected(self.phaseArray != 0,
+                                   boundariesX=self.boundariesX,
+                                   boundariesY=self.boundariesY,
+                                   tileSize=self.tileSize)
+        yield 0.5
+
+        # if grain size less than minimum, ignore grain and set values
+        # in grain map to -2
+        self.grains, numGrains = removeSmallLabels(grains, minGrainSize)
+
+        # Build grain objects, with points stored in the map in raster
+        # order
+        self.buildGrainStorage(numGrains)
         self.grainList = []
+        for i in range(numGrains):
+            currentGrain = Grain(i, self)
+            currentGrain.storageID = i
+            self.grainList.append(currentGrain)
 
-        # List of points where no grain has be set yet
-        points_left = self.phaseArray != 0
-        total_points = points_left.sum()
-        found_point = 0
-        next_point = points_left.tobytes().find(b'\x01')
-
-        # Start counter for grains
-        grainIndex = 1
-
-        # Loop until all points (except boundaries) have been assigned
-        # to a grain or ignored
-        i = 0
-        while found_point >= 0:
-            # Flood fill first unknown point and return grain object
-            idx = np.unravel_index(next_point, self.grains.shape)
-            currentGrain = self.floodFill(idx[1], idx[0], grainIndex,
-                                          points_left)
-
-            if len(currentGrain) < minGrainSize:
-                # if grain size less than minimum, ignore grain and set
-                # values in grain map to -2
-                for coord in currentGrain.coordList:
-                    self.grains[coord[1], coord[0]] = -2
-            else:
-                # add grain to list and increment grain index
-                self.grainList.append(currentGrain)
-                grainIndex += 1
-
-            # find next search point
-            points_left_sub = points_left.reshape(-1)[next_point + 1:]
-            found_point = points_left_sub.tobytes().find(b'\x01')
-            next_point += found_point + 1
-
-            # report progress
-            i += 1
-            if i == defaults['find_grain_report_freq']:
-                yield 1. - points_left_sub.sum() / total_points
-                i = 0
+            yield 0.5 + 0.5 * (i + 1) / numGrains
 
         # Assign phase to each grain
         for grain in self:
@@ -1017,99 +1414,146 @@ class Map(base.Map):
 
         return plot
 
-    def floodFill(self, x, y, grainIndex, points_left):
-        """Flood fill algorithm that uses the x and y boundary arrays to
-        fill a connected area around the seed point. The points are inserted
-        into a grain object and the grain map array is updated.
+    @reportProgress("calculating grain mean orientations")
+    def calcGrainMeanOris(self, method='mean', numIters=1):
+        """Calculate the mean orientation of all grains at once. The
+        symmetric equivalent of each point closest to a seed orientation
+        of its grain (initially the first point in the grain) is taken
+        and these are averaged over each grain.
 
         Parameters
         ----------
-        x : int
-            Seed point x for flood fill
-        y : int
-            Seed point y for flood fill
-        grainIndex : int
-            Value to fill in grain map
-        points_left : numpy.ndarray
-            Boolean map of the points that have not been assigned a grain yet
+        method : str, {'mean', 'eigen'}
+            'mean' for the normalised sum of the points in each grain
+            or 'eigen' for the principal eigenvector of the sum of the
+            outer products of the points, which is insensitive to the
+            sign of each point.
+        numIters : int
+            Number of times to refine the mean by reducing points
+            toward the previous mean rather than the seed.
 
         Returns
         -------
-        currentGrain : defdap.ebsd.Grain
-            New grain object with points added
-        """
-        # create new grain
-        currentGrain = Grain(grainIndex - 1, self)
-
-        # add first point to the grain
-        currentGrain.addPoint((x, y), self.quatArray[y, x])
-        self.grains[y, x] = grainIndex
-        points_left[y, x] = False
-        edge = [(x, y)]
-
-        while edge:
-            x, y = edge.pop(0)
-
-            moves = [(x+1, y), (x-1, y), (x, y+1), (x, y-1)]
-            # get rid of any that go out of the map area
-            if x <= 0:
-                moves.pop(1)
-            elif x >= self.xDim - 1:
-                moves.pop(0)
-            if y <= 0:
-                moves.pop(-1)
-            elif y >= self.yDim - 1:
-                moves.pop(-2)
-
-            for (s, t) in moves:
-                if self.grains[t, s] > 0:
+        numpy.ndarray
+            Mean orientation quaternion components of each grain, shape
+            (numGrains, 4).
+
+        """
+        if method not in ('mean', 'eigen'):
+            raise ValueError("method must be 'mean' or 'eigen'.")
+
+        # Check that grains have been detected in the map
+        self.checkGrainsDetected()
+
+        numGrains = len(self)
+        grainStarts = self.grainOffsets[:-1]
+        pointGrain = np.repeat(np.arange(numGrains),
+                               np.diff(self.grainOffsets))
+        yLocs = self.grainPoints[:, 1]
+        xLocs = self.grainPoints[:, 0]
+        quats = self.quatArray[yLocs, xLocs]
+        pointPhase = self.phaseArray[yLocs, xLocs]
+
+        # seed each grain with its first point
+        meanComps = quats.quatCoef[:, grainStarts]
+
+        quatCompsSym = np.empty_like(quats.quatCoef)
+        for i in range(numIters + 1):
+            # symmetric equivalent of each point closest to the current
+            # mean of its grain, on the same side of the hypersphere
+            refComps = meanComps[:, pointGrain]
+            for phaseID, phase in enumerate(self.phases, start=1):
+                phaseMask = pointPhase == phaseID
+                if not phaseMask.any():
                     continue
+                symGroup = phase.crystalStructure.name
+                refQuats = QuatArray(refComps[:, phaseMask],
+                                     allow_southern=True, copy=False)
+                _, symIdx = refQuats.misOriSymIdx(quats[phaseMask], symGroup)
+                quatCompsSym[:, phaseMask] = quats[phaseMask].applySym(
+                    symGroup, symIdx
+                ).quatCoef
+            sign = np.sign(np.einsum('ij,ij->j', refComps, quatCompsSym))
+            quatCompsSym *= np.where(sign == 0, 1, sign)
+
+            # sum over each grain
+            meanComps = np.stack([
+                np.bincount(pointGrain, weights=comps, minlength=numGrains)
+                for comps in quatCompsSym
+            ])
+            meanComps /= np.sqrt(np.einsum('ij,ij->j', meanComps, meanComps))
+
+            yield (i + 1) / (numIters + 2)
+
+        if method == 'eigen':
+            # principal eigenvector of the sum of outer products
+            outerSum = np.empty((numGrains, 4, 4))
+            for j in range(4):
+                for k in range(j, 4):
+                    outerSum[:, j, k] = np.bincount(
+                        pointGrain, weights=quatCompsSym[j] * quatCompsSym[k],
+                        minlength=numGrains
+                    )
+                    outerSum[:, k, j] = outerSum[:, j, k]
+            _, eigVecs = np.linalg.eigh(outerSum)
+            meanComps = eigVecs[:, :, -1].T
 
-                addPoint = False
+        # northern hemisphere
+        meanComps[:, meanComps[0] < 0] *= -1
 
-                if t == y:
-                    # moving horizontally
-                    if s > x:
-                        # moving right
-                        addPoint = not self.boundariesX[y, x]
-                    else:
-                        # moving left
-                        addPoint = not self.boundariesX[t, s]
-                else:
-                    # moving vertically
-                    if t > y:
-                        # moving down
-                        addPoint = not self.boundariesY[y, x]
-                    else:
-                        # moving up
-                        addPoint = not self.boundariesY[t, s]
+        yield 1.
 
-                if addPoint:
-                    currentGrain.addPoint((s, t), self.quatArray[t, s])
-                    self.grains[t, s] = grainIndex
-                    points_left[t, s] = False
-                    edge.append((s, t))
+        return meanComps.T
 
-        return currentGrain
+    def calcGrainAvOris(self, method='mean', numIters=1):
+        """Calculate the average orientation of grains and store as the
+        reference orientation of each grain.
 
-    @reportProgress("calculating grain mean orientations")
-    def calcGrainAvOris(self):
-        """Calculate the average orientation of grains.
+        Parameters
+        ----------
+        method : str, {'mean', 'eigen'}
+            Averaging method, see :func:`calcGrainMeanOris`.
+        numIters : int
+            Number of refinement iterations, see
+            :func:`calcGrainMeanOris`.
+
+        """
+        meanOris = self.calcGrainMeanOris(method=method, numIters=numIters)
+
+        for grain, meanOri in zip(self, meanOris):
+            grain.refOri = Quat(meanOri)
+
+    def grainRefOris(self):
+        """Reference orientations of all grains, calculating the mean
+        orientation of any grains without one.
+
+        Returns
+        -------
+        numpy.ndarray
+            Reference orientation quaternion components of each grain,
+            shape (numGrains, 4).
 
         """
         # Check that grains have been detected in the map
         self.checkGrainsDetected()
 
-        numGrains = len(self)
-        for iGrain, grain in enumerate(self):
-            grain.calcAverageOri()
+        if any(grain.refOri is None for grain in self):
+            meanOris = self.calcGrainMeanOris()
+            for grain, meanOri in zip(self, meanOris):
+                if grain.refOri is None:
+                    grain.refOri = Quat(meanOri)
 
-            # report progress
-            yield (iGrain + 1) / numGrains
+        return np.array([grain.refOri.quatCoef for grain in self])
 
+    @cacheResults('misOri', 'misOriAxis', 'GOS',
+                  restore='_buildGrainMisOriViews', keyArrays='grainRefOris')
     @reportProgress("calculating grain misorientations")
     def calcGrainMisOri(self, calcAxis=False):
-        """Calculate the misorientation within grains.
+        """Calculate the misorientation of every point in a grain to the
+        reference orientation of the grain (GROD), the mean over each
+        grain (GOS) and optionally the misorientation axis. Results are
+        written to the `misOri`, `misOriAxis` and `GOS` attributes of
+        the map and to each grain.
 
         Parameters
         ----------
@@ -1120,12 +1564,72 @@ class Map(base.Map):
         # Check that grains have been detected in the map
         self.checkGrainsDetected()
 
+        refOris = self.grainRefOris()
+        yield 0.2
+
         numGrains = len(self)
-        for iGrain, grain in enumerate(self):
-            grain.buildMisOriList(calcAxis=calcAxis)
+        grainSizes = np.diff(self.grainOffsets)
+        pointGrain = np.repeat(np.arange(numGrains), grainSizes)
+        yLocs = self.grainPoints[:, 1]
+        xLocs = self.grainPoints[:, 0]
+        quats = self.quatArray[yLocs, xLocs]
+        pointPhase = self.phaseArray[yLocs, xLocs]
+        refQuats = QuatArray(refOris.T, allow_southern=True,
+                             copy=False)[pointGrain]
+
+        # Minimum misorientation of each point to its grain reference
+        # and the symmetric equivalent giving it
+        misOri = np.ones(len(pointGrain))
+        minQuatComps = quats.quatCoef.copy()
+        for phaseID, phase in enumerate(self.phases, start=1):
+            phaseMask = pointPhase == phaseID
+            if not phaseMask.any():
+                continue
+            symGroup = phase.crystalStructure.name
+            misOri[phaseMask], symIdx = refQuats[phaseMask].misOriSymIdx(
+                quats[phaseMask], symGroup
+            )
+            if calcAxis:
+                minQuatComps[:, phaseMask] = quats[phaseMask].applySym(
+                    symGroup, symIdx
+                ).quatCoef
+        yield 0.6
+
+        self.misOri = np.ones(self.shape)
+        self.misOri[yLocs, xLocs] = misOri
+        self.GOS = np.bincount(
+            pointGrain, weights=np.rad2deg(2 * np.arccos(misOri)),
+            minlength=numGrains
+        ) / grainSizes
+        averageMisOri = np.bincount(pointGrain, weights=misOri,
+                                    minlength=numGrains) / grainSizes
+
+        if calcAxis:
+            # minQuat * refOri^-1 for all points, as a rotation vector
+            Dq = QuatArray.quatProduct(minQuatComps,
+                                       refQuats.conjugate.quatCoef)
+            Dq[:, Dq[0] < 0] *= -1
+            np.minimum(Dq[0], 1, out=Dq[0])
+            sinHalfAngle = np.sqrt(1 - np.square(Dq[0]))
+            misOriAxis = np.zeros((3, len(pointGrain)))
+            np.divide(2 * Dq[1:4] * np.arccos(Dq[0]), sinHalfAngle,
+                      out=misOriAxis, where=sinHalfAngle > 0)
+
+            self.misOriAxis = np.zeros((3,) + self.shape)
+            self.misOriAxis[:, yLocs, xLocs] = misOriAxis
+            misOriAxis = misOriAxis.T
+        else:
+            self.misOriAxis = None
 
-            # report progress
-            yield (iGrain + 1) / numGrains
+        # Store views of the results in each grain
+        for grain, start, end, avMisOri in zip(
+            self, self.grainOffsets[:-1], self.grainOffsets[1:], averageMisOri
+        ):
+            grain.misOriList = misOri[start:end]
+            grain.misOriAxisList = misOriAxis[start:end] if calcAxis else None
+            grain.averageMisOri = avMisOri
+
+        yield 1.
 
     def plotMisOriMap(self, component=0, **kwargs):
         """Plot misorientation map.
@@ -1145,29 +1649,21 @@ class Map(base.Map):
         # Check that grains have been detected in the map
         self.checkGrainsDetected()
 
-        self.misOri = np.ones([self.yDim, self.xDim])
-
         if component in [1, 2, 3]:
             # Calculate misorientation axis if not calculated
-            if np.any([grain.misOriAxisList is None for grain in self.grainList]):
-                self.calcGrainMisOri(calcAxis = True)
-            for grain in self.grainList:
-                for coord, misOriAxis in zip(grain.coordList, np.array(grain.misOriAxisList)):
-                    self.misOri[coord[1], coord[0]] = misOriAxis[component - 1]
+            if self.misOriAxis is None:
+                self.calcGrainMisOri(calcAxis=True)
 
-            misOri = self.misOri * 180 / np.pi
+            misOri = np.rad2deg(self.misOriAxis[component - 1])
             clabel = "Rotation around {:} axis ($^\circ$)".format(
                 ['X', 'Y', 'Z'][component-1]
             )
         else:
             # Calculate misorientation if not calculated
-            if np.any([grain.misOriList is None for grain in self.grainList]):
-                self.calcGrainMisOri(calcAxis = False)
-            for grain in self.grainList:
-                for coord, misOri in zip(grain.coordList, grain.misOriList):
-                    self.misOri[coord[1], coord[0]] = misOri
+            if self.misOri is None:
+                self.calcGrainMisOri(calcAxis=False)
 
-            misOri = np.arccos(self.misOri) * 360 / np.pi
+            misOri = np.rad2deg(2 * np.arccos(self.misOri))
             clabel = "Grain reference orienation deviation (GROD) ($^\circ$)"
 
         # Set default plot parameters then update with any input
@@ -1185,26 +1681,271 @@ class Map(base.Map):
     def calcAverageGrainSchmidFactors(self, loadVector, slipSystems=None):
         """
         Calculates Schmid factors for all slip systems, for all grains,
-        based on average grain orientation.
+        based on average grain orientation. Results are stored in
+        `grainSchmidFactors` and grouped by slip plane in each grain.
 
         Parameters
         ----------
         loadVector :
-            Loading vector, e.g. [1, 0, 0].
+            Loading vector, e.g. [1, 0, 0]. A stress tensor (3x3) in
+            sample coordinates can be given instead, then the magnitude
+            of the resolved shear stress is calculated.
         slipSystems : list, optional
-            Slip planes to calculate Schmid factor for, maximum of all
-            planes calculated if not given.
+            Slip systems to calculate Schmid factor for, the slip systems
+            of the phase of each grain if not given.
+
+        Returns
+        -------
+        numpy.ndarray
+            Schmid factor of each slip system of each grain, shape
+            (numGrains, numSlipSystems). NaN for slip systems not in the
+            phase of a grain.
 
         """
         # Check that grains have been detected in the map
         self.checkGrainsDetected()
 
+        refOris = self.grainRefOris()
+        grainPhases = self.grainPhases()
+        yield 0.2
+
+        phaseSlipSystems, phaseSchmidTensors = self.phaseSchmidTensors(
+            slipSystems
+        )
+
         numGrains = len(self)
-        for iGrain, grain in enumerate(self.grainList):
-            grain.calcAverageSchmidFactors(loadVector, slipSystems=slipSystems)
+        numSlipSystems = max(len(st) for st in phaseSchmidTensors)
+        schmidFactors = np.full((numGrains, numSlipSystems), np.nan)
+        for phaseID, schmidTensors in enumerate(phaseSchmidTensors,
+                                                start=1):
+            grainMask = grainPhases == phaseID
+            schmidFactors[grainMask, :len(schmidTensors)] = np.abs(
+                SlipSystem.calcResolvedShearStress(
+                    refOris[grainMask], loadVector, schmidTensors
+                )
+            )
+        yield 0.6
+
+        self.grainSchmidFactors = schmidFactors
+        self.grainSchmidFactorSlipSystems = phaseSlipSystems
+
+        # Store in each grain grouped by slip plane
+        phaseGroupEnds = [
+            None if ss is None else
+            np.cumsum([1 if isinstance(ssGroup, SlipSystem)
+                       else len(ssGroup) for ssGroup in ss])
+            for ss in phaseSlipSystems
+        ]
+        for grain, grainSF, phaseID in zip(self, schmidFactors.tolist(),
+                                           grainPhases):
+            groupEnds = phaseGroupEnds[phaseID - 1]
+            if groupEnds is None:
+                grain.averageSchmidFactors = None
+                continue
+            grain.averageSchmidFactors = [
+                grainSF[start:end] for start, end
+                in zip(np.concatenate(([0], groupEnds[:-1])), groupEnds)
+            ]
+
+        yield 1.
+
+        return schmidFactors
+
+    def phaseSchmidTensors(self, slipSystems=None):
+        """Slip systems and stacked Schmid tensors to use for each phase.
+
+        Parameters
+        ----------
+        slipSystems : list, optional
+            Slip systems to use for all phases, the slip systems of each
+            phase if not given.
 
-            # report progress
-            yield (iGrain + 1) / numGrains
+        Returns
+        -------
+        list
+            Slip systems of each phase.
+        list of numpy.ndarray
+            Schmid tensors of each phase, shape (numSlipSystems, 3, 3).
+
+        """
+        if slipSystems is None:
+            phaseSlipSystems = [phase.slipSystems for phase in self.phases]
+        else:
+            phaseSlipSystems = [slipSystems] * self.numPhases
+        phaseSchmidTensors = [
+            np.empty((0, 3, 3)) if ss is None
+            else SlipSystem.stackSchmidTensors(ss)
+            for ss in phaseSlipSystems
+        ]
+
+        return phaseSlipSystems, phaseSchmidTensors
+
+    def schmidFactorChunks(self, loadVector, slipSystems=None,
+                           chunkSize=None, signed=False):
+        """Generator of Schmid factors of all slip systems at every point
+        in the map, in chunks of rows. Use to stream results to disk or
+        reduce them without holding the full result in memory.
+
+        Parameters
+        ----------
+        loadVector : numpy.ndarray
+            Loading vector, e.g. [1, 0, 0], or a stress tensor (3x3) in
+            sample coordinates to calculate resolved shear stress.
+        slipSystems : list, optional
+            Slip systems to use for all phases, the slip systems of the
+            phase of each point if not given.
+        chunkSize : int, optional
+            Number of map rows in each chunk. Chunks of about 1 million
+            points by default.
+        signed : bool
+            Return the signed resolved shear stress rather than its
+            magnitude.
+
+        Yields
+        ------
+        slice
+            Rows of the map in the chunk.
+        numpy.ndarray
+            Schmid factors, shape (numSlipSystems, rows, xDim). NaN at
+            non-indexed points and for slip systems not in the phase of
+            a point.
+
+        """
+        self.buildQuatArray()
+        ySize, xSize = self.shape
+        if chunkSize is None:
+            chunkSize = 2**20 // xSize
+        chunkSize = max(int(chunkSize), 1)
+
+        _, phaseSchmidTensors = self.phaseSchmidTensors(slipSystems)
+        numSlipSystems = max(len(st) for st in phaseSchmidTensors)
+
+        for rowStart in range(0, ySize, chunkSize):
+            rows = slice(rowStart, min(rowStart + chunkSize, ySize))
+            quats = self.quatArray[rows]
+            phases = self.phaseArray[rows]
+
+            schmidFactors = np.full((numSlipSystems,) + phases.shape, np.nan)
+            for phaseID, schmidTensors in enumerate(phaseSchmidTensors,
+                                                    start=1):
+                phaseMask = phases == phaseID
+                if len(schmidTensors) == 0 or not phaseMask.any():
+                    continue
+                rss = SlipSystem.calcResolvedShearStress(
+                    quats[phaseMask], loadVector, schmidTensors
+                )
+                schmidFactors[:len(schmidTensors), phaseMask] = (
+                    rss.T if signed else np.abs(rss.T)
+                )
+
+            yield rows, schmidFactors
+
+    @reportProgress("calculating Schmid factor maps")
+    def calcSchmidFactorMaps(self, loadVector, slipSystems=None,
+                             reduce=None, k=3, signed=False, out=None,
+                             chunkSize=None):
+        """Calculate Schmid factor maps for all slip systems, based on
+        the orientation at each point. The maps can be reduced over the
+        slip systems as they are calculated.
+
+        Parameters
+        ----------
+        loadVector : numpy.ndarray
+            Loading vector, e.g. [1, 0, 0], or a stress tensor (3x3) in
+            sample coordinates to calculate resolved shear stress.
+        slipSystems : list, optional
+            Slip systems to use for all phases, the slip systems of the
+            phase of each point if not given.
+        reduce : str, {None, 'max', 'topk'}
+            None to return maps for all slip systems, 'max' for the
+            maximum over the slip systems and the slip system giving it
+            or 'topk' for the `k` largest and their slip systems.
+        k : int
+            Number of slip systems to keep with 'topk'.
+        signed : bool
+            Return the signed resolved shear stress. Reductions are
+            always of the magnitude.
+        out : numpy.ndarray, optional
+            Array to write the full result to when not reducing, for
+            example a :class:`numpy.memmap` to stream to disk. Shape
+            (numSlipSystems, yDim, xDim).
+        chunkSize : int, optional
+            Number of map rows to process at a time, see
+            :func:`schmidFactorChunks`.
+
+        Returns
+        -------
+        numpy.ndarray
+            Schmid factors, shape (numSlipSystems, yDim, xDim), (yDim,
+            xDim) for 'max' or (k, yDim, xDim) for 'topk'.
+        numpy.ndarray
+            Only when reducing. Index of the slip system of each value,
+            in the order of the slip systems flattened, -1 where there
+            is no value.
+
+        """
+        if reduce not in (None, 'max', 'topk'):
+            raise ValueError("reduce must be None, 'max' or 'topk'.")
+
+        _, phaseSchmidTensors = self.phaseSchmidTensors(slipSystems)
+        numSlipSystems = max(len(st) for st in phaseSchmidTensors)
+        mapShape = self.shape
+
+        if reduce is None:
+            outShape = (numSlipSystems,) + mapShape
+            if out is None:
+                out = np.empty(outShape)
+            elif out.shape != outShape:
+                raise ValueError(f"out must have shape {outShape}.")
+            values = out
+        else:
+            k = 1 if reduce == 'max' else min(int(k), numSlipSystems)
+            values = np.empty((k,) + mapShape)
+            systems = np.empty((k,) + mapShape, dtype=int)
+
+        for rows, schmidFactors in self.schmidFactorChunks(
+            loadVector, slipSystems=slipSystems, chunkSize=chunkSize,
+            signed=signed
+        ):
+            if reduce is None:
+                values[:, rows] = schmidFactors
+            else:
+                # rank slip systems by magnitude, NaN last
+                magnitude = np.abs(schmidFactors)
+                magnitude[np.isnan(magnitude)] = -np.inf
+                if k == 1:
+                    order = np.argmax(magnitude, axis=0)[np.newaxis]
+                else:
+                    order = np.argsort(-magnitude, axis=0, kind='stable')[:k]
+                chunkValues = np.take_along_axis(schmidFactors, order, axis=0)
+                order[np.isnan(chunkValues)] = -1
+                values[:, rows] = chunkValues
+                systems[:, rows] = order
+
+            yield rows.stop / mapShape[0]
+
+        if reduce is None:
+            return values
+        if reduce == 'max':
+            return values[0], systems[0]
+        return values, systems
+
+    def grainPhases(self):
+        """Phase ID of each grain, taken from the first point in the
+        grain. Phase IDs start at 1, as in `phaseArray`.
+
+        Returns
+        -------
+        numpy.ndarray
+            Phase ID of each grain.
+
+        """
+        # Check that grains have been detected in the map
+        self.checkGrainsDetected()
+
+        firstPoints = self.grainPoints[self.grainOffsets[:-1]]
+
+        return self.phaseArray[firstPoints[:, 1], firstPoints[:, 0]]
 
     def plotAverageGrainSchmidFactorsMap(self, planes=None, directions=None,
                                          **kwargs):
@@ -1239,33 +1980,33 @@ class Map(base.Map):
         # Check that grains have been detected in the map
         self.checkGrainsDetected()
 
-        if self[0].averageSchmidFactors is None:
+        if self.grainSchmidFactors is None:
             raise Exception("Run 'calcAverageGrainSchmidFactors' first")
 
-        grains_sf = []
-        for grain in self.grainList:
-            current_sf = []
-
-            if planes is not None:
-                for plane in planes:
-                    if directions is not None:
-                        for direction in directions:
-                            current_sf.append(
-                                grain.averageSchmidFactors[plane][direction]
-                            )
-                    else:
-                        current_sf += grain.averageSchmidFactors[plane]
-            else:
-                for sf_group in grain.averageSchmidFactors:
-                    current_sf += sf_group
+        # Select slip systems to consider for each phase
+        schmidFactors = self.grainSchmidFactors
+        selected = np.zeros((self.numPhases, schmidFactors.shape[1]),
+                            dtype=bool)
+        for i, ss in enumerate(self.grainSchmidFactorSlipSystems):
+            if ss is None:
+                continue
+            groupSizes = [1 if isinstance(ssGroup, SlipSystem)
+                          else len(ssGroup) for ssGroup in ss]
+            groupStarts = np.concatenate(([0], np.cumsum(groupSizes)))
+            for plane in range(len(ss)) if planes is None else planes:
+                if directions is None:
+                    selected[i, groupStarts[plane]:groupStarts[plane + 1]] = True
+                else:
+                    selected[i, groupStarts[plane] + np.array(directions)] = True
 
-            grains_sf.append(current_sf)
+        selected = selected[self.grainPhases() - 1]
+        grainsMaxSF = np.where(selected, schmidFactors, -np.inf).max(axis=1)
 
-        grains_sf = np.array(grains_sf)
-        grains_sf_max = np.max(grains_sf, axis=1)
+        # Fill the grain map with the maximum Schmid factor of each grain
+        grainMap = np.where(self.grains > 0,
+                            grainsMaxSF[np.maximum(self.grains, 1) - 1], 0.5)
 
-        plot = self.plotGrainDataMap(grainData=grains_sf_max, bg=0.5,
-                                     **plot_params)
+        plot = MapPlot.create(self, grainMap, **plot_params)
 
         return plot
 
@@ -1285,12 +2026,13 @@ class Grain(base.Grain):
 
     phase : defdap.crystal.Phase
 
-    quatList : list
-        List of quats.
-    misOriList : list
+    quatList : list or defdap.quat.QuatArray
+        List of quats. Gathered from the owner map orientations if the
+        grain points are stored in the map.
+    misOriList : numpy.ndarray
         MisOri at each point in grain.
-    misOriAxisList : list
-        MisOri axes at each point in grain.
+    misOriAxisList : numpy.ndarray
+        MisOri axes at each point in grain, shape (numPoints, 3).
     refOri : defdap.quat.Quat
         Average ori of grain
     averageMisOri
@@ -1308,7 +2050,7 @@ class Grain(base.Grain):
         super(Grain, self).__init__(grainID, ebsdMap)
 
         self.ebsdMap = self.ownerMap            # ebsd map this grain is a member of
-        self.quatList = []                      # list of quats
+        self._quatList = []                     # list of quats
         self.misOriList = None                  # list of misOri at each point in grain
         self.misOriAxisList = None              # list of misOri axes at each point in grain
         self.refOri = None                      # (quat) average ori of grain
@@ -1324,6 +2066,17 @@ class Grain(base.Grain):
             *args, **kwargs
         )
 
+    @property
+    def quatList(self):
+        if self.storageID is None:
+            return self._quatList
+        coords = self.coordList
+        return self.ebsdMap.quatArray[coords[:, 1], coords[:, 0]]
+
+    @quatList.setter
+    def quatList(self, value):
+        self._quatList = value
+
     @property
     def crystalSym(self):
         """Temporary"""
@@ -1340,7 +2093,7 @@ class Grain(base.Grain):
             Quaternion to append.
 
         """
-        self.coordList.append(coord)
+        super(Grain, self).addPoint(coord)
         self.quatList.append(quat)
 
     def calcAverageOri(self):
@@ -1368,7 +2121,7 @@ class Grain(base.Grain):
         misOriArray, minQuatComps = Quat.calcMisOri(quatCompsSym, self.refOri)
 
         self.averageMisOri = misOriArray.mean()
-        self.misOriList = list(misOriArray)
+        self.misOriList = misOriArray
 
         if calcAxis:
             # Now for axis calulation
@@ -1396,11 +2149,7 @@ class Grain(base.Grain):
             # numpy broadcasting taking care of different array sizes
             misOriAxis[:, :] = (2 * Dq[1:4, :] * np.arccos(Dq[0, :])) / np.sqrt(1 - np.power(Dq[0, :], 2))
 
-            # hack it back into a list. Need to change self.*List to be arrays, it was a bad decision to
-            # make them lists in the beginning
-            self.misOriAxisList = []
-            for row in misOriAxis.transpose():
-                self.misOriAxisList.append(row)
+            self.misOriAxisList = misOriAxis.T
 
     def plotRefOri(self, direction=np.array([0, 0, 1]), **kwargs):
         """Plot the average grain orientation on an IPF.
@@ -1523,24 +2272,19 @@ class Grain(base.Grain):
         if self.refOri is None:
             self.calcAverageOri()
 
-        # orientation of grain
-        grainAvOri = self.refOri
-
-        # Transform the load vector into crystal coordinates
-        loadVectorCrystal = grainAvOri.transformVector(loadVector)
+        # Resolve the load onto all slip systems at once then group by
+        # slip plane
+        schmidFactors = np.abs(SlipSystem.calcResolvedShearStress(
+            self.refOri.quatCoef, loadVector,
+            SlipSystem.stackSchmidTensors(slipSystems)
+        )).tolist()
 
         self.averageSchmidFactors = []
-        # flatten list of lists
-        # slipSystems = chain.from_iterable(slipSystems)
-
-        # Loop over groups of slip systems with same slip plane
-        for i, slipSystemGroup in enumerate(slipSystems):
-            self.averageSchmidFactors.append([])
-            # Then loop over individual slip systems
-            for slipSystem in slipSystemGroup:
-                schmidFactor = abs(np.dot(loadVectorCrystal, slipSystem.slipPlane) *
-                                   np.dot(loadVectorCrystal, slipSystem.slipDir))
-                self.averageSchmidFactors[i].append(schmidFactor)
+        start = 0
+        for slipSystemGroup in slipSystems:
+            end = start + len(slipSystemGroup)
+            self.averageSchmidFactors.append(schmidFactors[start:end])
+            start = end
 
         return
 
@@ -1667,6 +2411,28 @@ class BoundarySegment(object):
         else:
             raise ValueError("Boundary point kind is 0 for x and 1 for y")
 
+    def addBoundaryPoints(self, points, kind, ownerGrain1):
+        """Append many boundary points to the segment.
+
+        Parameters
+        ----------
+        points : list of tuple
+            (x, y) coordinates of the boundary points.
+        kind : int
+            0 for points on x boundaries and 1 for y boundaries.
+        ownerGrain1 : list of bool
+            True for each point in grain1 and False if in grain2.
+
+        """
+        if kind == 0:
+            self.boundaryPointsX.extend(points)
+            self.boundaryPointOwnersX.extend(ownerGrain1)
+        elif kind == 1:
+            self.boundaryPointsY.extend(points)
+            self.boundaryPointOwnersY.extend(ownerGrain1)
+        else:
+            raise ValueError("Boundary point kind is 0 for x and 1 for y")
+
     def boundaryPointPairs(self, kind):
         """Return pairs of points either side of the boundary. The first
         point is always in grain1
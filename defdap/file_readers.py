@@ -17,11 +17,14 @@ import numpy as np
 import pandas as pd
 import pathlib
 import re
+import json
 
-from typing import TextIO, Dict, List, Callable, Any, Type, Optional
+from typing import (TextIO, Dict, List, Callable, Any, Type, Optional,
+                    Tuple)
 
 from defdap.crystal import Phase
 from defdap.quat import Quat
+from defdap.utils import reportProgress
 
 
 class EBSDDataLoader(object):
@@ -41,6 +44,8 @@ class EBSDDataLoader(object):
             'eulerAngle': None,
             'bandContrast': None
         }
+        self.loadedDerived = {}
+        self.sourceFiles = []
         self.dataFormat = None
 
     @staticmethod
@@ -54,6 +59,8 @@ class EBSDDataLoader(object):
             return OxfordTextLoader()
         elif dataType == "PythonDict":
             return PythonDictLoader()
+        elif dataType == "DefDAP":
+            return DefdapLoader()
         else:
             raise ValueError(f"No loader for EBSD data of type {dataType}.")
 
@@ -78,7 +85,8 @@ class OxfordTextLoader(EBSDDataLoader):
     def load(
         self,
         fileName: str,
-        fileDir: str = ""
+        fileDir: str = "",
+        chunkSize: Optional[int] = None
     ) -> None:
         """ Read an Oxford Instruments .ctf file, which is a HKL single
         orientation file.
@@ -89,6 +97,8 @@ class OxfordTextLoader(EBSDDataLoader):
             File name.
         fileDir
             Path to file.
+        chunkSize
+            Number of rows of the data table to parse at a time.
 
         Returns
         -------
@@ -101,6 +111,7 @@ class OxfordTextLoader(EBSDDataLoader):
         filePath = pathlib.Path(fileDir) / pathlib.Path(fileName)
         if not filePath.is_file():
             raise FileNotFoundError("Cannot open file {}".format(filePath))
+        self.sourceFiles.append(filePath)
 
         def parsePhase() -> Phase:
             lineSplit = line.split('\t')
@@ -170,7 +181,8 @@ class OxfordTextLoader(EBSDDataLoader):
             'BS': ('BS', 'uint8'),      # Band Slope
         }
 
-        keepColNames = ('phase', 'ph1', 'phi', 'ph2', 'BC', 'BS', 'MAD')
+        keepColNames = ('phase', 'ph1', 'phi', 'ph2', 'BC', 'BS', 'MAD',
+                        'numBands')
         dataFormat = []
         loadCols = []
         try:
@@ -183,39 +195,96 @@ class OxfordTextLoader(EBSDDataLoader):
         self.dataFormat = np.dtype(dataFormat)
 
         # now read the data from file
-        binData = np.loadtxt(
-            str(filePath), self.dataFormat, usecols=loadCols,
-            skiprows=numHeaderLines
-        )
+        self.loadOxfordCTFData(filePath, numHeaderLines, loadCols,
+                               chunkSize=chunkSize)
 
-        self.loadedData['bandContrast'] = np.reshape(
-            binData['BC'], (yDim, xDim)
-        )
-        self.loadedData['bandSlope'] = np.reshape(
-            binData['BS'], (yDim, xDim)
-        )
-        self.loadedData['meanAngularDeviation'] = np.reshape(
-            binData['MAD'], (yDim, xDim)
-        )
-        self.loadedData['phase'] = np.reshape(
-            binData['phase'], (yDim, xDim)
+        self.checkData()
+
+    @reportProgress("reading EBSD data")
+    def loadOxfordCTFData(
+        self,
+        filePath: pathlib.Path,
+        numHeaderLines: int,
+        loadCols: List[int],
+        chunkSize: Optional[int] = None
+    ) -> None:
+        """Read the data table of an Oxford Instruments .ctf file in
+        chunks of rows, into arrays allocated for the whole map.
+
+        Parameters
+        ----------
+        filePath
+            Path to file.
+        numHeaderLines
+            Number of lines before the data table.
+        loadCols
+            Index of each column in the table to load, in the order of
+            the fields of `dataFormat`.
+        chunkSize
+            Number of rows to parse at a time. 2**18 if None.
+
+        """
+        xDim = self.loadedMetadata['xDim']
+        yDim = self.loadedMetadata['yDim']
+        numPoints = xDim * yDim
+        if chunkSize is None:
+            chunkSize = 2**18
+
+        fieldNames = self.dataFormat.names
+        colDtypes = {col: self.dataFormat[name]
+                     for col, name in zip(loadCols, fieldNames)}
+        columns = {name: np.empty(numPoints, dtype=self.dataFormat[name])
+                   for name in fieldNames if name not in ('ph1', 'phi', 'ph2')}
+        eulerAngles = np.empty((3, numPoints), dtype=float)
+        eulerRows = {'ph1': 0, 'phi': 1, 'ph2': 2}
+
+        reader = pd.read_csv(
+            str(filePath), sep='\t', header=None, skiprows=numHeaderLines,
+            usecols=loadCols, dtype=colDtypes, engine='c',
+            chunksize=chunkSize
         )
-        eulerAngles = np.reshape(
-            binData[['ph1', 'phi', 'ph2']], (yDim, xDim)
+        start = 0
+        with reader:
+            for chunk in reader:
+                end = start + len(chunk)
+                if end > numPoints:
+                    raise ValueError("More data points in EBSD file than "
+                                     "given by the map dimensions.")
+                for col, name in zip(loadCols, fieldNames):
+                    if name in eulerRows:
+                        eulerAngles[eulerRows[name], start:end] = chunk[col]
+                    else:
+                        columns[name][start:end] = chunk[col]
+                start = end
+
+                yield start / numPoints
+
+        if start != numPoints:
+            raise ValueError("Fewer data points in EBSD file than given by "
+                             "the map dimensions.")
+
+        self.loadedData['bandContrast'] = columns['BC'].reshape(yDim, xDim)
+        self.loadedData['bandSlope'] = columns['BS'].reshape(yDim, xDim)
+        self.loadedData['meanAngularDeviation'] = columns['MAD'].reshape(
+            yDim, xDim
         )
-        # flatten the structures so that the Euler angles are stored
-        # into a normal array
-        eulerAngles = np.array(eulerAngles.tolist()).transpose((2, 0, 1))
-        self.loadedData['eulerAngle'] = eulerAngles * np.pi / 180.
-
-        self.checkData()
+        self.loadedData['phase'] = columns['phase'].reshape(yDim, xDim)
+        if 'numBands' in columns:
+            self.loadedData['numBands'] = columns['numBands'].reshape(
+                yDim, xDim
+            )
+        eulerAngles *= np.pi
+        eulerAngles /= 180.
+        self.loadedData['eulerAngle'] = eulerAngles.reshape(3, yDim, xDim)
 
 
 class OxfordBinaryLoader(EBSDDataLoader):
     def load(
         self,
         fileName: str,
-        fileDir: str = ""
+        fileDir: str = "",
+        memmap: bool = False,
+        roi: Optional[Tuple[int, int, int, int]] = None
     ) -> None:
         """Read Oxford Instruments .cpr/.crc file pair.
 
@@ -225,6 +294,10 @@ class OxfordBinaryLoader(EBSDDataLoader):
             File name.
         fileDir
             Path to file.
+        memmap
+            If true, memory-map the .crc file instead of reading it.
+        roi
+            Region of interest to read, as (xMin, yMin, xMax, yMax).
 
         Returns
         -------
@@ -233,7 +306,7 @@ class OxfordBinaryLoader(EBSDDataLoader):
 
         """
         self.loadOxfordCPR(fileName, fileDir=fileDir)
-        self.loadOxfordCRC(fileName, fileDir=fileDir)
+        self.loadOxfordCRC(fileName, fileDir=fileDir, memmap=memmap, roi=roi)
 
     def loadOxfordCPR(self, fileName: str, fileDir: str = "") -> None:
         """
@@ -254,6 +327,7 @@ class OxfordBinaryLoader(EBSDDataLoader):
         filePath = pathlib.Path(fileDir) / pathlib.Path(fileName)
         if not filePath.is_file():
             raise FileNotFoundError("Cannot open file {}".format(filePath))
+        self.sourceFiles.append(filePath)
 
         # CPR file is split into groups, load each group into a
         # hierarchical dict
@@ -352,7 +426,13 @@ class OxfordBinaryLoader(EBSDDataLoader):
 
         self.dataFormat = np.dtype(dataFormat)
 
-    def loadOxfordCRC(self, fileName: str, fileDir: str = "") -> None:
+    def loadOxfordCRC(
+        self,
+        fileName: str,
+        fileDir: str = "",
+        memmap: bool = False,
+        roi: Optional[Tuple[int, int, int, int]] = None
+    ) -> None:
         """Read binary EBSD data from an Oxford Instruments .crc file
 
         Parameters
@@ -361,6 +441,15 @@ class OxfordBinaryLoader(EBSDDataLoader):
             File name.
         fileDir
             Path to file.
+        memmap
+            If true, memory-map the file instead of reading it. Data
+            fields are then read-only strided views into the file and
+            are only read from disk when accessed. Euler angles are
+            given as a float32 view, which is decoded when used.
+        roi
+            Region of interest to read, as (xMin, yMin, xMax, yMax)
+            with the maximums excluded. Only the rows of the region are
+            read from the file. The whole map if None.
 
         """
         xDim = self.loadedMetadata['xDim']
@@ -370,36 +459,53 @@ class OxfordBinaryLoader(EBSDDataLoader):
         filePath = pathlib.Path(fileDir) / pathlib.Path(fileName)
         if not filePath.is_file():
             raise FileNotFoundError("Cannot open file {}".format(filePath))
-
-        # load binary data from file
-        binData = np.fromfile(str(filePath), self.dataFormat, count=-1)
-
-        self.loadedData['bandContrast'] = np.reshape(
-            binData['BC'], (yDim, xDim)
-        )
-        self.loadedData['bandSlope'] = np.reshape(
-            binData['BS'], (yDim, xDim)
-        )
-        self.loadedData['meanAngularDeviation'] = np.reshape(
-            binData['MAD'], (yDim, xDim)
-        )
-        self.loadedData['phase'] = np.reshape(
-            binData['phase'], (yDim, xDim)
-        )
-        eulerAngles = np.reshape(
-            binData[['ph1', 'phi', 'ph2']], (yDim, xDim)
-        )
+        self.sourceFiles.append(filePath)
+
+        if roi is None:
+            roi = (0, 0, xDim, yDim)
+        xMin, yMin, xMax, yMax = (int(val) for val in roi)
+        if not (0 <= xMin < xMax <= xDim and 0 <= yMin < yMax <= yDim):
+            raise ValueError(f"Region of interest {roi} is not within the "
+                             f"map dimensions ({xDim} x {yDim}).")
+
+        # only the rows of the roi are read from the file
+        offset = yMin * xDim * self.dataFormat.itemsize
+        shape = (yMax - yMin, xDim)
+        if memmap:
+            binData = np.memmap(str(filePath), dtype=self.dataFormat,
+                                mode='r', offset=offset, shape=shape)
+        else:
+            binData = np.fromfile(str(filePath), self.dataFormat,
+                                  count=shape[0] * shape[1], offset=offset)
+            binData = binData.reshape(shape)
+        binData = binData[:, xMin:xMax]
+        if not memmap and (xMin, xMax) != (0, xDim):
+            binData = np.ascontiguousarray(binData)
+
+        self.loadedMetadata['xDim'] = xMax - xMin
+        self.loadedMetadata['yDim'] = yMax - yMin
+        self.loadedMetadata['roi'] = (xMin, yMin, xMax, yMax)
+
+        self.loadedData['bandContrast'] = binData['BC']
+        self.loadedData['bandSlope'] = binData['BS']
+        self.loadedData['meanAngularDeviation'] = binData['MAD']
+        self.loadedData['phase'] = binData['phase']
+        if 'numBands' in binData.dtype.names:
+            self.loadedData['numBands'] = binData['numBands']
 
         # Load EDX data into a dict
         if int(self.loadedMetadata['EDX Windows']['Count']) > 0:
-            EDXFields = [key for key in binData.dtype.fields.keys() if key.startswith('EDX')]        
+            EDXFields = [key for key in binData.dtype.fields.keys()
+                         if key.startswith('EDX')]
             self.loadedData['EDXDict'] = dict(
-                [(field[4:], np.reshape(binData[field], (yDim, xDim))) for field in EDXFields]
-                )
+                [(field[4:], binData[field]) for field in EDXFields]
+            )
 
-        # flatten the structures so that the Euler angles are stored
-        # into a normal array
-        eulerAngles = np.array(eulerAngles.tolist()).transpose((2, 0, 1))
+        # view the Euler angle fields as an extra axis of a normal array
+        eulerAngles = fieldsView(binData, ['ph1', 'phi', 'ph2'])
+        eulerAngles = np.moveaxis(eulerAngles, -1, 0)
+        if not memmap:
+            eulerAngles = eulerAngles.astype(float)
         self.loadedData['eulerAngle'] = eulerAngles
 
         self.checkData()
@@ -436,6 +542,64 @@ class PythonDictLoader(EBSDDataLoader):
         self.checkData()
 
 
+class DefdapLoader(EBSDDataLoader):
+    rawDatasets = ('phase', 'eulerAngle', 'bandContrast', 'bandSlope',
+                   'meanAngularDeviation', 'numBands')
+
+    def load(
+        self,
+        fileName: str,
+        fileDir: str = "",
+        datasets: Optional[List[str]] = None
+    ) -> None:
+        """Read an EBSD map saved in the DefDAP .npz format, including
+        any derived datasets (for example boundaries, grains, KAM) into
+        `loadedDerived`.
+
+        Parameters
+        ----------
+        fileName
+            File name.
+        fileDir
+            Path to file.
+        datasets
+            Names of the derived datasets to read, all if None. 'grains'
+            also reads the grain tables (datasets starting 'grain').
+
+        """
+        filePath = pathlib.Path(fileDir) / pathlib.Path(f"{fileName}.npz")
+        metadata, archive = openDefdapFile(filePath)
+        self.sourceFiles.append(filePath)
+        if metadata['mapType'] != 'ebsd':
+            raise TypeError(f"File {filePath} does not contain EBSD data.")
+
+        self.loadedMetadata['xDim'] = metadata['xDim']
+        self.loadedMetadata['yDim'] = metadata['yDim']
+        self.loadedMetadata['stepSize'] = metadata['stepSize']
+        self.loadedMetadata['phases'] = [Phase(
+            phase['name'], phase['laueGroup'], phase['spaceGroup'],
+            tuple(phase['latticeParams'])
+        ) for phase in metadata['phases']]
+        self.loadedMetadata['EDX Windows'] = {'Count': int(0)}
+        for key in ('origin', 'primaryPhaseID', 'homogPoints'):
+            self.loadedMetadata[key] = metadata[key]
+
+        self.checkMetadata()
+
+        with archive:
+            for name in self.rawDatasets:
+                if name in archive.files:
+                    self.loadedData[name] = archive[name]
+            for name in archive.files:
+                if name in self.rawDatasets or name == 'metadata':
+                    continue
+                if (datasets is None or name in datasets or
+                        (name.startswith('grain') and 'grains' in datasets)):
+                    self.loadedDerived[name] = archive[name]
+
+        self.checkData()
+
+
 class DICDataLoader(object):
     """Class containing methods for loading and checking HRDIC data
 
@@ -452,8 +616,10 @@ class DICDataLoader(object):
             'xc': None,
             'yc': None,
             'xd': None,
-            'yd': None
+            'yd': None,
+            'corrVal': None
         }
+        self.loadedDerived = {}
 
     def checkMetadata(self) -> None:
         return
@@ -554,6 +720,56 @@ class DICDataLoader(object):
 
         return self.loadedData
 
+    def loadDefdap(
+        self,
+        fileName: str,
+        fileDir: str = "",
+        datasets: Optional[List[str]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Load a DIC map saved in the DefDAP .npz format. Derived
+        datasets (for example grains) are read into `loadedDerived`.
+
+        Parameters
+        ----------
+        fileName
+            File name, including extension.
+        fileDir
+            Path to file.
+        datasets
+            Names of the derived datasets to read, all if None. 'grains'
+            also reads the grain tables (datasets starting 'grain').
+
+        Returns
+        -------
+        dict, dict
+            Metadata and, coordinates and displacements.
+
+        """
+        filePath = pathlib.Path(fileDir) / pathlib.Path(fileName)
+        metadata, archive = openDefdapFile(filePath)
+        if metadata['mapType'] != 'hrdic':
+            raise TypeError(f"File {filePath} does not contain DIC data.")
+
+        for key in ('format', 'version', 'binning', 'xDim', 'yDim',
+                    'cropDists', 'homogPoints'):
+            self.loadedMetadata[key] = metadata[key]
+
+        self.checkMetadata()
+
+        with archive:
+            for name in archive.files:
+                if name in self.loadedData:
+                    self.loadedData[name] = archive[name]
+                elif name == 'metadata':
+                    continue
+                elif (datasets is None or name in datasets or
+                        (name.startswith('grain') and 'grains' in datasets)):
+                    self.loadedDerived[name] = archive[name]
+
+        self.checkData()
+
+        return self.loadedMetadata, self.loadedData
+
     @staticmethod
     def loadDavisImageData(fileName: str, fileDir: str = "") -> np.ndarray:
         """ A .txt file from DaVis containing a 2D image
@@ -584,6 +800,41 @@ class DICDataLoader(object):
         return loadedData
 
 
+def openDefdapFile(
+    filePath: pathlib.Path
+) -> Tuple[Dict[str, Any], np.lib.npyio.NpzFile]:
+    """Open a DefDAP .npz file. Datasets are only read from the file
+    when accessed from the returned archive, which should be closed
+    after use.
+
+    Parameters
+    ----------
+    filePath
+        Path to file.
+
+    Returns
+    -------
+    dict, numpy.lib.npyio.NpzFile
+        Metadata of the map and the open archive of datasets.
+
+    """
+    filePath = pathlib.Path(filePath)
+    if not filePath.is_file():
+        raise FileNotFoundError("Cannot open file {}".format(filePath))
+
+    archive = np.load(str(filePath), allow_pickle=False)
+    try:
+        metadata = json.loads(str(archive['metadata']))
+    except (KeyError, ValueError):
+        archive.close()
+        raise TypeError(f"File {filePath} is not a DefDAP file.")
+    if metadata.get('file_format') != "DefDAP":
+        archive.close()
+        raise TypeError(f"File {filePath} is not a DefDAP file.")
+
+    return metadata, archive
+
+
 def readUntilString(
     file: TextIO,
     termString: str,
@@ -625,3 +876,39 @@ def readUntilString(
             line = lineProcess(line)
         lines.append(line)
     return lines
+
+
+def fieldsView(records: np.ndarray, fields: List[str]) -> np.ndarray:
+    """Zero-copy view of fields of a structured array as an extra last
+    axis of a normal array. The fields must have the same type and be
+    stored next to each other, otherwise a copy is returned.
+
+    Parameters
+    ----------
+    records
+        Structured array.
+    fields
+        Names of fields to view.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape records.shape + (len(fields),).
+
+    """
+    dtypes = [records.dtype.fields[field][0] for field in fields]
+    offsets = [records.dtype.fields[field][1] for field in fields]
+    itemDtype = dtypes[0]
+
+    if (all(dtype == itemDtype for dtype in dtypes) and
+            all(offsets[i + 1] - offsets[i] == itemDtype.itemsize
+                for i in range(len(offsets) - 1))):
+        viewDtype = np.dtype({
+            'names': ['values'],
+            'formats': [(itemDtype, (len(fields),))],
+            'offsets': [offsets[0]],
+            'itemsize': records.dtype.itemsize
+        })
+        return records.view(np.ndarray).view(viewDtype)['values']
+
+    return np.stack([records[field] for field in fields], axis=-1)
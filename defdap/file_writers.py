@@ -15,8 +15,9 @@
 
 import numpy as np
 import pathlib
+import json
 
-from typing import Type
+from typing import Type, Optional, Any
 
 from defdap.quat import Quat
 
@@ -32,7 +33,10 @@ class EBSDDataWriter(object):
         self.data = {
             'phase': None,
             'quat': None,
-            'band_contrast': None
+            'band_contrast': None,
+            'band_slope': None,
+            'mean_angular_deviation': None,
+            'num_bands': None
         }
         self.data_format = None
 
@@ -43,14 +47,22 @@ class EBSDDataWriter(object):
 
         if datatype == "OxfordText":
             return OxfordTextWriter()
+        elif datatype == "DefDAP":
+            return DefdapWriter()
         else:
             raise ValueError(f"No loader for EBSD data of type {datatype}.")
 
 
 class OxfordTextWriter(EBSDDataWriter):
-    def write(self, file_name: str, file_dir: str = "") -> None:
+    def write(
+        self,
+        file_name: str,
+        file_dir: str = "",
+        chunk_size: Optional[int] = None
+    ) -> None:
         """ Write an Oxford Instruments .ctf file, which is a HKL single
-        orientation file.
+        orientation file. Band slope, mean angular deviation and number
+        of bands are written as 0, 0 and 10 when not given.
 
         Parameters
         ----------
@@ -58,6 +70,9 @@ class OxfordTextWriter(EBSDDataWriter):
             File name.
         file_dir
             Path to file.
+        chunk_size
+            Number of rows of the data table to format and write at a
+            time. 2**16 if None.
 
         """
 
@@ -69,21 +84,34 @@ class OxfordTextWriter(EBSDDataWriter):
 
         shape = self.metadata['shape']
         step_size = self.metadata['step_size']
+        num_points = shape[0] * shape[1]
+        if chunk_size is None:
+            chunk_size = 2**16
 
         # convert quats to Euler angles
-        out_euler_array = np.zeros(shape + (3,))
-        for idx in np.ndindex(shape):
-            out_euler_array[idx] = self.data['quat'][idx].eulerAngles()
+        out_euler_array = self.data['quat'].eulerAngles().reshape(3, -1)
         out_euler_array *= 180 / np.pi
         acq_rot = self.metadata['acquisition_rotation'].eulerAngles()
         acq_rot *= 180 / np.pi
 
-        # create coordinate grids
-        x_grid, y_grid = np.meshgrid(
-            np.arange(0, shape[1]) * step_size,
-            np.arange(0, shape[0]) * step_size,
-            indexing='xy'
-        )
+        # columns of the data table, in order. Constant columns are
+        # broadcast when formatting
+        phase = self.data['phase'].reshape(-1)
+        columns = [
+            phase,
+            None,   # x, calculated per chunk
+            None,   # y, calculated per chunk
+            self._column('num_bands', 10),
+            None,   # error, calculated per chunk
+            out_euler_array[0],
+            out_euler_array[1],
+            out_euler_array[2],
+            self._column('mean_angular_deviation', 0.),
+            self.data['band_contrast'].reshape(-1),
+            self._column('band_slope', 0),
+        ]
+        row_format = "%d\t%.3f\t%.3f\t%d\t%d\t%.3f\t%.3f\t%.3f\t%.4f" \
+                     "\t%d\t%d\n"
 
         with open(str(file_path), 'w') as ctf_file:
             # write header
@@ -101,25 +129,89 @@ class OxfordTextWriter(EBSDDataWriter):
             ctf_file.write(
                 "Euler angles refer to Sample Coordinate system (CS0)!\n")
             ctf_file.write(f"Phases\t{len(self.metadata['phases'])}\n")
-            for phase in self.metadata['phases']:
-                dims = "{:.3f};{:.3f};{:.3f}".format(*phase.latticeParams[:3])
-                angles = (f * 180 / np.pi for f in phase.latticeParams[3:])
+            for phase_obj in self.metadata['phases']:
+                dims = "{:.3f};{:.3f};{:.3f}".format(
+                    *phase_obj.latticeParams[:3]
+                )
+                angles = (f * 180 / np.pi for f in phase_obj.latticeParams[3:])
                 angles = "{:.3f};{:.3f};{:.3f}".format(*angles)
 
-                ctf_file.write(f"{dims}\t{angles}\t{phase.name}"
-                               f"\t{phase.laueGroup}\t0\t\t\t\n")
+                ctf_file.write(f"{dims}\t{angles}\t{phase_obj.name}"
+                               f"\t{phase_obj.laueGroup}\t0\t\t\t\n")
 
             ctf_file.write("Phase\tX\tY\tBands\tError\tEuler1\tEuler2"
                            "\tEuler3\tMAD\tBC\tBS\n")
 
-            for x, y, phase, eulers, bc in zip(
-                x_grid.flat, y_grid.flat,
-                self.data['phase'].flat,
-                out_euler_array.reshape((shape[0] * shape[1], 3)),
-                self.data['band_contrast'].flat,
-            ):
-                error = 3 if phase == 0 else 0
+            # format a block of rows in a single operation and write it
+            for start in range(0, num_points, chunk_size):
+                end = min(start + chunk_size, num_points)
+                idx = np.arange(start, end)
+
+                block = np.empty((end - start, len(columns)), dtype=float)
+                for i, column in enumerate(columns):
+                    if column is None:
+                        continue
+                    if np.ndim(column) == 0:
+                        block[:, i] = column
+                    else:
+                        block[:, i] = column[start:end]
+                block[:, 1] = (idx % shape[1]) * step_size
+                block[:, 2] = (idx // shape[1]) * step_size
+                block[:, 4] = np.where(block[:, 0] == 0, 3, 0)
+
                 ctf_file.write(
-                    f"{phase}\t{x:.3f}\t{y:.3f}\t10\t{error}\t{eulers[0]:.3f}"
-                    f"\t{eulers[1]:.3f}\t{eulers[2]:.3f}\t0.0000\t{bc}\t0\n"
+                    (row_format * (end - start)) % tuple(block.ravel().tolist())
                 )
+
+    def _column(self, key: str, default: Any) -> Any:
+        """Flattened data column or a default value if not given."""
+        value = self.data.get(key)
+        if value is None:
+            return default
+        return np.asarray(value).reshape(-1)
+
+
+class DefdapWriter(object):
+    """Writer for the DefDAP native format, a compressed numpy .npz
+    archive holding one array per dataset and the map metadata as a
+    JSON string in the 'metadata' array, marked as a DefDAP file by its
+    'file_format' key. Individual datasets can be read from the file
+    without reading the others.
+
+    """
+    format_version = 1
+
+    def __init__(self) -> None:
+        self.metadata = {}
+        self.data = {}
+
+    def write(self, file_name: str, file_dir: str = "") -> None:
+        """Write a DefDAP .npz file. Datasets with a value of None are
+        not written.
+
+        Parameters
+        ----------
+        file_name
+            File name.
+        file_dir
+            Path to file.
+
+        """
+        # check output file
+        file_name = "{}.npz".format(file_name)
+        file_path = pathlib.Path(file_dir) / pathlib.Path(file_name)
+        if file_path.exists():
+            raise FileExistsError(f"File already exits {file_path}")
+
+        metadata = dict(self.metadata)
+        metadata['file_format'] = "DefDAP"
+        metadata['format_version'] = self.format_version
+
+        arrays = {name: np.asarray(value)
+                  for name, value in self.data.items() if value is not None}
+        if 'metadata' in arrays:
+            raise ValueError("'metadata' is not a valid dataset name.")
+        arrays['metadata'] = np.array(json.dumps(metadata))
+
+        with open(str(file_path), 'xb') as npz_file:
+            np.savez_compressed(npz_file, **arrays)
@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections.abc import Mapping
+
 import numpy as np
 from matplotlib.pyplot import imread
 import inspect
@@ -26,13 +28,38 @@ from scipy.ndimage import binary_dilation
 import peakutils
 
 from defdap.file_readers import DICDataLoader
+from defdap.file_writers import DefdapWriter
 from defdap import base
 from defdap.quat import Quat
 
 from defdap import defaults
 from defdap.plotting import MapPlot, GrainPlot
 from defdap.inspector import GrainInspector
-from defdap.utils import reportProgress
+from defdap.utils import (reportProgress, lazyAttribute, labelConnected,
+                          removeSmallLabels)
+
+
+class _ComponentMaps(Mapping):
+    """Displacement, deformation gradient and strain maps of a DIC map
+    keyed by name, each calculated when first used.
+
+    """
+    names = ('f11', 'f12', 'f21', 'f22', 'e11', 'e12', 'e22', 'eMaxShear',
+             'x_map', 'y_map')
+
+    def __init__(self, dicMap):
+        self.dicMap = dicMap
+
+    def __getitem__(self, key):
+        if key not in self.names:
+            raise KeyError(key)
+        return getattr(self.dicMap, key)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
 
 
 class Map(base.Map):
@@ -89,9 +116,9 @@ class Map(base.Map):
         Size of map along x (after cropping).
     yDim : int
         Size of map along y (after cropping).
-    self.x_map : numpy.ndarray
+    x_map : numpy.ndarray
         Map of u displacement component along x.
-    self.y_map : numpy.ndarray
+    y_map : numpy.ndarray
         Map of v displacement component along x.
     f11, f22, f12, f21 ; numpy.ndarray
         Components of the deformation gradient, where 1=x and 2=y.
@@ -99,10 +126,27 @@ class Map(base.Map):
         Components of the green strain , where 1=x and 2=y.
     eMaxShear : numpy.ndarray
         Max shear component np.sqrt(((e11 - e22) / 2.)**2 + e12**2).
+    component : collections.abc.Mapping
+        Displacement, deformation gradient and strain maps keyed by
+        name.
     cropDists : numpy.ndarray
         Crop distances (default all zeros).
+    mask : numpy.ndarray of bool
+        Mask of points to remove, set by :func:`generateThresholdMask`.
+    appliedMask : numpy.ndarray of bool
+        Points set to NaN in the displacement, deformation gradient and
+        strain maps, set by :func:`applyThresholdMask`.
+
+    The displacement, deformation gradient and strain maps are
+    calculated when first used, and recalculated if the data they are
+    calculated from changes.
 
     """
+    derivedAttributes = dict(base.Map.derivedAttributes, **{
+        'grains': ('xDim', 'yDim'),
+        'proxigramArr': ('boundaries', 'xDim', 'yDim'),
+    })
+
     def __init__(self, path, fname, dataType=None):
         """Initialise class and import DIC data from file.
 
@@ -148,41 +192,14 @@ class Map(base.Map):
         self.path = path                    # file path
         self.fname = fname                  # file name
 
-        self.loadData(path, fname, dataType=dataType)
-  
-        # *dim are full size of data. *Dim are size after cropping
-        self.xDim = self.xdim
-        self.yDim = self.ydim
-        
-        self.x_map = self._map(self.xd)     # u displacement component along x
-        self.y_map = self._map(self.yd)     # v displacement component along x
-        xDispGrad = self._grad(self.x_map)  #d/dy is first term, d/dx is second
-        yDispGrad = self._grad(self.y_map)
-
-        # Deformation gradient
-        self.f11 = xDispGrad[1] + 1
-        self.f22 = yDispGrad[0] + 1
-        self.f12 = xDispGrad[0]
-        self.f21 = yDispGrad[1]
-
-        # Green strain
-        self.e11 = xDispGrad[1] + \
-                   0.5*(xDispGrad[1]*xDispGrad[1] + yDispGrad[1]*yDispGrad[1])
-        self.e22 = yDispGrad[0] + \
-                   0.5*(xDispGrad[0]*xDispGrad[0] + yDispGrad[0]*yDispGrad[0])
-        self.e12 = 0.5*(xDispGrad[0] + yDispGrad[1] +
-                        xDispGrad[1]*xDispGrad[0] + yDispGrad[1]*yDispGrad[0])
-        # max shear component
-        self.eMaxShear = np.sqrt(((self.e11 - self.e22) / 2.)**2 + self.e12**2)
-
-        self.component = {'f11': self.f11, 'f12': self.f12, 'f21': self.f21, 'f22': self.f22,
-                         'e11': self.e11, 'e12': self.e12, 'e22': self.e22,
-                         'eMaxShear': self.eMaxShear,
-                         'x_map': self.x_map, 'y_map': self.y_map}
-
         # crop distances (default all zeros)
         self.cropDists = np.array(((0, 0), (0, 0)), dtype=int)
 
+        self.mask = None
+        self.appliedMask = None
+
+        self.loadData(path, fname, dataType=dataType)
+
         self.plotDefault = lambda *args, **kwargs: self.plotMaxShear(plotGBs=True, *args, **kwargs)
     
     @property
@@ -199,7 +216,7 @@ class Map(base.Map):
             Path to file.
         fileName : str
             Name of file including extension.
-        dataType : str,  {'DavisText'}
+        dataType : str,  {'DavisText', 'DefDAP'}
             Type of data file.
 
         """
@@ -209,6 +226,8 @@ class Map(base.Map):
         if dataType == "DavisText":
             metadataDict = dataLoader.loadDavisMetadata(fileName, fileDir)
             dataDict = dataLoader.loadDavisData(fileName, fileDir)
+        elif dataType == "DefDAP":
+            metadataDict, dataDict = dataLoader.loadDefdap(fileName, fileDir)
         else:
             raise Exception("No loader found for this DIC data.")
 
@@ -222,6 +241,28 @@ class Map(base.Map):
         self.yc = dataDict['yc']    # y coordinates
         self.xd = dataDict['xd']    # x displacement
         self.yd = dataDict['yd']    # y displacement
+        self.corrVal = dataDict['corrVal']
+
+        # *dim are full size of data. *Dim are size after cropping
+        self.xDim = self.xdim
+        self.yDim = self.ydim
+
+        # map state and derived data saved in the DefDAP format
+        if 'cropDists' in metadataDict:
+            self.setCrop(*metadataDict['cropDists'][0],
+                         *metadataDict['cropDists'][1])
+        self.homogPoints = [tuple(point) for point in
+                            metadataDict.get('homogPoints', self.homogPoints)]
+        derived = dataLoader.loadedDerived
+        if 'appliedMask' in derived:
+            self.appliedMask = derived['appliedMask']
+        if 'ebsdGrainIds' in derived:
+            self.ebsdGrainIds = derived['ebsdGrainIds']
+        if 'grains' in derived:
+            self._restoreGrains(derived['grains'], derived['grainIDs'], Grain)
+            for grain, ebsdGrainId in zip(self, derived['grainEbsdIds']):
+                if ebsdGrainId >= 0:
+                    grain.ebsdGrainId = int(ebsdGrainId)
 
         # write final status
         yield "Loaded {0} {1} data (dimensions: {2} x {3} pixels, " \
@@ -229,6 +270,55 @@ class Map(base.Map):
             self.format, self.version, self.xdim, self.ydim, self.binning
         )
         
+    def save(self, file_name, data_type=None, file_dir=""):
+        """Save DIC map to file, including the crop, homologous points
+        and grains. Links to an EBSD map are not saved.
+
+        Parameters
+        ----------
+        file_name : str
+            Name of file to save to, it must not already exist.
+        data_type : str, {'DefDAP'}
+            Format of file to save.
+        file_dir : str
+            Directory to save the file to.
+
+        """
+        data_type = "DefDAP" if data_type is None else data_type
+        if data_type != "DefDAP":
+            raise ValueError(f"No writer for DIC data of type {data_type}.")
+
+        dataWriter = DefdapWriter()
+        dataWriter.metadata.update({
+            'mapType': 'hrdic',
+            'format': self.format,
+            'version': self.version,
+            'binning': self.binning,
+            'xDim': self.xdim,
+            'yDim': self.ydim,
+            'cropDists': self.cropDists.tolist(),
+            'homogPoints': [list(point) for point in self.homogPoints]
+        })
+        dataWriter.data.update({
+            'xc': self.xc,
+            'yc': self.yc,
+            'xd': self.xd,
+            'yd': self.yd,
+            'corrVal': self.corrVal,
+            'appliedMask': self.appliedMask,
+            'ebsdGrainIds': self.ebsdGrainIds
+        })
+        if self.checkGrainsDetected(raiseExc=False):
+            dataWriter.data['grains'] = self.grains
+            dataWriter.data['grainIDs'] = np.array([
+                grain.grainID for grain in self
+            ])
+            dataWriter.data['grainEbsdIds'] = np.array([
+                getattr(grain, 'ebsdGrainId', -1) for grain in self
+            ])
+
+        dataWriter.write(file_name, file_dir=file_dir)
+
     def loadCorrValData(self, fileDir, fileName, dataType=None):
         """Load correlation value for DIC data
 
@@ -261,6 +351,89 @@ class Map(base.Map):
         data_map = np.reshape(np.array(data_col), (self.ydim, self.xdim))
         return data_map
 
+    def _applyMask(self, data_map):
+        if self.appliedMask is None:
+            return data_map
+        return np.where(self.appliedMask, np.nan, data_map)
+
+    @lazyAttribute('xd', 'yd', 'xc', 'xdim', 'ydim')
+    def _dispGrad(self):
+        """Gradients of the x and y displacement maps, d/dy is first
+        term and d/dx is second.
+
+        """
+        return self._grad(self._map(self.xd)), self._grad(self._map(self.yd))
+
+    @lazyAttribute('xd', 'xdim', 'ydim', 'appliedMask')
+    def x_map(self):
+        """Map of u displacement component along x."""
+        return self._applyMask(self._map(self.xd))
+
+    @lazyAttribute('yd', 'xdim', 'ydim', 'appliedMask')
+    def y_map(self):
+        """Map of v displacement component along x."""
+        return self._applyMask(self._map(self.yd))
+
+    @lazyAttribute('_dispGrad', 'appliedMask')
+    def f11(self):
+        """Deformation gradient component 11."""
+        xDispGrad, _ = self._dispGrad
+        return self._applyMask(xDispGrad[1] + 1)
+
+    @lazyAttribute('_dispGrad', 'appliedMask')
+    def f22(self):
+        """Deformation gradient component 22."""
+        _, yDispGrad = self._dispGrad
+        return self._applyMask(yDispGrad[0] + 1)
+
+    @lazyAttribute('_dispGrad', 'appliedMask')
+    def f12(self):
+        """Deformation gradient component 12."""
+        xDispGrad, _ = self._dispGrad
+        return self._applyMask(xDispGrad[0])
+
+    @lazyAttribute('_dispGrad', 'appliedMask')
+    def f21(self):
+        """Deformation gradient component 21."""
+        _, yDispGrad = self._dispGrad
+        return self._applyMask(yDispGrad[1])
+
+    @lazyAttribute('_dispGrad', 'appliedMask')
+    def e11(self):
+        """Green strain component 11."""
+        xDispGrad, yDispGrad = self._dispGrad
+        return self._applyMask(
+            xDispGrad[1] +
+            0.5*(xDispGrad[1]*xDispGrad[1] + yDispGrad[1]*yDispGrad[1])
+        )
+
+    @lazyAttribute('_dispGrad', 'appliedMask')
+    def e22(self):
+        """Green strain component 22."""
+        xDispGrad, yDispGrad = self._dispGrad
+        return self._applyMask(
+            yDispGrad[0] +
+            0.5*(xDispGrad[0]*xDispGrad[0] + yDispGrad[0]*yDispGrad[0])
+        )
+
+    @lazyAttribute('_dispGrad', 'appliedMask')
+    def e12(self):
+        """Green strain component 12."""
+        xDispGrad, yDispGrad = self._dispGrad
+        return self._applyMask(
+            0.5*(xDispGrad[0] + yDispGrad[1] +
+                 xDispGrad[1]*xDispGrad[0] + yDispGrad[1]*yDispGrad[0])
+        )
+
+    @lazyAttribute('e11', 'e22', 'e12')
+    def eMaxShear(self):
+        """Max shear strain component."""
+        return np.sqrt(((self.e11 - self.e22) / 2.)**2 + self.e12**2)
+
+    @property
+    def component(self):
+        return _ComponentMaps(self)
+
     def _grad(self, data_map):
         grad_step = min(abs((np.diff(self.xc))))
         data_grad = np.gradient(data_map, grad_step, grad_step)
@@ -677,24 +850,10 @@ class Map(base.Map):
         """ Apply mask to all DIC map data by setting masked values to nan.
 
         """
-        self.eMaxShear = np.where(self.mask == True, np.nan, self.eMaxShear)
-
-        self.e11 = np.where(self.mask == True, np.nan, self.e11)
-        self.e12 = np.where(self.mask == True, np.nan, self.e12)
-        self.e22 = np.where(self.mask == True, np.nan, self.e22)
-
-        self.f11 = np.where(self.mask == True, np.nan, self.f11)
-        self.f12 = np.where(self.mask == True, np.nan, self.f12)
-        self.f22 = np.where(self.mask == True, np.nan, self.f22)
-
-        self.x_map = np.where(self.mask == True, np.nan, self.x_map)
-        self.y_map = np.where(self.mask == True, np.nan, self.y_map)
-
-        self.component = {'f11': self.f11, 'f12': self.f12, 'f21': self.f21,
-                          'f22': self.f22,
-                          'e11': self.e11, 'e12': self.e12, 'e22': self.e22,
-                          'eMaxShear': self.eMaxShear,
-                          'x_map': self.x_map, 'y_map': self.y_map}
+        if self.appliedMask is None:
+            self.appliedMask = self.mask
+        else:
+            self.appliedMask = self.appliedMask | self.mask
 
     def setPatternPath(self, filePath, windowSize):
         """Set the path to the image of the pattern.
@@ -855,18 +1014,14 @@ class Map(base.Map):
             index = np.digitize(self.grains.ravel(), old, right=True)
             self.grains = new[index].reshape(self.grains.shape)
 
+            self.buildGrainStorage(len(dicGrainIds))
             self.grainList = []
             for i, (dicGrainId, ebsdGrainId) in enumerate(zip(dicGrainIds, self.ebsdGrainIds)):
                 yield i / len(dicGrainIds)          # Report progress
 
-                # Make grain object
+                # Make grain object, with points stored in the map
                 currentGrain = Grain(grainID=dicGrainId, dicMap=self)
-
-                # Find (x,y) coordinates and corresponding max shears of grain
-                coords = np.argwhere(self.grains == dicGrainId)       # (y,x)
-                currentGrain.coordList = np.flip(coords, axis=1)      # (x,y)
-                currentGrain.maxShearList = self.eMaxShear[coords[:,0]+ self.cropDists[1, 0], 
-                                                           coords[:,1]+ self.cropDists[0, 0]]
+                currentGrain.storageID = i
 
                 # Assign EBSD grain ID to DIC grain and increment grain list
                 currentGrain.ebsdGrainId = ebsdGrainId - 1
@@ -875,49 +1030,40 @@ class Map(base.Map):
                 self.grainList.append(currentGrain)
 
         elif algorithm == 'floodfill':
-            # Initialise the grain map
-            self.grains = np.copy(self.boundaries)
-
+            # Label connected regions of points not on a boundary
+            boundaries = self.boundaries
+            grains, _ = labelConnected(boundaries == 0)
+
+            # Boundary points are added to the grain of the point to
+            # their left or above, the grain found first taking priority
+            # if both are in grains
+            noGrain = np.iinfo(grains.dtype).max
+            neighbourGrains = np.full((2,) + grains.shape, noGrain)
+            neighbourGrains[0, :, 1:] = grains[:, :-1]
+            neighbourGrains[1, 1:, :] = grains[:-1, :]
+            neighbourGrains[neighbourGrains <= 0] = noGrain
+            neighbourGrains = neighbourGrains.min(axis=0)
+
+            isBoundary = boundaries == -1
+            grains[isBoundary] = -1
+            claimed = isBoundary & (neighbourGrains != noGrain)
+            grains[claimed] = neighbourGrains[claimed]
+            yield 0.5
+
+            # if grain size less than minimum, ignore grain and set
+            # values in grain map to -2
+            self.grains, numGrains = removeSmallLabels(grains, minGrainSize)
+
+            # Build grain objects, with points stored in the map in
+            # raster order
+            self.buildGrainStorage(numGrains)
             self.grainList = []
+            for i in range(numGrains):
+                currentGrain = Grain(i, self)
+                currentGrain.storageID = i
+                self.grainList.append(currentGrain)
 
-            # List of points where no grain has been set yet
-            points_left = self.grains == 0
-            total_points = points_left.sum()
-            found_point = 0
-            next_point = points_left.tobytes().find(b'\x01')
-
-            # Start counter for grains
-            grainIndex = 1
-
-            # Loop until all points (except boundaries) have been assigned
-            # to a grain or ignored
-            i = 0
-            while found_point >= 0:
-                # Flood fill first unknown point and return grain object
-                idx = np.unravel_index(next_point, self.grains.shape)
-                currentGrain = self.floodFill(idx[1], idx[0], grainIndex,
-                                              points_left)
-
-                if len(currentGrain) < minGrainSize:
-                    # if grain size less than minimum, ignore grain and set
-                    # values in grain map to -2
-                    for coord in currentGrain.coordList:
-                        self.grains[coord[1], coord[0]] = -2
-                else:
-                    # add grain to list and increment grain index
-                    self.grainList.append(currentGrain)
-                    grainIndex += 1
-
-                # find next search point
-                points_left_sub = points_left.reshape(-1)[next_point + 1:]
-                found_point = points_left_sub.tobytes().find(b'\x01')
-                next_point += found_point + 1
-
-                # report progress
-                i += 1
-                if i == defaults['find_grain_report_freq']:
-                    yield 1. - points_left_sub.sum() / total_points
-                    i = 0
+                yield 0.5 + 0.5 * (i + 1) / numGrains
 
             # Now link grains to those in ebsd Map
             # Warp DIC grain map to EBSD frame
@@ -947,73 +1093,6 @@ class Map(base.Map):
         else:
             raise ValueError(f"Unknown grain finding algorithm '{algorithm}'.")
 
-    def floodFill(self, x, y, grainIndex, points_left):
-        """Flood fill algorithm that uses the combined x and y boundary array 
-        to fill a connected area around the seed point. The points are inserted
-        into a grain object and the grain map array is updated.
-
-        Parameters
-        ----------
-        x : int
-            Seed point x for flood fill
-        y : int
-            Seed point y for flood fill
-        grainIndex : int
-            Value to fill in grain map
-        points_left : numpy.ndarray
-            Boolean map of the points that have not been assigned a grain yet
-
-        Returns
-        -------
-        currentGrain : defdap.hrdic.Grain
-            New grain object with points added
-
-        """
-        # create new grain
-        currentGrain = Grain(grainIndex - 1, self)
-
-        # add first point to the grain
-        currentGrain.addPoint((x, y), self.eMaxShear[y + self.cropDists[1, 0],
-                                                     x + self.cropDists[0, 0]])
-        self.grains[y, x] = grainIndex
-        points_left[y, x] = False
-        edge = [(x, y)]
-
-        while edge:
-            x, y = edge.pop(0)
-
-            moves = [(x+1, y), (x-1, y), (x, y+1), (x, y-1)]
-            # get rid of any that go out of the map area
-            if x <= 0:
-                moves.pop(1)
-            elif x >= self.xDim - 1:
-                moves.pop(0)
-            if y <= 0:
-                moves.pop(-1)
-            elif y >= self.yDim - 1:
-                moves.pop(-2)
-
-            for (s, t) in moves:
-                addPoint = False
-
-                if self.grains[t, s] == 0:
-                    addPoint = True
-                    edge.append((s, t))
-
-                elif self.grains[t, s] == -1 and (s > x or t > y):
-                    addPoint = True
-
-                if addPoint:
-                    currentGrain.addPoint(
-                        (s, t),
-                        self.eMaxShear[t + self.cropDists[1, 0],
-                                       s + self.cropDists[0, 0]]
-                    )
-                    self.grains[t, s] = grainIndex
-                    points_left[t, s] = False
-
-        return currentGrain
-
     def runGrainInspector(self, vmax=0.1, corrAngle=0):
         """Run the grain inspector interactive tool.
 
@@ -1041,8 +1120,9 @@ class Grain(base.Grain):
         DIC map this grain is a member of
     ownerMap : defdap.hrdic.Map
         DIC map this grain is a member of
-    maxShearList : list
-        List of maximum shear values for grain.
+    maxShearList : list or numpy.ndarray
+        List of maximum shear values for grain. Gathered from the owner
+        map if the grain points are stored in the map.
     ebsdGrain : defdap.ebsd.Grain
         EBSD grain ID that this DIC grain corresponds to.
     ebsdMap : defdap.ebsd.Map
@@ -1059,7 +1139,7 @@ class Grain(base.Grain):
         super(Grain, self).__init__(grainID, dicMap)
 
         self.dicMap = self.ownerMap     # DIC map this grain is a member of
-        self.maxShearList = []
+        self._maxShearList = []
         self.ebsdGrain = None
         self.ebsdMap = None
 
@@ -1073,9 +1153,22 @@ class Grain(base.Grain):
             plotSlipBands=True, *args, **kwargs
         )
 
+    @property
+    def maxShearList(self):
+        if self.storageID is None:
+            return self._maxShearList
+        coords = self.coordList
+        cropDists = self.dicMap.cropDists
+        return self.dicMap.eMaxShear[coords[:, 1] + cropDists[1, 0],
+                                     coords[:, 0] + cropDists[0, 0]]
+
+    @maxShearList.setter
+    def maxShearList(self, value):
+        self._maxShearList = value
+
     # coord is a tuple (x, y)
     def addPoint(self, coord, maxShear):
-        self.coordList.append(coord)
+        super(Grain, self).addPoint(coord)
         self.maxShearList.append(maxShear)
 
     def plotMaxShear(self, **kwargs):
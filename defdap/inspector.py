@@ -16,11 +16,18 @@
 import numpy as np
 
 import ast
+import json
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
 
-from typing import List
+from typing import List, Optional, Sequence, Tuple
 
 from scipy.stats import linregress
-from scipy.stats._stats_mstats_common import LinregressResult
+try:
+    from scipy.stats._stats_py import LinregressResult
+except ImportError:
+    # scipy < 1.11
+    from scipy.stats._stats_mstats_common import LinregressResult
 import pandas as pd
 
 from defdap.plotting import Plot, GrainPlot
@@ -45,7 +52,8 @@ class GrainInspector:
         self.currEBSDGrain = self.currDICGrain.ebsdGrain
         self.vmax = vmax
         self.corrAngle = corrAngle
-        self.filename = str(self.currMap.retrieveName()) + '_RDR.txt'
+        self.filename = str(self.currMap.retrieveName()) + '_RDR.npz'
+        self.annotations = SlipLineStore.fromMap(self.currMap)
         
         # Draw the figure
         self.draw()        
@@ -145,6 +153,7 @@ class GrainInspector:
         
         # Group lines and redraw
         self.groupLines()
+        self.storeLines()
         self.redrawLine()
         
     def groupLines(self,
@@ -198,7 +207,23 @@ class GrainInspector:
                         deviation.append(float('{0:.2f}'.format(experimentalAngle-theoreticalAngle)))
                 group[2] = activePlanes
                 group[3] = deviation
-            
+
+    def storeLines(self,
+                   grainID: int = None):
+        """Update the lines and groups of a grain in the annotation store,
+        which is keyed by the index of grains in the map.
+
+        Parameters
+        ----------
+        grainID
+            Index of the grain in the map, the current grain if not given.
+
+        """
+        if grainID is None:
+            grainID = self.grainID
+        grain = self.currMap[grainID]
+        self.annotations.setGrain(grainID, grain.pointsList, grain.groupsList)
+
     def clearAllLines(self, 
         event, 
         plot):
@@ -208,6 +233,7 @@ class GrainInspector:
 
         self.currDICGrain.pointsList = []
         self.currDICGrain.groupsList = []
+        self.storeLines()
         self.redraw()
 
     def removeLine(self, 
@@ -224,6 +250,7 @@ class GrainInspector:
         ## Remove single line
         del self.currDICGrain.pointsList[int(event)]
         self.groupLines()
+        self.storeLines()
         self.redraw()
 
     def redraw(self):
@@ -336,16 +363,17 @@ class GrainInspector:
                     print(text)
 
     def calcRDR(self, 
-        grain: int, 
+        grain: 'defdap.hrdic.Grain', 
         group: int, 
         showPlot: bool = True, 
         length: float = 2.5):
-        """ Calculates the relative displacement ratio for a given grain and group.
+        """ Calculates the relative displacement ratio for a given grain and group,
+        see :func:`calcGrainRDR`.
 
         Parameters
         ----------
         grain
-            DIC grain ID to run RDR on.
+            DIC grain to run RDR on.
         group
             group ID to run RDR on.
         showPlot
@@ -355,70 +383,21 @@ class GrainInspector:
 
         """
         
-        ulist=[]; vlist=[]; allxlist = []; allylist = [];      
-
-        # Get all lines belonging to group
-        points = []
-        for point in grain.pointsList:
-            if point[2] == group:
-                points.append(point[0])
-
-        for point in points:
-            x0=point[0];  y0=point[1]; x1=point[2];   y1=point[3];
-            grad = (y1-y0)/(x1-x0)
-            invgrad = -1/grad
-            profile_length = np.sqrt((y1-y0)**2+(x1-x0)**2)
-            num = np.round(profile_length*2)
-            
-            ### Calculate positions for each point along slip trace line (x,y)
-            x, y = np.round(np.linspace(x0, x1, int(num))), np.round(np.linspace(y0, y1, int(num)))
-            df = pd.DataFrame({'x':x, 'y':y}).drop_duplicates()
-            x,y = df['x'].values.tolist(),df['y'].values.tolist()
-
-            ## Calculate deviation from (0,0) for points along line with angle perpendicular to slip line (xnew,ynew)
-            x0new = np.sqrt(length/(invgrad**2+1))*np.sign(grad)
-            y0new = -np.sqrt(length/(1/invgrad**2+1))
-            x1new = -np.sqrt(length/(invgrad**2+1))*np.sign(grad)
-            y1new = np.sqrt(length/(1/invgrad**2+1))
-            profile_length=np.sqrt((y1new-y0new)**2+(x1new-x0new)**2)
-            num = np.round(profile_length)
-            xnew, ynew = np.linspace(x0new, x1new, int(num)), np.linspace(y0new, y1new, int(num))
-            xnew, ynew = np.around(xnew).astype(int), np.around(ynew).astype(int)
-            df = pd.DataFrame({'x':xnew, 'y':ynew}).drop_duplicates()
-            xnew,ynew = df['x'].values.tolist(), df['y'].values.tolist()
-                
-            for x,y in zip(x,y):
-                xperp = []; yperp = [];
-                for xdiff, ydiff in zip(xnew, ynew):
-                    xperp.append(int(x+xdiff))
-                    yperp.append(int(y+ydiff))
-                allxlist.append(xperp)
-                allylist.append(yperp)
-
-                xmap = self.currDICGrain.extremeCoords[0] + xperp
-                ymap = self.currDICGrain.extremeCoords[1] + yperp
-                
-                ### For all points, append u and v to list
-                u = []; v = [];
-                for xmap, ymap in zip(xmap,ymap):
-                    u.append((self.currMap.crop(self.currMap.x_map))[ymap, xmap])
-                    v.append((self.currMap.crop(self.currMap.y_map))[ymap, xmap])
-
-                ### Take away mean
-                u = u-np.mean(u); v = v-np.mean(v)
-
-                ### Append to main lists (ulist,vlist)
-                ulist.extend(u)
-                vlist.extend(v)
-
-        ### Linear regression of ucentered against vcentered
-        linRegResults = linregress(x=vlist,y=ulist)
-        
+        result = calcGrainRDR(self.currMap, grain, group, length=length)
+        if result is None:
+            raise Exception(f"No lines in group {group}.")
+        linRegResults = result['linRegResults']
+
         # Save measured RDR
         grain.groupsList[group][4] = linRegResults.slope
-        
+        if grain is self.currDICGrain:
+            self.storeLines()
+        else:
+            self.storeLines(self.currMap.grainList.index(grain))
 
-        if showPlot: self.plotRDR(grain, group, ulist, vlist, allxlist, allylist, linRegResults)
+        if showPlot:
+            self.plotRDR(grain, group, result['u'], result['v'], result['x'],
+                         result['y'], linRegResults)
 
     def plotRDR(self, 
         grain: int, 
@@ -462,7 +441,7 @@ class GrainInspector:
         self.rdrPlot.plotAx = self.rdrPlot.addAxes((0.75, 0.07, 0.2, 0.85))
 
         ## Draw grain plot
-        self.rdrPlot.grainPlot = self.currDICGrain.plotMaxShear(fig=self.rdrPlot.fig, ax=self.rdrPlot.grainAx, 
+        self.rdrPlot.grainPlot = grain.plotMaxShear(fig=self.rdrPlot.fig, ax=self.rdrPlot.grainAx, 
                                                                 plotColourBar=False, plotScaleBar = True) 
         self.rdrPlot.grainPlot.addColourBar(label='Effective Shear Strain', fraction=0.046, pad=0.04)
 
@@ -559,67 +538,597 @@ class GrainInspector:
     def saveFile(self,
         event, 
         plot):
-        """  Save a file which contains definitions of slip lines drawn in grains
-            [(x0, y0, x1, y1), angle, groupID]
-            and groups of lines, defined by an average angle and identified sip plane
-            [groupID, angle, [slip plane id(s)], [angular deviation(s)]]
+        """  Save the slip lines drawn in grains and their groups, see
+        :class:`SlipLineStore`. Files ending .txt are written in the
+        text format of previous versions, with a block for each grain of
+        lines [(x0, y0, x1, y1), angle, groupID]
+        and groups of lines, defined by an average angle and identified sip plane
+        [groupID, angle, [slip plane id(s)], [angular deviation(s)], RDR]
 
         """
-
-        with open(self.currMap.path + str(self.filename), 'w') as file:
-            file.write('# This is a file generated by defdap which contains definitions of slip lines drawn in grains by grainInspector\n')
-            file.write('# [(x0, y0, x1, y1), angle, groupID]\n')
-            file.write('# and groups of lines, defined by an average angle and identified sip plane\n')
-            file.write('# [groupID, angle, [slip plane id], [angular deviation]\n\n')
-
-            for i, grain in enumerate(self.currMap):
-                if grain.pointsList != []:
-                    file.write('Grain {0}\n'.format(i))
-                    file.write('{0} Lines\n'.format(len(grain.pointsList)))
-                    for point in grain.pointsList:
-                        file.write(str(point)+'\n')
-                    file.write('{0} Groups\n'.format(len(grain.groupsList)))
-                    for group in grain.groupsList:
-                        file.write(str(group)+'\n')
-                    file.write('\n')
+        filePath = pathlib.Path(self.currMap.path + str(self.filename))
+        if filePath.suffix == '.txt':
+            self.annotations.toText(filePath)
+        else:
+            self.annotations.save(filePath)
 
     def loadFile(self,
         event, 
         plot):
-        """  Load a file which contains definitions of slip lines drawn in grains
-            [(x0, y0, x1, y1), angle, groupID]
-            and groups of lines, defined by an average angle and identified sip plane
-            [groupID, angle, [slip plane id(s)], [angular deviation(s)]]
+        """  Load slip lines drawn in grains and their groups from a file
+        written by :func:`saveFile`, replacing the lines of those grains.
+        If an .npz file does not exist, a text file of the same name
+        written by previous versions is loaded instead.
 
         """
-
-        with open(self.currMap.path + str(self.filename), 'r') as file:
-            lines = file.readlines()
-
-        # Parse file and make list of 
-        # [start index, grain ID, number of lines, number of groups]
-        indexlist=[]
-        for i, line in enumerate(lines):
-            if line[0] != '#' and len(line) >1:
-                if ('Grain') in line:
-                    grainID = int(line.split(' ')[-1])
-                    startIndex = i
-                if ('Lines') in line:
-                    numLines = int(line.split(' ')[0])
-                if ('Groups') in line:
-                    numGroups = int(line.split(' ')[0])
-                    indexlist.append([startIndex, grainID, numLines, numGroups])
-
-        # Write data from file into grain
-        for startIndex, grainID, numLines, numGroups in indexlist:
-            startIndexLines = startIndex+2
-            grainPoints = lines[startIndexLines:startIndexLines+numLines]
-            for point in grainPoints:
-                self.currMap[grainID].pointsList.append(ast.literal_eval(point.split('\\')[0]))
-            
-            startIndexGroups = startIndex+3+numLines
-            grainGroups = lines[startIndexGroups:startIndexGroups+numGroups]
-            for group in grainGroups:
-                self.currMap[grainID].groupsList.append(ast.literal_eval(group.split('\\')[0]))
+        filePath = pathlib.Path(self.currMap.path + str(self.filename))
+        if filePath.suffix == '.npz' and not filePath.exists():
+            filePath = filePath.with_suffix('.txt')
+        store = SlipLineStore.load(filePath)
+        store.applyToMap(self.currMap)
+        self.annotations = SlipLineStore.fromMap(self.currMap)
 
         self.redraw()
+
+
+def rdrSamplePoints(
+    line: Sequence[float],
+    length: float = 2.5
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Points sampled for the relative displacement ratio of a slip
+    line. Points are spaced along the line and at each a line of points
+    perpendicular to the slip line is sampled.
+
+    Parameters
+    ----------
+    line
+        Start x, start y, end x, end y of the slip line, in grain
+        coordinates.
+    length
+        Length of the perpendicular lines.
+
+    Returns
+    -------
+    numpy.ndarray, numpy.ndarray
+        x and y coordinates of the sample points, shape (number of
+        points along the line, number of points on each perpendicular
+        line).
+
+    """
+    x0, y0, x1, y1 = np.array(line, dtype=float)
+    with np.errstate(divide='ignore'):
+        grad = (y1 - y0) / (x1 - x0)
+        invgrad = -1 / grad
+
+        # points along slip line
+        num = int(np.round(np.sqrt((y1 - y0)**2 + (x1 - x0)**2) * 2))
+        x, y = _uniquePoints(np.round(np.linspace(x0, x1, num)),
+                             np.round(np.linspace(y0, y1, num)))
+
+        # deviation from (0, 0) of points along a line perpendicular to
+        # the slip line
+        x0new = np.sqrt(length / (invgrad**2 + 1)) * np.sign(grad)
+        y0new = -np.sqrt(length / (1 / invgrad**2 + 1))
+        x1new = -np.sqrt(length / (invgrad**2 + 1)) * np.sign(grad)
+        y1new = np.sqrt(length / (1 / invgrad**2 + 1))
+    num = int(np.round(np.sqrt((y1new - y0new)**2 + (x1new - x0new)**2)))
+    xnew, ynew = _uniquePoints(
+        np.around(np.linspace(x0new, x1new, num)).astype(int),
+        np.around(np.linspace(y0new, y1new, num)).astype(int)
+    )
+
+    return ((x[:, np.newaxis] + xnew).astype(int),
+            (y[:, np.newaxis] + ynew).astype(int))
+
+
+def _uniquePoints(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Remove repeated points, keeping the first of each in order."""
+    if len(x) == 0:
+        return x, y
+    _, firstIdx = np.unique(np.stack((x, y), axis=1), axis=0,
+                            return_index=True)
+    firstIdx.sort()
+    return x[firstIdx], y[firstIdx]
+
+
+def calcGrainRDR(
+    dicMap: 'hrdic.Map',
+    grain: 'hrdic.Grain',
+    group: int,
+    length: float = 2.5,
+    xMap: Optional[np.ndarray] = None,
+    yMap: Optional[np.ndarray] = None
+) -> Optional[dict]:
+    """Calculate the relative displacement ratio (RDR) of a group of
+    slip lines drawn in a grain, without plotting. The x and y
+    displacements sampled along lines perpendicular to each slip line
+    (see :func:`rdrSamplePoints`) are centred on their mean along each
+    perpendicular line and the RDR is the slope of a linear regression
+    of x against y displacement.
+
+    Parameters
+    ----------
+    dicMap
+        DIC map the grain belongs to.
+    grain
+        DIC grain with slip lines in `pointsList`.
+    group
+        ID of the group of slip lines.
+    length
+        Length of the perpendicular lines.
+    xMap, yMap
+        Cropped x and y displacement maps, cropped from the map if not
+        given.
+
+    Returns
+    -------
+    dict or None
+        None if there are no lines in the group, otherwise with keys
+        'linRegResults' (results of `scipy.stats.linregress`), 'u' and
+        'v' (centred x and y displacement of the sample points) and 'x'
+        and 'y' (list of the grain coordinates of the points on each
+        perpendicular line).
+
+    """
+    lines = [point[0] for point in grain.pointsList if point[2] == group]
+    if len(lines) == 0:
+        return None
+
+    samples = [rdrSamplePoints(line, length=length) for line in lines]
+    xSamples = np.concatenate([xs.ravel() for xs, _ in samples])
+    ySamples = np.concatenate([ys.ravel() for _, ys in samples])
+    # perpendicular line each sample point is on
+    perpLines = np.concatenate([np.repeat(np.arange(xs.shape[0]), xs.shape[1])
+                                for xs, _ in samples])
+    perpLines += np.repeat(
+        np.cumsum([0] + [xs.shape[0] for xs, _ in samples[:-1]]),
+        [xs.size for xs, _ in samples]
+    )
+
+    # read displacements of all points through single cropped views
+    if xMap is None:
+        xMap = dicMap.crop(dicMap.x_map)
+    if yMap is None:
+        yMap = dicMap.crop(dicMap.y_map)
+    x0, y0 = grain.extremeCoords[:2]
+    u = xMap[y0 + ySamples, x0 + xSamples]
+    v = yMap[y0 + ySamples, x0 + xSamples]
+
+    # take away mean along each perpendicular line
+    numPoints = np.bincount(perpLines)
+    u = u - (np.bincount(perpLines, weights=u) / numPoints)[perpLines]
+    v = v - (np.bincount(perpLines, weights=v) / numPoints)[perpLines]
+
+    return {
+        'linRegResults': linregress(x=v, y=u),
+        'u': u,
+        'v': v,
+        'x': [row for xs, _ in samples for row in xs],
+        'y': [row for _, ys in samples for row in ys],
+    }
+
+
+def calcMapRDR(
+    dicMap: 'hrdic.Map',
+    grainIds: Optional[Sequence[int]] = None,
+    length: float = 2.5,
+    numWorkers: int = 1,
+    store: Optional['SlipLineStore'] = None
+) -> pd.DataFrame:
+    """Calculate the relative displacement ratio of every group of slip
+    lines in many grains of a map, see :func:`calcGrainRDR`. The
+    measured RDR is stored in the group of each grain.
+
+    Parameters
+    ----------
+    dicMap
+        DIC map with slip lines drawn or loaded.
+    grainIds
+        IDs of the grains, all grains with slip line groups if None.
+    length
+        Length of the perpendicular lines.
+    numWorkers
+        Number of threads to calculate groups in parallel.
+    store
+        Annotation store to update with the measured RDRs.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Table with a row per group, columns grainID, group, angle,
+        RDR, intercept, rValue, stdErr and numPoints.
+
+    """
+    if grainIds is None:
+        grainIds = range(len(dicMap))
+    tasks = [(grainID, group[0]) for grainID in grainIds
+             for group in dicMap[grainID].groupsList]
+
+    # crop once, which also calculates the displacement maps before any
+    # threads access them
+    xMap = dicMap.crop(dicMap.x_map)
+    yMap = dicMap.crop(dicMap.y_map)
+
+    def runTask(task):
+        grainID, group = task
+        return calcGrainRDR(dicMap, dicMap[grainID], group, length=length,
+                            xMap=xMap, yMap=yMap)
+
+    if numWorkers > 1:
+        with ThreadPoolExecutor(max_workers=numWorkers) as executor:
+            results = list(executor.map(runTask, tasks))
+    else:
+        results = [runTask(task) for task in tasks]
+
+    rows = []
+    for (grainID, group), result in zip(tasks, results):
+        grain = dicMap[grainID]
+        if result is None:
+            rows.append([grainID, group, grain.groupsList[group][1],
+                         np.nan, np.nan, np.nan, np.nan, 0])
+            continue
+        linRegResults = result['linRegResults']
+        grain.groupsList[group][4] = linRegResults.slope
+        rows.append([grainID, group, grain.groupsList[group][1],
+                     linRegResults.slope, linRegResults.intercept,
+                     linRegResults.rvalue, linRegResults.stderr,
+                     len(result['u'])])
+
+    if store is not None:
+        for grainID in sorted(set(grainID for grainID, _ in tasks)):
+            grain = dicMap[grainID]
+            store.setGrain(grainID, grain.pointsList, grain.groupsList)
+
+    return pd.DataFrame(rows, columns=['grainID', 'group', 'angle', 'RDR',
+                                      'intercept', 'rValue', 'stdErr',
+                                      'numPoints'])
+
+
+class SlipLineStore:
+    """Slip lines and line groups drawn in the grains of a DIC map,
+    stored in tables with a row per line, per group and per active slip
+    plane of a group, sorted by grain ID. Grain IDs are the index of
+    grains in the map, as shown by the grain inspector, not the
+    `grainID` attribute of grains. Grain line and group lists
+    (`pointsList` and `groupsList`) can be set from and written to the
+    store. Stores are saved to and loaded from .npz files.
+
+    Attributes
+    ----------
+    lines : numpy.ndarray
+        Record array of lines, fields grainID, x0, y0, x1, y1 (in grain
+        coordinates), angle and group.
+    groups : numpy.ndarray
+        Record array of line groups, fields grainID, group, angle and
+        rdr.
+    planes : numpy.ndarray
+        Record array of the slip planes of each group, fields grainID,
+        group, plane and deviation (angle between the group and the
+        slip trace).
+
+    """
+    lineDtype = np.dtype([('grainID', np.int32), ('x0', float), ('y0', float),
+                          ('x1', float), ('y1', float), ('angle', float),
+                          ('group', np.int32)])
+    groupDtype = np.dtype([('grainID', np.int32), ('group', np.int32),
+                           ('angle', float), ('rdr', float)])
+    planeDtype = np.dtype([('grainID', np.int32), ('group', np.int32),
+                           ('plane', np.int32), ('deviation', float)])
+    formatVersion = 1
+
+    def __init__(self):
+        self._lines = np.empty(0, dtype=self.lineDtype).view(np.recarray)
+        self._groups = np.empty(0, dtype=self.groupDtype).view(np.recarray)
+        self._planes = np.empty(0, dtype=self.planeDtype).view(np.recarray)
+        # edits not yet merged into the tables, rows of lines appended to
+        # grains and of lines, groups and planes replacing grains, keyed
+        # by grain ID
+        self._appendedLines = {}
+        self._replacedGrains = {}
+
+    def __len__(self):
+        return len(self.lines)
+
+    @property
+    def lines(self) -> np.ndarray:
+        self._mergeEdits()
+        return self._lines
+
+    @lines.setter
+    def lines(self, value: np.ndarray):
+        self._mergeEdits()
+        self._lines = value
+
+    @property
+    def groups(self) -> np.ndarray:
+        self._mergeEdits()
+        return self._groups
+
+    @groups.setter
+    def groups(self, value: np.ndarray):
+        self._mergeEdits()
+        self._groups = value
+
+    @property
+    def planes(self) -> np.ndarray:
+        self._mergeEdits()
+        return self._planes
+
+    @planes.setter
+    def planes(self, value: np.ndarray):
+        self._mergeEdits()
+        self._planes = value
+
+    def _mergeEdits(self):
+        """Merge appended lines and replaced grains into the tables,
+        keeping them sorted by grain ID.
+
+        """
+        if not self._appendedLines and not self._replacedGrains:
+            return
+
+        replacedIDs = np.array(list(self._replacedGrains), dtype=np.int32)
+        for i, name in enumerate(('_lines', '_groups', '_planes')):
+            table = getattr(self, name)
+            rows = [row for grainRows in self._replacedGrains.values()
+                    for row in grainRows[i]]
+            if name == '_lines':
+                rows += [row for grainRows in self._appendedLines.values()
+                         for row in grainRows]
+            if len(rows) == 0 and len(replacedIDs) == 0:
+                continue
+
+            table = np.concatenate((
+                table[~np.isin(table['grainID'], replacedIDs)],
+                np.array(rows, dtype=table.dtype)
+            ))
+            # stable, so appended lines stay after the others of a grain
+            table = table[np.argsort(table['grainID'], kind='stable')]
+            setattr(self, name, table.view(np.recarray))
+
+        self._appendedLines = {}
+        self._replacedGrains = {}
+
+    @property
+    def grainIDs(self) -> np.ndarray:
+        """IDs of grains with lines."""
+        return np.unique(self.lines.grainID)
+
+    @staticmethod
+    def _grainRows(table: np.ndarray, grainID: int) -> slice:
+        start, end = np.searchsorted(table.grainID, [grainID, grainID + 1])
+        return slice(start, end)
+
+    def linesOf(self, grainID: int) -> np.ndarray:
+        """Lines drawn in a grain."""
+        return self.lines[self._grainRows(self.lines, grainID)]
+
+    def groupsOf(self, grainID: int) -> np.ndarray:
+        """Line groups of a grain."""
+        return self.groups[self._grainRows(self.groups, grainID)]
+
+    def planesOf(self, grainID: int) -> np.ndarray:
+        """Slip planes of the line groups of a grain."""
+        return self.planes[self._grainRows(self.planes, grainID)]
+
+    def appendLine(
+        self,
+        grainID: int,
+        line: Sequence[float],
+        angle: float,
+        group: int = -1
+    ):
+        """Add a line to a grain, after its other lines. Edits are kept
+        until the tables are next read, then merged in one pass.
+
+        Parameters
+        ----------
+        grainID
+            ID of grain.
+        line
+            Start x, start y, end x, end y of the line.
+        angle
+            Angle of the line in degrees.
+        group
+            ID of the group of the line, -1 if not grouped.
+
+        """
+        row = (grainID, *line, angle, group)
+        if grainID in self._replacedGrains:
+            self._replacedGrains[grainID][0].append(row)
+        else:
+            self._appendedLines.setdefault(grainID, []).append(row)
+
+    def setGrain(self, grainID: int, pointsList: list, groupsList: list):
+        """Replace the lines and groups of a grain. Edits are kept until
+        the tables are next read, then merged in one pass.
+
+        Parameters
+        ----------
+        grainID
+            ID of grain.
+        pointsList
+            Lines, each [[x0, y0, x1, y1], angle, group], as stored in
+            a DIC grain.
+        groupsList
+            Groups, each [group, angle, [slip planes], [deviations],
+            RDR], as stored in a DIC grain.
+
+        """
+        self._appendedLines.pop(grainID, None)
+        self._replacedGrains[grainID] = (
+            [(grainID, *line, angle, group)
+             for line, angle, group in pointsList],
+            [(grainID, group[0], group[1], group[4]) for group in groupsList],
+            [(grainID, group[0], plane, deviation) for group in groupsList
+             for plane, deviation in zip(group[2], group[3])],
+        )
+
+    def grainLists(self, grainID: int) -> Tuple[list, list]:
+        """Lines and groups of a grain, in the format stored in a DIC
+        grain, see :func:`setGrain`.
+
+        Returns
+        -------
+        list, list
+            Lines and groups.
+
+        """
+        pointsList = [[[x0, y0, x1, y1], angle, group]
+                      for _, x0, y0, x1, y1, angle, group
+                      in self.linesOf(grainID).tolist()]
+        planes = self.planesOf(grainID)
+        groupsList = []
+        for group in self.groupsOf(grainID).tolist():
+            _, groupID, angle, rdr = group
+            groupPlanes = planes[planes.group == groupID]
+            groupsList.append([groupID, angle, groupPlanes.plane.tolist(),
+                               groupPlanes.deviation.tolist(), rdr])
+
+        return pointsList, groupsList
+
+    @classmethod
+    def fromMap(cls, dicMap: 'hrdic.Map') -> 'SlipLineStore':
+        """Build a store from the lines and groups of the grains of a
+        DIC map.
+
+        """
+        store = cls()
+        rows = ([], [], [])
+        for grainID, grain in enumerate(dicMap):
+            if grain.pointsList == []:
+                continue
+            rows[0].extend((grainID, *line, angle, group)
+                           for line, angle, group in grain.pointsList)
+            rows[1].extend((grainID, group[0], group[1], group[4])
+                           for group in grain.groupsList)
+            rows[2].extend((grainID, group[0], plane, deviation)
+                           for group in grain.groupsList
+                           for plane, deviation in zip(group[2], group[3]))
+        store.lines = np.array(rows[0], dtype=cls.lineDtype).view(np.recarray)
+        store.groups = np.array(rows[1],
+                                dtype=cls.groupDtype).view(np.recarray)
+        store.planes = np.array(rows[2],
+                                dtype=cls.planeDtype).view(np.recarray)
+
+        return store
+
+    def applyToMap(self, dicMap: 'hrdic.Map'):
+        """Set the lines and groups of the grains of a DIC map from the
+        store, replacing any existing lines of those grains.
+
+        """
+        for grainID in self.grainIDs.tolist():
+            grain = dicMap[grainID]
+            grain.pointsList, grain.groupsList = self.grainLists(grainID)
+
+    def toDataFrames(self) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Tables of lines, groups and group slip planes as data frames.
+
+        Returns
+        -------
+        pandas.DataFrame, pandas.DataFrame, pandas.DataFrame
+
+        """
+        return (pd.DataFrame(self.lines), pd.DataFrame(self.groups),
+                pd.DataFrame(self.planes))
+
+    def save(self, fileName: str, fileDir: str = ""):
+        """Save the store to an .npz file, replacing any existing file.
+
+        Parameters
+        ----------
+        fileName
+            File name, including extension.
+        fileDir
+            Path to file.
+
+        """
+        filePath = pathlib.Path(fileDir) / fileName
+        metadata = {'formatVersion': self.formatVersion}
+        with open(str(filePath), 'wb') as file:
+            np.savez_compressed(file, metadata=np.array(json.dumps(metadata)),
+                                lines=self.lines, groups=self.groups,
+                                planes=self.planes)
+
+    @classmethod
+    def load(cls, fileName: str, fileDir: str = "") -> 'SlipLineStore':
+        """Load a store from an .npz file written by :func:`save`, or
+        a text file written by previous versions of the grain inspector.
+
+        Parameters
+        ----------
+        fileName
+            File name, including extension.
+        fileDir
+            Path to file.
+
+        """
+        filePath = pathlib.Path(fileDir) / fileName
+        if filePath.suffix != '.npz':
+            return cls.fromText(filePath)
+
+        store = cls()
+        with np.load(str(filePath), allow_pickle=False) as archive:
+            metadata = json.loads(str(archive['metadata']))
+            if metadata.get('formatVersion', 0) > cls.formatVersion:
+                raise ValueError(f"File {filePath} was written by a newer "
+                                 f"version of defdap.")
+            for name, dtype in (('lines', cls.lineDtype),
+                                ('groups', cls.groupDtype),
+                                ('planes', cls.planeDtype)):
+                table = archive[name].astype(dtype)
+                # keep sorted by grain ID
+                table = table[np.argsort(table['grainID'], kind='stable')]
+                setattr(store, name, table.view(np.recarray))
+
+        return store
+
+    @classmethod
+    def fromText(cls, filePath: str) -> 'SlipLineStore':
+        """Load a store from a text file written by previous versions
+        of the grain inspector, with a block of lines and groups for
+        each grain.
+
+        """
+        with open(str(filePath), 'r') as file:
+            lines = [line for line in file.read().splitlines()
+                     if line and line[0] != '#']
+
+        store = cls()
+        i = 0
+        while i < len(lines):
+            grainID = int(lines[i].split(' ')[-1])
+            numLines = int(lines[i + 1].split(' ')[0])
+            pointsList = [ast.literal_eval(line.split('\\')[0])
+                          for line in lines[i + 2:i + 2 + numLines]]
+            i += 2 + numLines
+            numGroups = int(lines[i].split(' ')[0])
+            groupsList = [ast.literal_eval(line.split('\\')[0])
+                          for line in lines[i + 1:i + 1 + numGroups]]
+            i += 1 + numGroups
+            store.setGrain(grainID, pointsList, groupsList)
+
+        return store
+
+    def toText(self, filePath: str):
+        """Save the store to a text file in the format written by
+        previous versions of the grain inspector.
+
+        """
+        with open(str(filePath), 'w') as file:
+            file.write('# This is a file generated by defdap which contains definitions of slip lines drawn in grains by grainInspector\n')
+            file.write('# [(x0, y0, x1, y1), angle, groupID]\n')
+            file.write('# and groups of lines, defined by an average angle and identified sip plane\n')
+            file.write('# [groupID, angle, [slip plane id], [angular deviation]\n\n')
+
+            for grainID in self.grainIDs.tolist():
+                pointsList, groupsList = self.grainLists(grainID)
+                file.write('Grain {0}\n'.format(grainID))
+                file.write('{0} Lines\n'.format(len(pointsList)))
+                for point in pointsList:
+                    file.write(str(point)+'\n')
+                file.write('{0} Groups\n'.format(len(groupsList)))
+                for group in groupsList:
+                    file.write(str(group)+'\n')
+                file.write('\n')
@@ -230,6 +230,11 @@ class Quat(object):
 
     # overload * operator for quaternion product and vector product
     def __mul__(self, right: 'Quat', allow_southern: bool = False) -> 'Quat':
+        if isinstance(right, QuatArray):
+            return QuatArray(
+                QuatArray.quatProduct(self.quatCoef, right.quatCoef),
+                allow_southern=allow_southern
+            )
         if isinstance(right, type(self)):   # another quat
             newQuatCoef = np.zeros(4, dtype=float)
             newQuatCoef[0] = (
@@ -583,7 +588,7 @@ class Quat(object):
 # Static methods
 
     @staticmethod
-    def createManyQuats(eulerArray: np.ndarray) -> np.ndarray:
+    def createManyQuats(eulerArray: np.ndarray) -> 'QuatArray':
         """Create a an array of quats from an array of Euler angles.
 
         Parameters
@@ -593,28 +598,11 @@ class Quat(object):
 
         Returns
         -------
-        quats : numpy.ndarray(defdap.quat.Quat)
-            Array of quat objects of shape n x ... x m.
+        quats : defdap.quat.QuatArray
+            Array of quats of shape n x ... x m.
 
         """
-        ph1 = eulerArray[0]
-        phi = eulerArray[1]
-        ph2 = eulerArray[2]
-        oriShape = eulerArray.shape[1:]
-
-        quatComps = np.zeros((4,) + oriShape, dtype=float)
-
-        quatComps[0] = np.cos(phi / 2.0) * np.cos((ph1 + ph2) / 2.0)
-        quatComps[1] = -np.sin(phi / 2.0) * np.cos((ph1 - ph2) / 2.0)
-        quatComps[2] = -np.sin(phi / 2.0) * np.sin((ph1 - ph2) / 2.0)
-        quatComps[3] = -np.cos(phi / 2.0) * np.sin((ph1 + ph2) / 2.0)
-
-        quats = np.empty(oriShape, dtype=Quat)
-
-        for i, idx in enumerate(np.ndindex(oriShape)):
-            quats[idx] = Quat(quatComps[(slice(None),) + idx])
-
-        return quats
+        return QuatArray.fromEulerAngles(eulerArray)
 
     @staticmethod
     def multiplyManyQuats(quats: List['Quat'], right: 'Quat') -> List['Quat']:
@@ -662,6 +650,9 @@ class Quat(object):
             Array of quaternion components, shape (4, ..)
 
         """
+        if isinstance(quats, QuatArray):
+            return quats.quatCoef
+
         quats = np.array(quats)
         quat_comps = np.empty((4,) + quats.shape)
         for idx in np.ndindex(quats.shape):
@@ -1089,3 +1080,607 @@ class Quat(object):
         except KeyError:
             # return just identity if unknown structure
             return [Quat(1.0, 0.0, 0.0, 0.0)]
+
+
+class QuatArray(object):
+    """Class used to store and operate on an array of quaternions. The
+    quaternion components are held in a single contiguous array of shape
+    (4, ...) and individual orientations are only wrapped as
+    :class:`Quat` objects when an item is accessed. These are
+    interpreted in the passive sense.
+
+    Attributes
+    ----------
+    quatCoef : numpy.ndarray
+        Quaternion components, shape (4, ...).
+
+    """
+    __slots__ = ['quatCoef']
+
+    def __init__(
+        self,
+        quatCoef: np.ndarray,
+        allow_southern: Optional[bool] = False,
+        copy: Optional[bool] = True
+    ) -> None:
+        """Construct a QuatArray from an array of quaternion components.
+
+        Parameters
+        ----------
+        quatCoef
+            Quaternion components, shape (4, ...).
+        allow_southern
+            if False, move quats to northern hemisphere.
+        copy
+            If False, the component array is used directly where
+            possible rather than being copied.
+
+        """
+        if isinstance(quatCoef, QuatArray):
+            quatCoef = quatCoef.quatCoef
+        quatCoef = np.array(quatCoef, dtype=float, copy=copy)
+        if quatCoef.ndim < 1 or quatCoef.shape[0] != 4:
+            raise TypeError("Quaternion component array must have shape "
+                            "(4, ...)")
+
+        # move to northern hemisphere
+        if not allow_southern:
+            np.negative(quatCoef, out=quatCoef, where=quatCoef[0] < 0)
+
+        self.quatCoef = quatCoef
+
+    @classmethod
+    def fromQuats(cls, quats: Union[List['Quat'], np.ndarray]) -> 'QuatArray':
+        """Create a QuatArray from a list or object array of Quat objects.
+
+        Parameters
+        ----------
+        quats
+            Quat objects to copy the components of.
+
+        Returns
+        -------
+        defdap.quat.QuatArray
+
+        """
+        return cls(Quat.extract_quat_comps(quats), allow_southern=True,
+                   copy=False)
+
+    @classmethod
+    def identity(cls, shape: Union[int, Tuple[int, ...]]) -> 'QuatArray':
+        """Create an array of identity orientations.
+
+        Parameters
+        ----------
+        shape
+            Shape of the orientation array.
+
+        Returns
+        -------
+        defdap.quat.QuatArray
+
+        """
+        if isinstance(shape, int):
+            shape = (shape,)
+        quatCoef = np.zeros((4,) + tuple(shape), dtype=float)
+        quatCoef[0] = 1.
+        return cls(quatCoef, copy=False)
+
+    @classmethod
+    def fromEulerAngles(cls, eulerArray: np.ndarray) -> 'QuatArray':
+        """Create an array of quats from an array of Bunge Euler angles.
+
+        Parameters
+        ----------
+        eulerArray
+            Array of Bunge Euler angles in radians, shape (3, ...).
+
+        Returns
+        -------
+        defdap.quat.QuatArray
+            Initialised QuatArray, shape of `eulerArray` without the
+            first axis.
+
+        """
+        eulerArray = np.asarray(eulerArray, dtype=float)
+        if eulerArray.ndim < 1 or eulerArray.shape[0] != 3:
+            raise TypeError("Euler angle array must have shape (3, ...)")
+        ph1, phi, ph2 = eulerArray
+
+        quatCoef = np.empty((4,) + eulerArray.shape[1:], dtype=float)
+        quatCoef[0] = np.cos(phi / 2.0) * np.cos((ph1 + ph2) / 2.0)
+        quatCoef[1] = -np.sin(phi / 2.0) * np.cos((ph1 - ph2) / 2.0)
+        quatCoef[2] = -np.sin(phi / 2.0) * np.sin((ph1 - ph2) / 2.0)
+        quatCoef[3] = -np.cos(phi / 2.0) * np.sin((ph1 + ph2) / 2.0)
+
+        return cls(quatCoef, copy=False)
+
+    @classmethod
+    def fromAxisAngle(
+        cls,
+        axis: np.ndarray,
+        angle: Union[float, np.ndarray]
+    ) -> 'QuatArray':
+        """Create an array of quats from rotations around axes. This
+        creates quaternions to represent the passive rotation (-ve axis).
+
+        Parameters
+        ----------
+        axis
+            Axes that the rotations are applied around, shape (3, ...).
+            A single axis of shape 3 is broadcast against `angle`.
+        angle
+            Magnitude of rotations in radians, shape (...).
+
+        Returns
+        -------
+        defdap.quat.QuatArray
+            Initialised QuatArray.
+
+        """
+        axis = np.asarray(axis, dtype=float)
+        angle = np.asarray(angle, dtype=float)
+        if axis.ndim < 1 or axis.shape[0] != 3:
+            raise TypeError("Axis array must have shape (3, ...)")
+        if axis.ndim == 1:
+            axis = axis.reshape((3,) + (1,) * angle.ndim)
+
+        # normalise the axis vectors
+        axis = axis / np.sqrt(np.einsum("i...,i...->...", axis, axis))
+        shape = np.broadcast_shapes(axis.shape[1:], angle.shape)
+
+        quatCoef = np.empty((4,) + shape, dtype=float)
+        quatCoef[0] = np.cos(angle / 2)
+        quatCoef[1:4] = -np.sin(angle / 2) * axis
+
+        return cls(quatCoef, copy=False)
+
+    def __repr__(self) -> str:
+        return "QuatArray(shape={})".format(self.shape)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.quatCoef.shape[1:]
+
+    @property
+    def ndim(self) -> int:
+        return self.quatCoef.ndim - 1
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    def __len__(self) -> int:
+        if self.ndim == 0:
+            raise TypeError("len() of unsized QuatArray")
+        return self.shape[0]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, key) -> Union['Quat', 'QuatArray']:
+        if not isinstance(key, tuple):
+            key = (key,)
+        quatCoef = self.quatCoef[(slice(None),) + key]
+        if quatCoef.ndim == 1:
+            # single orientation, return a Quat that views the components
+            quat = Quat.__new__(Quat)
+            quat.quatCoef = quatCoef
+            return quat
+        return QuatArray(quatCoef, allow_southern=True, copy=False)
+
+    def __setitem__(self, key, value: Union['Quat', 'QuatArray']) -> None:
+        if isinstance(value, (Quat, QuatArray)):
+            value = value.quatCoef
+        value = np.asarray(value, dtype=float)
+        if not isinstance(key, tuple):
+            key = (key,)
+        # move the component axis last so values broadcast against the key
+        np.moveaxis(self.quatCoef, 0, -1)[key] = np.moveaxis(value, 0, -1)
+
+    def eulerAngles(self) -> np.ndarray:
+        """Calculate the Euler angle representation for these rotations.
+        Gimbal lock cases are handled in the same way as
+        :func:`Quat.eulerAngles`.
+
+        Returns
+        -------
+        eulers : numpy.ndarray, shape (3, ...)
+            Bunge euler angles (in radians).
+
+        """
+        q = self.quatCoef
+        q03 = q[0]**2 + q[3]**2
+        q12 = q[1]**2 + q[2]**2
+        chi = np.sqrt(q03 * q12)
+
+        eulers = np.zeros((3,) + self.shape, dtype=float)
+
+        general = chi != 0
+        chiGen = np.where(general, chi, 1.)
+
+        cosPh1 = (-q[0] * q[1] - q[2] * q[3]) / chiGen
+        sinPh1 = (-q[0] * q[2] + q[1] * q[3]) / chiGen
+        cosPhi = q03 - q12
+        sinPhi = 2 * chi
+        cosPh2 = (-q[0] * q[1] + q[2] * q[3]) / chiGen
+        sinPh2 = (q[1] * q[3] + q[0] * q[2]) / chiGen
+
+        eulers[0] = np.arctan2(sinPh1, cosPh1)
+        eulers[1] = np.arctan2(sinPhi, cosPhi)
+        eulers[2] = np.arctan2(sinPh2, cosPh2)
+
+        # rotation around z only
+        mask = ~general & (q12 == 0)
+        eulers[0][mask] = np.arctan2(-2 * q[0] * q[3],
+                                     q[0]**2 - q[3]**2)[mask]
+        eulers[1][mask] = 0
+        eulers[2][mask] = 0
+
+        # phi = pi
+        mask = ~general & (q03 == 0)
+        eulers[0][mask] = np.arctan2(2 * q[1] * q[2],
+                                     q[1]**2 - q[2]**2)[mask]
+        eulers[1][mask] = np.pi
+        eulers[2][mask] = 0
+
+        eulers[0][eulers[0] < 0] += 2 * np.pi
+        eulers[2][eulers[2] < 0] += 2 * np.pi
+
+        return eulers
+
+    def rotMatrix(self) -> np.ndarray:
+        """Calculate the rotation matrix representation for these
+        rotations.
+
+        Returns
+        -------
+        rotMatrix : numpy.ndarray, shape (3, 3, ...)
+            Rotation matrices.
+
+        """
+        q = self.quatCoef
+        qbar = q[0]**2 - q[1]**2 - q[2]**2 - q[3]**2
+
+        rotMatrix = np.empty((3, 3) + self.shape, dtype=float)
+
+        rotMatrix[0, 0] = qbar + 2 * q[1]**2
+        rotMatrix[0, 1] = 2 * (q[1] * q[2] - q[0] * q[3])
+        rotMatrix[0, 2] = 2 * (q[1] * q[3] + q[0] * q[2])
+
+        rotMatrix[1, 0] = 2 * (q[1] * q[2] + q[0] * q[3])
+        rotMatrix[1, 1] = qbar + 2 * q[2]**2
+        rotMatrix[1, 2] = 2 * (q[2] * q[3] - q[0] * q[1])
+
+        rotMatrix[2, 0] = 2 * (q[1] * q[3] - q[0] * q[2])
+        rotMatrix[2, 1] = 2 * (q[2] * q[3] + q[0] * q[1])
+        rotMatrix[2, 2] = qbar + 2 * q[3]**2
+
+        return rotMatrix
+
+    def transformVector(self, vector: np.ndarray) -> np.ndarray:
+        """Transform vector(s) by each quaternion, see
+        :func:`Quat.transformVector`.
+
+        Parameters
+        ----------
+        vector
+            Vector to transform, shape 3, or vectors broadcast against
+            this array, shape (3, ...).
+
+        Returns
+        -------
+        numpy.ndarray, shape (3, ...)
+            Transformed vectors.
+
+        """
+        vector = np.asarray(vector, dtype=float)
+        if vector.ndim < 1 or vector.shape[0] != 3:
+            raise TypeError("Vector must have shape (3, ...).")
+
+        vectorComps = np.zeros((4,) + vector.shape[1:], dtype=float)
+        vectorComps[1:] = vector
+        if vector.ndim == 1:
+            vectorComps = vectorComps.reshape((4,) + (1,) * self.ndim)
+
+        transformed = QuatArray.quatProduct(
+            self.quatCoef,
+            QuatArray.quatProduct(vectorComps, self.conjugate.quatCoef)
+        )
+        return transformed[1:4]
+
+    def copy(self) -> 'QuatArray':
+        return QuatArray(self.quatCoef, allow_southern=True, copy=True)
+
+    def reshape(self, *shape) -> 'QuatArray':
+        if len(shape) == 1 and isinstance(shape[0], (tuple, list)):
+            shape = tuple(shape[0])
+        return QuatArray(self.quatCoef.reshape((4,) + shape),
+                         allow_southern=True, copy=False)
+
+    def flatten(self) -> 'QuatArray':
+        return QuatArray(self.quatCoef.reshape(4, -1), allow_southern=True)
+
+    def toQuatList(self) -> List['Quat']:
+        """Return the orientations as a flat list of Quat objects.
+
+        Returns
+        -------
+        list of defdap.quat.Quat
+
+        """
+        return [Quat(coefs) for coefs in self.quatCoef.reshape(4, -1).T]
+
+    @staticmethod
+    def quatProduct(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """Hamilton product of two arrays of quaternion components,
+        broadcasting over all but the first axis.
+
+        Parameters
+        ----------
+        left
+            Left hand quaternion components, shape (4, ...).
+        right
+            Right hand quaternion components, shape (4, ...).
+
+        Returns
+        -------
+        numpy.ndarray
+            Product components, shape (4, ...).
+
+        """
+        l0, l1, l2, l3 = left
+        r0, r1, r2, r3 = right
+        return np.stack([
+            l0 * r0 - l1 * r1 - l2 * r2 - l3 * r3,
+            l0 * r1 + l1 * r0 + l2 * r3 - l3 * r2,
+            l0 * r2 + l2 * r0 + l3 * r1 - l1 * r3,
+            l0 * r3 + l3 * r0 + l1 * r2 - l2 * r1,
+        ])
+
+    @staticmethod
+    def _comps(quats: Union['Quat', 'QuatArray']) -> np.ndarray:
+        if isinstance(quats, (Quat, QuatArray)):
+            return quats.quatCoef
+        raise TypeError("Input must be a Quat or QuatArray.")
+
+    def __mul__(
+        self,
+        right: Union['Quat', 'QuatArray'],
+        allow_southern: bool = False
+    ) -> 'QuatArray':
+        return QuatArray(
+            QuatArray.quatProduct(self.quatCoef, QuatArray._comps(right)),
+            allow_southern=allow_southern, copy=False
+        )
+
+    def __rmul__(self, left: 'Quat') -> 'QuatArray':
+        return QuatArray(
+            QuatArray.quatProduct(QuatArray._comps(left), self.quatCoef),
+            copy=False
+        )
+
+    def dot(self, right: Union['Quat', 'QuatArray']) -> np.ndarray:
+        """Calculate dot product with a quaternion or array of
+        quaternions, broadcasting over the array shape.
+
+        Parameters
+        ----------
+        right
+            Right hand quaternion(s).
+
+        Returns
+        -------
+        numpy.ndarray
+            Dot products, shape of the broadcast arrays.
+
+        """
+        rightComps = QuatArray._comps(right)
+        if rightComps.ndim == 1:
+            return np.tensordot(rightComps, self.quatCoef, axes=(0, 0))
+        return np.einsum("i...,i...->...", self.quatCoef, rightComps)
+
+    def norm(self) -> np.ndarray:
+        """Calculate the norm of each quaternion.
+
+        Returns
+        -------
+        numpy.ndarray
+            Norms, shape of the array.
+
+        """
+        return np.sqrt(np.einsum("i...,i...->...",
+                                 self.quatCoef, self.quatCoef))
+
+    def normalise(self) -> None:
+        """Normalise every quaternion in place (turn them into unit
+        quaternions).
+
+        """
+        self.quatCoef /= self.norm()
+
+    @property
+    def conjugate(self) -> 'QuatArray':
+        """Calculate the conjugate of each quaternion.
+
+        Returns
+        -------
+        defdap.quat.QuatArray
+            Conjugate of quaternions.
+
+        """
+        quatCoef = self.quatCoef.copy()
+        quatCoef[1:] *= -1
+        return QuatArray(quatCoef, copy=False)
+
+    @staticmethod
+    def symMatrices(symGroup: str) -> np.ndarray:
+        """Left multiplication matrices for the symmetries of a crystal
+        structure, so that ``sym * q`` is ``symMats[i] @ q``.
+
+        Parameters
+        ----------
+        symGroup
+            Crystal type (cubic, hexagonal).
+
+        Returns
+        -------
+        numpy.ndarray
+            Shape (numSym, 4, 4).
+
+        """
+        syms = np.array([sym.quatCoef for sym in Quat.symEqv(symGroup)])
+        s0, s1, s2, s3 = syms.T
+        return np.stack([
+            np.stack([s0, -s1, -s2, -s3], axis=-1),
+            np.stack([s1, s0, -s3, s2], axis=-1),
+            np.stack([s2, s3, s0, -s1], axis=-1),
+            np.stack([s3, -s2, s1, s0], axis=-1),
+        ], axis=1)
+
+    def calcSymEqvs(self, symGroup: str) -> np.ndarray:
+        """Calculate all symmetrically equivalent quaternions.
+
+        Parameters
+        ----------
+        symGroup
+            Crystal type (cubic, hexagonal).
+
+        Returns
+        -------
+        numpy.ndarray
+            Symmetric equivalent quaternion components, shape
+            (numSym, 4, ...), in the northern hemisphere.
+
+        """
+        quatComps = np.tensordot(QuatArray.symMatrices(symGroup),
+                                 self.quatCoef, axes=(2, 0))
+        np.negative(quatComps, out=quatComps,
+                    where=quatComps[:, 0:1] < 0)
+        return quatComps
+
+    def applySym(self, symGroup: str, symIdx: np.ndarray) -> 'QuatArray':
+        """Apply one symmetry operator of a crystal structure to each
+        quaternion, giving ``sym[symIdx] * q``.
+
+        Parameters
+        ----------
+        symGroup
+            Crystal type (cubic, hexagonal).
+        symIdx
+            Index of the symmetry operator to apply to each quaternion,
+            broadcast against this array.
+
+        Returns
+        -------
+        defdap.quat.QuatArray
+            Symmetric equivalent orientations.
+
+        """
+        symIdx = np.asarray(symIdx)
+        shape = np.broadcast_shapes(self.shape, symIdx.shape)
+        quatComps = np.broadcast_to(self.quatCoef, (4,) + shape)
+        symIdx = np.broadcast_to(symIdx, shape)
+
+        quatCompsSym = np.empty((4,) + shape, dtype=float)
+        for i, sym in enumerate(Quat.symEqv(symGroup)):
+            mask = symIdx == i
+            if mask.any():
+                quatCompsSym[:, mask] = QuatArray.quatProduct(
+                    sym.quatCoef, quatComps[:, mask]
+                )
+
+        return QuatArray(quatCompsSym, copy=False)
+
+    def misOriSymIdx(
+        self,
+        right: Union['Quat', 'QuatArray'],
+        symGroup: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculate misorientation between this array and another
+        orientation or array of orientations and the index of the
+        symmetry operator acting on `right` that gives it. Angle is
+        2*arccos(output).
+
+        Parameters
+        ----------
+        right
+            Orientation(s) to find misorientation to, broadcast against
+            this array.
+        symGroup
+            Crystal type (cubic, hexagonal).
+
+        Returns
+        -------
+        numpy.ndarray
+            Minimum misorientation.
+        numpy.ndarray
+            Index of symmetry operator in :func:`Quat.symEqv` giving the
+            minimum misorientation.
+
+        """
+        # dot(self, s * right) == dot(conj(s), right * conj(self)), so
+        # only one quaternion product is required for all symmetries
+        diff = QuatArray.quatProduct(
+            QuatArray._comps(right), self.conjugate.quatCoef
+        )
+        # keep a running maximum over the symmetries rather than
+        # forming a (numSym, ...) array to bound memory on large maps
+        minMisOri = np.zeros(diff.shape[1:], dtype=float)
+        symIdx = np.zeros(diff.shape[1:], dtype=int)
+        for i, sym in enumerate(Quat.symEqv(symGroup)):
+            s = sym.quatCoef
+            currentMisOri = np.abs(s[0] * diff[0] - s[1] * diff[1] -
+                                   s[2] * diff[2] - s[3] * diff[3])
+            better = currentMisOri > minMisOri
+            minMisOri[better] = currentMisOri[better]
+            symIdx[better] = i
+        np.minimum(minMisOri, 1., out=minMisOri)
+
+        return minMisOri, symIdx
+
+    def misOri(
+        self,
+        right: Union['Quat', 'QuatArray'],
+        symGroup: str,
+        returnQuat: Optional[int] = 0
+    ) -> Union[np.ndarray, 'QuatArray',
+               Tuple[np.ndarray, 'QuatArray']]:
+        """Calculate misorientation angle between this array and
+        another orientation or array of orientations, taking into
+        account the symmetries of the crystal structure. Angle is
+        2*arccos(output).
+
+        Parameters
+        ----------
+        right
+            Orientation(s) to find misorientation to, broadcast against
+            this array.
+        symGroup
+            Crystal type (cubic, hexagonal).
+        returnQuat
+            What to return: 0 for minimum misorientation, 1 for
+            symmetric equivalent with minimum misorientation, 2 for both.
+
+        Returns
+        -------
+        numpy.ndarray
+            Minimum misorientation.
+        defdap.quat.QuatArray
+            Symmetric equivalent orientations with minimum misorientation.
+
+        """
+        minMisOri, symIdx = self.misOriSymIdx(right, symGroup)
+
+        if returnQuat == 0:
+            return minMisOri
+
+        if isinstance(right, Quat):
+            right = QuatArray(right.quatCoef.reshape((4,) + (1,) * self.ndim),
+                              allow_southern=True, copy=False)
+        minQuatSym = right.applySym(symGroup, symIdx)
+
+        if returnQuat == 1:
+            return minQuatSym
+        return minMisOri, minQuatSym
@@ -16,6 +16,10 @@
 import functools
 from datetime import datetime
 
+import numpy as np
+from scipy import ndimage, sparse
+from scipy.sparse import csgraph
+
 
 def reportProgress(message: str = ""):
     """Decorator for reporting progress of given function
@@ -67,3 +71,488 @@ def reportProgress(message: str = ""):
         return wrapper
     return decorator
 
+
+class LazyAttribute(object):
+    """Map attribute calculated on first access and kept until one of
+    the attributes it depends on is set, see
+    :func:`defdap.base.Map.invalidate`. Setting the attribute replaces
+    the calculated value until it is next invalidated. Create with the
+    :func:`lazyAttribute` decorator.
+
+    Parameters
+    ----------
+    func : callable
+        Method calculating the value of the attribute.
+    dependencies : tuple of str
+        Names of the attributes the value depends on.
+
+    """
+    def __init__(self, func, dependencies):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = func.__name__
+        self.dependencies = tuple(dependencies)
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objType=None):
+        if obj is None:
+            return self
+        values = obj.__dict__.setdefault('_lazyValues', {})
+        if self.name not in values:
+            values[self.name] = self.func(obj)
+        return values[self.name]
+
+    def __set__(self, obj, value):
+        obj.__dict__.setdefault('_lazyValues', {})[self.name] = value
+
+    def __delete__(self, obj):
+        obj.__dict__.get('_lazyValues', {}).pop(self.name, None)
+
+
+def lazyAttribute(*dependencies):
+    """Decorator turning a map method into a :class:`LazyAttribute`,
+    calculated on first access and reset when any of the named
+    attributes it depends on are set.
+
+    Parameters
+    ----------
+    dependencies : str
+        Names of the attributes the value depends on, including other
+        lazy attributes.
+
+    """
+    def decorator(func):
+        return LazyAttribute(func, dependencies)
+    return decorator
+
+
+def distanceTransform(points, halfOffset=False, returnIndices=False):
+    """Exact Euclidean distance from each point of a map to the nearest
+    of a set of feature points, in linear time.
+
+    Parameters
+    ----------
+    points : numpy.ndarray of bool
+        True at the feature points, shape (y, x).
+    halfOffset : bool
+        If True, feature points are placed half a pixel down and right
+        of their pixel, at the corner they share with their neighbours.
+        The transform is then calculated on a grid of twice the
+        resolution.
+    returnIndices : bool
+        If True, also return the (y, x) indices of the nearest feature
+        point to each point.
+
+    Returns
+    -------
+    distances : numpy.ndarray
+        Distance in pixels to the nearest feature point, inf if there
+        are none.
+    indices : numpy.ndarray, optional
+        Indices of the nearest feature point, shape (2, y, x). -1 if
+        there are no feature points.
+
+    """
+    points = np.asarray(points, dtype=bool)
+    if not points.any():
+        distances = np.full(points.shape, np.inf)
+        if returnIndices:
+            return distances, np.full((2,) + points.shape, -1)
+        return distances
+
+    if not halfOffset:
+        return ndimage.distance_transform_edt(
+            ~points, return_indices=returnIndices
+        )
+
+    # feature points at odd and map points at even positions of a
+    # grid with twice the resolution
+    fineGrid = np.ones((2 * points.shape[0], 2 * points.shape[1]),
+                       dtype=bool)
+    fineGrid[1::2, 1::2][points] = False
+    result = ndimage.distance_transform_edt(
+        fineGrid, return_indices=returnIndices
+    )
+    if returnIndices:
+        distances, indices = result
+        return distances[::2, ::2] / 2, indices[:, ::2, ::2] // 2
+    return result[::2, ::2] / 2
+
+
+def tileSlices(size, tileSize=None, halo=0):
+    """Split an axis of an array into tiles, optionally extended by a
+    halo of overlapping points for neighbourhood operations.
+
+    Parameters
+    ----------
+    size : int
+        Length of the axis.
+    tileSize : int, optional
+        Number of points in each tile. One tile covering the whole
+        axis if not given.
+    halo : int
+        Number of points to extend each tile by on either side,
+        clipped to the axis.
+
+    Yields
+    ------
+    tile : slice
+        Points in the tile.
+    padded : slice
+        Points in the tile and its halo.
+    core : slice
+        The tile relative to the padded region.
+
+    """
+    if tileSize is None:
+        tileSize = size
+    tileSize = max(int(tileSize), 1)
+
+    for start in range(0, size, tileSize):
+        stop = min(start + tileSize, size)
+        padStart = max(start - halo, 0)
+        padStop = min(stop + halo, size)
+        yield (slice(start, stop), slice(padStart, padStop),
+               slice(start - padStart, stop - padStart))
+
+
+def labelConnected(mask, boundariesX=None, boundariesY=None, tileSize=None):
+    """Label 4-connected regions of points in a mask, where neighbouring
+    points are not connected across a boundary. Labels are ordered by the
+    first point of each region in raster order, matching the order
+    regions would be found by a flood fill seeded in raster order.
+
+    Parameters
+    ----------
+    mask : numpy.ndarray of bool
+        Points to label, shape (y, x).
+    boundariesX : numpy.ndarray of bool, optional
+        True where there is a boundary between a point and its neighbour
+        in the positive x direction.
+    boundariesY : numpy.ndarray of bool, optional
+        True where there is a boundary between a point and its neighbour
+        in the positive y direction.
+    tileSize : int, optional
+        Number of rows to label at a time, to limit memory use on large
+        maps. Regions are joined across the seams between tiles. All
+        rows are labelled together by default.
+
+    Returns
+    -------
+    labels : numpy.ndarray of int
+        Label of each point, 1-based and 0 for points not in the mask.
+    numLabels : int
+        Number of regions found.
+
+    """
+    mask = np.asarray(mask, dtype=bool)
+    if tileSize is not None and tileSize < mask.shape[0]:
+        return labelConnectedTiled(mask, boundariesX, boundariesY, tileSize)
+
+    flatMask = mask.ravel()
+    pointIdx = np.arange(mask.size).reshape(mask.shape)
+
+    # edges of the graph between connected neighbouring points
+    connX = mask[:, :-1] & mask[:, 1:]
+    if boundariesX is not None:
+        connX &= ~boundariesX[:, :-1]
+    connY = mask[:-1] & mask[1:]
+    if boundariesY is not None:
+        connY &= ~boundariesY[:-1]
+    edgeStart = np.concatenate((pointIdx[:, :-1][connX], pointIdx[:-1][connY]))
+    edgeEnd = np.concatenate((pointIdx[:, 1:][connX], pointIdx[1:][connY]))
+
+    graph = sparse.coo_matrix(
+        (np.ones(len(edgeStart), dtype=np.int8), (edgeStart, edgeEnd)),
+        shape=(mask.size, mask.size)
+    )
+    _, components = csgraph.connected_components(graph, directed=False)
+
+    # relabel in order of first occurrence
+    _, firstIdx, inverse = np.unique(components[flatMask], return_index=True,
+                                     return_inverse=True)
+    rank = np.empty(len(firstIdx), dtype=int)
+    rank[np.argsort(firstIdx)] = np.arange(1, len(firstIdx) + 1)
+
+    labels = np.zeros(mask.size, dtype=int)
+    labels[flatMask] = rank[inverse]
+
+    return labels.reshape(mask.shape), len(firstIdx)
+
+
+def labelConnectedTiled(mask, boundariesX, boundariesY, tileSize):
+    """Label connected regions tile by tile and join regions across the
+    seams between tiles, see :func:`labelConnected`.
+
+    """
+    labels = np.zeros(mask.shape, dtype=int)
+    numLabels = 0
+    seamStarts, seamEnds = [], []
+    for rows, _, _ in tileSlices(mask.shape[0], tileSize):
+        tileLabels, tileNumLabels = labelConnected(
+            mask[rows],
+            None if boundariesX is None else boundariesX[rows],
+            None if boundariesY is None else boundariesY[rows]
+        )
+        tileLabels[tileLabels > 0] += numLabels
+        labels[rows] = tileLabels
+        numLabels += tileNumLabels
+
+        # regions connected across the seam with the previous tile
+        if rows.start > 0:
+            above = labels[rows.start - 1]
+            below = labels[rows.start]
+            conn = (above > 0) & (below > 0)
+            if boundariesY is not None:
+                conn &= ~boundariesY[rows.start - 1]
+            seamStarts.append(above[conn])
+            seamEnds.append(below[conn])
+
+    seamStarts = np.concatenate(seamStarts)
+    seamEnds = np.concatenate(seamEnds)
+    graph = sparse.coo_matrix(
+        (np.ones(len(seamStarts), dtype=np.int8), (seamStarts, seamEnds)),
+        shape=(numLabels + 1, numLabels + 1)
+    )
+    numComponents, components = csgraph.connected_components(
+        graph, directed=False
+    )
+
+    # tile labels are in order of first occurrence so order joined
+    # regions by their lowest tile label
+    components = components[1:]
+    firstLabel = np.full(numComponents, numLabels + 1)
+    np.minimum.at(firstLabel, components, np.arange(1, numLabels + 1))
+    present = firstLabel <= numLabels
+    rank = np.zeros(numComponents, dtype=int)
+    rank[np.argsort(firstLabel)[:present.sum()]] = \
+        np.arange(1, present.sum() + 1)
+
+    lookup = np.zeros(numLabels + 1, dtype=int)
+    lookup[1:] = rank[components]
+
+    return lookup[labels], int(present.sum())
+
+
+def removeSmallLabels(labels, minSize, fillValue=-2):
+    """Remove labelled regions smaller than a minimum size, renumbering
+    the remaining regions sequentially whilst keeping their order.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray of int
+        Label image, with regions labelled from 1. Values less than 1 are
+        left unchanged.
+    minSize : int
+        Minimum number of points in a region.
+    fillValue : int
+        Value given to points in removed regions.
+
+    Returns
+    -------
+    numpy.ndarray of int
+        New label image.
+    int
+        Number of remaining regions.
+
+    """
+    labelled = labels > 0
+    sizes = np.bincount(labels[labelled], minlength=1)
+
+    keep = sizes >= minSize
+    keep[0] = False
+    numLabels = int(keep.sum())
+
+    lookup = np.full(len(sizes), fillValue, dtype=int)
+    lookup[keep] = np.arange(1, numLabels + 1)
+
+    newLabels = np.copy(labels)
+    newLabels[labelled] = lookup[labels[labelled]]
+
+    return newLabels, numLabels
+
+
+# statistics calculated by `labelStats`
+LABEL_STATS = ('count', 'sum', 'mean', 'var', 'std', 'min', 'max', 'median',
+               'percentile')
+
+
+def labelStats(labels, data, numLabels, stats=('mean',), weights=None,
+               percentiles=(), ignoreNan=True):
+    """Calculate statistics of data in each labelled region, for any
+    number of fields at once. Sums, means and variances are calculated
+    with bincounts, minimums and maximums by reducing over the points
+    sorted by label and percentiles from the sorted values of each
+    region.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray of int
+        Label image, regions labelled 1 to `numLabels`. Other points
+        are ignored.
+    data : numpy.ndarray
+        Data to calculate statistics of, shape of the label image or
+        with leading field dimensions, e.g. (3, y, x).
+    numLabels : int
+        Number of regions.
+    stats : list of str
+        Statistics to calculate, from 'count' (number of points used),
+        'sum', 'mean', 'var', 'std', 'min', 'max', 'median' and
+        'percentile'.
+    weights : numpy.ndarray, optional
+        Weight of each point, shape of the label image. Used for the
+        sum, mean and variance.
+    percentiles : list of float
+        Percentiles to calculate for the 'percentile' statistic.
+    ignoreNan : bool
+        If True, NaN values are ignored, otherwise statistics of
+        regions containing NaN values are NaN.
+
+    Returns
+    -------
+    dict
+        Statistics keyed by name, each of shape (numLabels, *fieldShape)
+        and (numLabels, numPercentiles, *fieldShape) for percentiles.
+        NaN for regions with no points.
+
+    """
+    unknownStats = set(stats) - set(LABEL_STATS)
+    if unknownStats:
+        raise ValueError(f"Unknown statistics {sorted(unknownStats)}, "
+                         f"must be from {LABEL_STATS}.")
+
+    labels = np.asarray(labels)
+    data = np.asarray(data, dtype=float)
+    fieldShape = data.shape[:data.ndim - labels.ndim]
+    numFields = int(np.prod(fieldShape, dtype=int))
+
+    flatLabels = labels.ravel()
+    inLabel = (flatLabels > 0) & (flatLabels <= numLabels)
+    labelIdx = flatLabels[inLabel] - 1
+    values = data.reshape(numFields, -1)[:, inLabel]
+    if ignoreNan:
+        valid = ~np.isnan(values)
+        values = np.where(valid, values, 0.)
+    else:
+        valid = np.ones(values.shape, dtype=bool)
+    if weights is None:
+        pointWeights = valid.astype(float)
+    else:
+        pointWeights = np.where(
+            valid, np.asarray(weights, dtype=float).ravel()[inLabel], 0.
+        )
+
+    # bin of each point in each field, to bincount all fields at once
+    binIdx = (labelIdx + numLabels * np.arange(numFields)[:, None]).ravel()
+
+    def binSum(binValues):
+        return np.bincount(
+            binIdx, weights=binValues.ravel(), minlength=numFields * numLabels
+        ).reshape(numFields, numLabels)
+
+    results = {}
+    count = binSum(valid)
+    results['count'] = count
+    if {'sum', 'mean', 'var', 'std'} & set(stats):
+        total = binSum(pointWeights * values)
+        results['sum'] = total
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weightTotal = binSum(pointWeights)
+            mean = total / weightTotal
+            results['mean'] = mean
+            if {'var', 'std'} & set(stats):
+                var = binSum(
+                    pointWeights * (values - mean[:, labelIdx])**2
+                ) / weightTotal
+                results['var'] = var
+                results['std'] = np.sqrt(var)
+
+    if {'min', 'max', 'median', 'percentile'} & set(stats):
+        order = np.argsort(labelIdx, kind='stable')
+        numPoints = np.bincount(labelIdx, minlength=numLabels)
+        starts = np.concatenate(([0], np.cumsum(numPoints)[:-1]))
+        hasPoints = numPoints > 0
+        if not ignoreNan:
+            hasNan = binSum(np.isnan(values)) > 0
+
+    for stat, reduce in (('min', np.fmin), ('max', np.fmax)):
+        if stat not in stats:
+            continue
+        if not ignoreNan:
+            reduce = np.minimum if stat == 'min' else np.maximum
+        sortedValues = np.where(valid, values, np.nan)[:, order]
+        result = np.full((numFields, numLabels), np.nan)
+        if hasPoints.any():
+            result[:, hasPoints] = reduce.reduceat(
+                sortedValues, starts[hasPoints], axis=1
+            )
+        results[stat] = result
+
+    if {'median', 'percentile'} & set(stats):
+        quantiles = np.append(np.asarray(percentiles, dtype=float), 50.) / 100
+        result = np.full((len(quantiles), numFields, numLabels), np.nan)
+        for i in range(numFields):
+            fieldValues = np.where(valid[i], values[i], np.nan)
+            # invalid values sort to the end of each region
+            sortedValues = fieldValues[np.lexsort((fieldValues, labelIdx))]
+            numValid = count[i].astype(int)
+            inRegion = numValid > 0
+            for j, quantile in enumerate(quantiles):
+                pos = quantile * (numValid[inRegion] - 1)
+                low = np.floor(pos).astype(int)
+                high = np.minimum(low + 1, numValid[inRegion] - 1)
+                lowValues = sortedValues[starts[inRegion] + low]
+                highValues = sortedValues[starts[inRegion] + high]
+                result[j, i, inRegion] = (lowValues + (pos - low) *
+                                          (highValues - lowValues))
+        if not ignoreNan:
+            result[:, hasNan] = np.nan
+        results['median'] = result[-1]
+        results['percentile'] = result[:-1]
+
+    outputs = {}
+    for stat in stats:
+        result = results[stat]
+        if stat == 'percentile':
+            outputs[stat] = result.transpose(2, 0, 1).reshape(
+                (numLabels, len(quantiles) - 1) + fieldShape
+            )
+        else:
+            if stat == 'count':
+                result = result.astype(int)
+            outputs[stat] = result.T.reshape((numLabels,) + fieldShape)
+
+    return outputs
+
+
+def labelMap(labels, values, bg=0):
+    """Fill each labelled region of a label image with a value, using
+    the values as a lookup table.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray of int
+        Label image, regions labelled 1 to number of values.
+    values : numpy.ndarray
+        Value of each region, shape (numLabels, ...).
+    bg : various, optional
+        Value for points not in a region.
+
+    Returns
+    -------
+    numpy.ndarray
+        Map of the values, shape of the label image followed by the
+        shape of each value.
+
+    """
+    values = np.asarray(values)
+    lookup = np.full((len(values) + 1,) + values.shape[1:], bg,
+                     dtype=values.dtype)
+    lookup[1:] = values
+
+    labels = np.asarray(labels)
+    inLabel = (labels > 0) & (labels <= len(values))
+
+    return lookup[np.where(inLabel, labels, 0)]
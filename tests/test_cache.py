@@ -0,0 +1,129 @@
+import os
+
+import pytest
+import numpy as np
+
+import defdap.ebsd as ebsd
+from defdap import defaults
+from defdap.cache import ResultCache, cacheKey, hashFiles, cacheHits
+
+
+DATA_DIR = "tests/data/"
+EXAMPLE_EBSD = DATA_DIR + "testDataEBSD"
+
+
+@pytest.fixture(autouse=True)
+def reset_cache_hits():
+    cacheHits.clear()
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    defaults['cache_dir'] = tmp_path / "cache"
+    yield defaults['cache_dir']
+    defaults['cache_dir'] = None
+
+
+class TestResultCache:
+
+    @staticmethod
+    def test_store_load(tmp_path):
+        cache = ResultCache(tmp_path, 2**20)
+        cache.store("key", {'a': np.arange(5)})
+
+        assert np.array_equal(cache.load("key")['a'], np.arange(5))
+        assert cache.load("other") is None
+        assert list(tmp_path.glob("*.tmp")) == []
+
+    @staticmethod
+    def test_evict_least_recent(tmp_path):
+        cache = ResultCache(tmp_path, 2**20)
+        data = {'a': np.zeros(50000)}   # 400 kB
+        cache.store("first", data)
+        cache.store("second", data)
+        os.utime(cache.entryPath("first"), (1, 1))
+        os.utime(cache.entryPath("second"), (2, 2))
+        # use first so second is the least recently used
+        cache.load("first")
+        cache.store("third", data)
+
+        assert cache.load("first") is not None
+        assert cache.load("second") is None
+        assert cache.load("third") is not None
+
+    @staticmethod
+    def test_bad_entry(tmp_path):
+        cache = ResultCache(tmp_path, 2**20)
+        (tmp_path / "bad.npz").write_bytes(b"not an npz file")
+
+        assert cache.load("bad") is None
+
+    @staticmethod
+    def test_key():
+        assert cacheKey('a', {'b': 1}) == cacheKey('a', {'b': 1})
+        assert cacheKey('a', {'b': 1}) != cacheKey('a', {'b': 2})
+        assert cacheKey(np.arange(3)) != cacheKey(np.arange(4))
+
+    @staticmethod
+    def test_hash_files(tmp_path):
+        file_path = tmp_path / "data.txt"
+        file_path.write_text("first")
+        first_hash = hashFiles([file_path])
+        file_path.write_text("second version")
+
+        assert hashFiles([file_path]) != first_hash
+
+
+class TestMapCacheResults:
+
+    @staticmethod
+    def run_map():
+        ebsd_map = ebsd.Map(EXAMPLE_EBSD)
+        ebsd_map.buildQuatArray()
+        ebsd_map.findBoundaries(boundDef=10)
+        ebsd_map.findGrains(minGrainSize=10)
+        ebsd_map.calcGrainMisOri(calcAxis=True)
+        ebsd_map.calcKam()
+
+        return ebsd_map
+
+    @staticmethod
+    def test_cached(cache_dir):
+        calc_map = TestMapCacheResults.run_map()
+        num_entries = len(list(cache_dir.glob("*.npz")))
+
+        assert sum(cacheHits.values()) == 0
+
+        cached_map = TestMapCacheResults.run_map()
+
+        assert len(list(cache_dir.glob("*.npz"))) == num_entries
+        for method in ['findBoundaries', 'findGrains', 'calcGrainMisOri',
+                       'calcKam']:
+            assert cacheHits[method] == 1
+        for attr in ['boundaries', 'grains', 'misOri', 'misOriAxis', 'GOS',
+                     'grainOffsets']:
+            assert np.array_equal(getattr(cached_map, attr),
+                                  getattr(calc_map, attr))
+        assert np.array_equal(cached_map.kam, calc_map.kam, equal_nan=True)
+        assert cached_map.boundaryLines == calc_map.boundaryLines
+        assert len(cached_map) == len(calc_map)
+        for cached_grain, grain in zip(cached_map, calc_map):
+            assert cached_grain.phaseID == grain.phaseID
+            assert np.array_equal(cached_grain.misOriList, grain.misOriList)
+
+    @staticmethod
+    def test_parameters_in_key(cache_dir):
+        ebsd_map = ebsd.Map(EXAMPLE_EBSD)
+        ebsd_map.buildQuatArray()
+        ebsd_map.findBoundaries(boundDef=10)
+        boundaries_10 = ebsd_map.boundaries
+        ebsd_map.findBoundaries(boundDef=5)
+
+        assert not np.array_equal(ebsd_map.boundaries, boundaries_10)
+
+    @staticmethod
+    def test_disabled():
+        TestMapCacheResults.run_map()
+        TestMapCacheResults.run_map()
+
+        assert sum(cacheHits.values()) == 0
@@ -1,10 +1,12 @@
 import pytest
 from pytest import approx
 from unittest.mock import Mock
+from functools import partial
 
 import numpy as np
 import defdap.ebsd as ebsd
 import defdap.crystal as crystal
+from defdap.quat import Quat, QuatArray
 
 
 DATA_DIR = "tests/data/"
@@ -49,9 +51,19 @@ class TestMapFindBoundaries:
         mock_map.quatArray = good_quat_array
         mock_map.phaseArray = good_phase_array
         mock_map.yDim, mock_map.xDim = good_quat_array.shape
+        mock_map.shape = good_quat_array.shape
         mock_phase = Mock(spec=crystal.Phase)
         mock_phase.crystalStructure = crystal.crystalStructures['cubic']
         mock_map.primaryPhase = mock_phase
+        mock_map.phases = [mock_phase]
+        mock_map.neighbourMisOriCache = {}
+        mock_map.tileSize = None
+        mock_map.calcNeighbourMisOri = partial(
+            ebsd.Map.calcNeighbourMisOri, mock_map
+        )
+        mock_map._buildBoundaryMaps = partial(
+            ebsd.Map._buildBoundaryMaps, mock_map
+        )
 
         return mock_map
 
@@ -84,6 +96,1036 @@ class TestMapFindBoundaries:
 
 
 
+class TestMapFindGrains:
+    # Depends on self.boundariesX, self.boundariesY, self.phaseArray,
+    # self.quatArray, self.shape, self.phases
+    # Affects self.grains, self.grainList
+
+    @staticmethod
+    def test_calc(good_map_with_quats):
+        good_map_with_quats.findBoundaries(boundDef=10)
+        good_map_with_quats.findGrains(minGrainSize=10)
+        result = good_map_with_quats.grains
+
+        expected = np.loadtxt(
+            "{:}grains_10deg.txt".format(EXPECTED_RESULTS_DIR), dtype=int
+        )
+
+        assert result.dtype is np.dtype(np.int64)
+        assert np.all(result == expected)
+        assert len(good_map_with_quats) == expected.max()
+
+    @staticmethod
+    def test_grains(good_map_with_quats):
+        good_map_with_quats.findBoundaries(boundDef=10)
+        good_map_with_quats.findGrains(minGrainSize=10)
+        grains = good_map_with_quats.grains
+
+        for i, grain in enumerate(good_map_with_quats):
+            x, y = np.array(grain.coordList).T
+            assert grain.grainID == i
+            assert len(grain) == np.sum(grains == i + 1)
+            assert np.all(grains[y, x] == i + 1)
+            assert np.allclose(grain.quatList[0].quatCoef,
+                               good_map_with_quats.quatArray[y[0], x[0]].quatCoef)
+
+    @staticmethod
+    def test_grain_storage(good_map_with_quats):
+        good_map_with_quats.findBoundaries(boundDef=10)
+        good_map_with_quats.findGrains(minGrainSize=10)
+        ebsd_map = good_map_with_quats
+
+        assert ebsd_map.grainOffsets[-1] == len(ebsd_map.grainPoints)
+        for grain in ebsd_map:
+            coords = grain.coordList
+            # points are a view of the map storage
+            assert coords.base is not None
+            assert np.shares_memory(coords, ebsd_map.grainPoints)
+
+            x0, y0 = coords.min(axis=0)
+            xmax, ymax = coords.max(axis=0)
+            assert grain.extremeCoords == (x0, y0, xmax, ymax)
+
+            quats = grain.quatList
+            assert isinstance(quats, QuatArray)
+            assert len(quats) == len(grain)
+            assert np.allclose(
+                quats.quatCoef,
+                ebsd_map.quatArray.quatCoef[:, coords[:, 1], coords[:, 0]]
+            )
+
+    @staticmethod
+    def test_grain_manual_points(good_map_with_quats):
+        good_map_with_quats.findBoundaries(boundDef=10)
+        good_map_with_quats.findGrains(minGrainSize=10)
+        grain = good_map_with_quats[0]
+
+        grain.coordList = []
+        grain.quatList = []
+        grain.addPoint((3, 2), Quat(1., 0., 0., 0.))
+        grain.addPoint((5, 1), Quat(1., 0., 0., 0.))
+
+        assert grain.storageID is None
+        assert len(grain) == 2
+        assert grain.extremeCoords == (3, 1, 5, 2)
+        assert len(grain.quatList) == 2
+
+
+
+class TestMapBuildNeighbourNetwork:
+    # Depends on self.boundariesX, self.boundariesY, self.grains,
+    # self.grainList
+    # Affects self.neighbourNetwork
+
+    @staticmethod
+    @pytest.fixture(scope="class")
+    def ebsd_map():
+        ebsd_map = ebsd.Map(EXAMPLE_EBSD)
+        ebsd_map.buildQuatArray()
+        ebsd_map.findBoundaries(boundDef=10)
+        ebsd_map.findGrains(minGrainSize=10)
+        ebsd_map.buildNeighbourNetwork()
+
+        return ebsd_map
+
+    @staticmethod
+    def test_neighbours(ebsd_map):
+        grains = ebsd_map.grains
+        expected = set()
+        for i, boundaries in enumerate((ebsd_map.boundariesX,
+                                        ebsd_map.boundariesY)):
+            for y, x in zip(*np.nonzero(boundaries)):
+                if (x == 0 or y == 0 or x == grains.shape[1] - 1 or
+                        y == grains.shape[0] - 1):
+                    continue
+                grainID = grains[y, x] - 1
+                neiGrainID = grains[y + i, x - i + 1] - 1
+                if grainID >= 0 and neiGrainID >= 0 and grainID != neiGrainID:
+                    expected.add(frozenset((grainID, neiGrainID)))
+
+        nn = ebsd_map.neighbourNetwork
+        result = {frozenset((g1.grainID, g2.grainID)) for g1, g2 in nn.edges}
+
+        assert len(nn) == len(ebsd_map)
+        assert result == expected
+
+    @staticmethod
+    def test_boundary_segments(ebsd_map):
+        grains = ebsd_map.grains
+        nn = ebsd_map.neighbourNetwork
+
+        for grain, neiGrain in nn.edges:
+            bSeg = nn[grain][neiGrain]['boundary']
+            assert {bSeg.grain1, bSeg.grain2} == {grain, neiGrain}
+            assert len(bSeg) > 0
+
+            for kind in (0, 1):
+                for (p1, p2) in bSeg.boundaryPointPairs(kind):
+                    assert grains[p1[1], p1[0]] == bSeg.grain1.grainID + 1
+                    assert grains[p2[1], p2[0]] == bSeg.grain2.grainID + 1
+
+            pointsX = bSeg.boundaryPointsX
+            pointsY = bSeg.boundaryPointsY
+            assert sorted(pointsX, key=lambda p: (p[1], p[0])) == pointsX
+            assert sorted(pointsY, key=lambda p: (p[1], p[0])) == pointsY
+
+
+class TestMapCalcGrainMeanOris:
+    # Depends on self.grainPoints, self.grainOffsets, self.quatArray,
+    # self.phaseArray, self.phases
+
+    @staticmethod
+    @pytest.fixture(scope="class")
+    def ebsd_map():
+        ebsd_map = ebsd.Map(EXAMPLE_EBSD)
+        ebsd_map.buildQuatArray()
+        ebsd_map.findBoundaries(boundDef=10)
+        ebsd_map.findGrains(minGrainSize=10)
+
+        return ebsd_map
+
+    @staticmethod
+    @pytest.fixture(scope="class")
+    def expected(ebsd_map):
+        return np.array([
+            Quat.calcAverageOri(
+                Quat.calcSymEqvs(grain.quatList, grain.crystalSym)
+            ).quatCoef for grain in ebsd_map
+        ])
+
+    @staticmethod
+    @pytest.mark.parametrize('method, tol', [('mean', 1e-4), ('eigen', 1e-2)])
+    @pytest.mark.parametrize('numIters', [0, 2])
+    def test_calc(ebsd_map, expected, method, tol, numIters):
+        result = ebsd_map.calcGrainMeanOris(method=method, numIters=numIters)
+
+        assert result.shape == (len(ebsd_map), 4)
+        assert np.all(result[:, 0] >= 0)
+        assert np.allclose(np.linalg.norm(result, axis=1), 1)
+
+        misOri = QuatArray(result.T).misOri(QuatArray(expected.T), 'cubic')
+        assert np.all(np.rad2deg(2 * np.arccos(misOri)) < tol)
+
+    @staticmethod
+    def test_ref_oris(ebsd_map):
+        ebsd_map.calcGrainAvOris()
+        result = ebsd_map.calcGrainMeanOris()
+
+        for grain, meanOri in zip(ebsd_map, result):
+            assert isinstance(grain.refOri, Quat)
+            assert np.allclose(grain.refOri.quatCoef, meanOri)
+
+    @staticmethod
+    def test_bad_method(ebsd_map):
+        with pytest.raises(ValueError):
+            ebsd_map.calcGrainMeanOris(method='median')
+
+
+class TestMapCalcGrainMisOri:
+    # Depends on self.grainPoints, self.grainOffsets, self.quatArray,
+    # self.phaseArray, self.phases, grain.refOri
+    # Affects self.misOri, self.misOriAxis, self.GOS, grain.misOriList,
+    # grain.misOriAxisList, grain.averageMisOri
+
+    @staticmethod
+    @pytest.fixture(scope="class")
+    def ebsd_map():
+        ebsd_map = ebsd.Map(EXAMPLE_EBSD)
+        ebsd_map.buildQuatArray()
+        ebsd_map.findBoundaries(boundDef=10)
+        ebsd_map.findGrains(minGrainSize=10)
+        ebsd_map.calcGrainAvOris()
+        ebsd_map.calcGrainMisOri(calcAxis=True)
+
+        return ebsd_map
+
+    @staticmethod
+    def test_grains(ebsd_map):
+        for grain in ebsd_map:
+            misOri = grain.misOriList.copy()
+            misOriAxis = grain.misOriAxisList.copy()
+            averageMisOri = grain.averageMisOri
+
+            # compare to calculation for a single grain
+            grain.buildMisOriList(calcAxis=True)
+            assert np.allclose(misOri, grain.misOriList)
+            valid = np.isfinite(grain.misOriAxisList).all(axis=1)
+            assert np.allclose(misOriAxis[valid],
+                               grain.misOriAxisList[valid])
+            assert np.isclose(averageMisOri, grain.averageMisOri)
+
+            grain.misOriList = misOri
+            grain.misOriAxisList = misOriAxis
+
+    @staticmethod
+    def test_maps(ebsd_map):
+        assert ebsd_map.misOri.shape == ebsd_map.shape
+        assert ebsd_map.misOriAxis.shape == (3,) + ebsd_map.shape
+        assert np.all(ebsd_map.misOri[ebsd_map.grains <= 0] == 1)
+        assert np.all(ebsd_map.misOriAxis[:, ebsd_map.grains <= 0] == 0)
+
+        for grain in ebsd_map:
+            x, y = grain.coordList.T
+            assert np.all(ebsd_map.misOri[y, x] == grain.misOriList)
+            assert np.all(ebsd_map.misOriAxis[:, y, x] ==
+                          grain.misOriAxisList.T)
+            assert np.isclose(
+                ebsd_map.GOS[grain.grainID],
+                np.rad2deg(2 * np.arccos(grain.misOriList)).mean()
+            )
+
+    @staticmethod
+    def test_no_axis(ebsd_map):
+        ebsd_map.calcGrainMisOri(calcAxis=False)
+
+        assert ebsd_map.misOriAxis is None
+        assert ebsd_map[0].misOriAxisList is None
+
+
+class TestMapCalcAverageGrainSchmidFactors:
+    # Depends on grain.refOri, self.phases, self.phaseArray
+    # Affects self.grainSchmidFactors, grain.averageSchmidFactors
+
+    @staticmethod
+    @pytest.fixture(scope="class")
+    def ebsd_map():
+        ebsd_map = ebsd.Map(EXAMPLE_EBSD)
+        ebsd_map.buildQuatArray()
+        ebsd_map.findBoundaries(boundDef=10)
+        ebsd_map.findGrains(minGrainSize=10)
+        ebsd_map.calcGrainAvOris()
+
+        return ebsd_map
+
+    @staticmethod
+    def test_calc(ebsd_map):
+        loadVector = np.array([1., 0., 0.])
+        result = ebsd_map.calcAverageGrainSchmidFactors(loadVector)
+
+        numSS = sum(len(ssGroup) for ssGroup in ebsd_map.phases[0].slipSystems)
+        assert result.shape == (len(ebsd_map), numSS)
+        assert result is ebsd_map.grainSchmidFactors
+
+        for grain, grainSF in zip(ebsd_map, result):
+            loadCrystal = grain.refOri.transformVector(loadVector)
+            expected = [
+                abs(np.dot(loadCrystal, ss.slipPlane) *
+                    np.dot(loadCrystal, ss.slipDir))
+                for ssGroup in grain.phase.slipSystems for ss in ssGroup
+            ]
+            assert np.allclose(grainSF, expected)
+            assert np.allclose(
+                np.concatenate(grain.averageSchmidFactors), expected
+            )
+            assert ([len(sfGroup) for sfGroup in grain.averageSchmidFactors]
+                    == [len(ssGroup) for ssGroup in grain.phase.slipSystems])
+
+    @staticmethod
+    def test_stress_tensor(ebsd_map):
+        loadVector = np.array([1., 2., 2.])
+        resultVector = ebsd_map.calcAverageGrainSchmidFactors(loadVector)
+        stress = np.outer(loadVector, loadVector) / 9
+        resultTensor = ebsd_map.calcAverageGrainSchmidFactors(stress)
+
+        assert np.allclose(resultVector, resultTensor)
+
+        # resolved shear stress is linear in stress
+        resultDouble = ebsd_map.calcAverageGrainSchmidFactors(2 * stress)
+        assert np.allclose(2 * resultTensor, resultDouble)
+
+    @staticmethod
+    def test_grain(ebsd_map):
+        loadVector = np.array([0., 0., 1.])
+        result = ebsd_map.calcAverageGrainSchmidFactors(loadVector)
+
+        grain = ebsd_map[3]
+        grain.calcAverageSchmidFactors(loadVector)
+        assert np.allclose(np.concatenate(grain.averageSchmidFactors),
+                           result[3])
+
+
+class TestMapCalcSchmidFactorMaps:
+    # Depends on self.quatArray, self.phaseArray, self.phases
+
+    loadVector = np.array([1., 0., 0.])
+
+    @staticmethod
+    @pytest.fixture(scope="class")
+    def ebsd_map():
+        ebsd_map = ebsd.Map(EXAMPLE_EBSD)
+        ebsd_map.buildQuatArray()
+
+        return ebsd_map
+
+    @staticmethod
+    @pytest.fixture(scope="class")
+    def full_result(ebsd_map):
+        return ebsd_map.calcSchmidFactorMaps(
+            TestMapCalcSchmidFactorMaps.loadVector
+        )
+
+    @staticmethod
+    def test_calc(ebsd_map, full_result):
+        slipSystems = [ss for ssGroup in ebsd_map.phases[0].slipSystems
+                       for ss in ssGroup]
+        assert full_result.shape == (len(slipSystems),) + ebsd_map.shape
+
+        nonIndexed = ebsd_map.phaseArray == 0
+        assert np.all(np.isnan(full_result[:, nonIndexed]))
+
+        # compare to transforming the load vector at some points
+        rng = np.random.default_rng(0)
+        ys, xs = np.nonzero(~nonIndexed)
+        for i in rng.choice(len(ys), 20, replace=False):
+            quat = ebsd_map.quatArray[ys[i], xs[i]]
+            loadCrystal = quat.transformVector(
+                TestMapCalcSchmidFactorMaps.loadVector
+            )
+            expected = [abs(np.dot(loadCrystal, ss.slipPlane) *
+                            np.dot(loadCrystal, ss.slipDir))
+                        for ss in slipSystems]
+            assert np.allclose(full_result[:, ys[i], xs[i]], expected)
+
+    @staticmethod
+    def test_chunks(ebsd_map, full_result, tmp_path):
+        out = np.lib.format.open_memmap(
+            tmp_path / "sf.npy", mode='w+', shape=full_result.shape
+        )
+        result = ebsd_map.calcSchmidFactorMaps(
+            TestMapCalcSchmidFactorMaps.loadVector, out=out, chunkSize=7
+        )
+
+        assert result is out
+        assert np.array_equal(result, full_result, equal_nan=True)
+
+    @staticmethod
+    def test_max(ebsd_map, full_result):
+        values, systems = ebsd_map.calcSchmidFactorMaps(
+            TestMapCalcSchmidFactorMaps.loadVector, reduce='max',
+            chunkSize=10
+        )
+        valid = ebsd_map.phaseArray != 0
+
+        assert values.shape == systems.shape == ebsd_map.shape
+        assert np.all(systems[~valid] == -1)
+        assert np.all(np.isnan(values[~valid]))
+        assert np.allclose(values[valid], full_result[:, valid].max(axis=0))
+        assert np.all(systems[valid] ==
+                      full_result[:, valid].argmax(axis=0))
+
+    @staticmethod
+    def test_topk(ebsd_map, full_result):
+        values, systems = ebsd_map.calcSchmidFactorMaps(
+            TestMapCalcSchmidFactorMaps.loadVector, reduce='topk', k=3
+        )
+        valid = ebsd_map.phaseArray != 0
+
+        assert values.shape == systems.shape == (3,) + ebsd_map.shape
+        assert np.all(np.diff(values[:, valid], axis=0) <= 0)
+        assert np.allclose(
+            values[:, valid],
+            -np.sort(-full_result[:, valid], axis=0)[:3]
+        )
+        assert np.allclose(
+            np.take_along_axis(full_result[:, valid], systems[:, valid], 0),
+            values[:, valid]
+        )
+
+    @staticmethod
+    def test_signed(ebsd_map, full_result):
+        result = ebsd_map.calcSchmidFactorMaps(
+            TestMapCalcSchmidFactorMaps.loadVector, signed=True
+        )
+
+        assert np.array_equal(np.abs(result), full_result, equal_nan=True)
+        assert np.any(result < 0)
+
+    @staticmethod
+    def test_bad_reduce(ebsd_map):
+        with pytest.raises(ValueError):
+            ebsd_map.calcSchmidFactorMaps(
+                TestMapCalcSchmidFactorMaps.loadVector, reduce='mean'
+            )
+
+
+class TestMapTiled:
+    # Neighbourhood operations processed in tiles of rows must give the
+    # same result as the whole map
+
+    @staticmethod
+    def run_map(tile_size):
+        ebsd_map = ebsd.Map(EXAMPLE_EBSD)
+        ebsd_map.tileSize = tile_size
+        ebsd_map.buildQuatArray()
+        ebsd_map.findBoundaries(boundDef=10)
+        ebsd_map.findGrains(minGrainSize=10)
+        ebsd_map.calcKam(kernelOrder=2, symmetric=False)
+        ebsd_map.calcNye()
+
+        return ebsd_map
+
+    @staticmethod
+    @pytest.fixture(scope="class")
+    def whole_map():
+        return TestMapTiled.run_map(None)
+
+    @staticmethod
+    @pytest.mark.parametrize('tile_size', [1, 17])
+    def test_calc(whole_map, tile_size):
+        tiled_map = TestMapTiled.run_map(tile_size)
+
+        assert np.all(tiled_map.boundaries == whole_map.boundaries)
+        assert np.all(tiled_map.grains == whole_map.grains)
+        assert np.allclose(tiled_map.kam, whole_map.kam, equal_nan=True)
+        assert np.allclose(tiled_map.Nye, whole_map.Nye, equal_nan=True)
+        assert np.allclose(tiled_map.GND, whole_map.GND, equal_nan=True)
+
+
+class TestMapSaveDefdap:
+    # Maps saved in the DefDAP format must load with the same raw and
+    # derived data
+
+    @staticmethod
+    @pytest.fixture(scope="class")
+    def analysed_map():
+        ebsd_map = ebsd.Map(EXAMPLE_EBSD)
+        ebsd_map.buildQuatArray()
+        ebsd_map.findBoundaries(boundDef=10)
+        ebsd_map.findGrains(minGrainSize=10)
+        ebsd_map.calcGrainAvOris()
+        ebsd_map.calcGrainMisOri(calcAxis=True)
+        ebsd_map.calcKam()
+        ebsd_map.homogPoints = [(10, 20), (30, 40)]
+
+        return ebsd_map
+
+    @staticmethod
+    def test_round_trip(analysed_map, tmp_path):
+        analysed_map.save("test", data_type="DefDAP", file_dir=tmp_path)
+        loaded_map = ebsd.Map(str(tmp_path / "test"), dataType="DefDAP")
+
+        assert loaded_map.shape == analysed_map.shape
+        assert loaded_map.stepSize == analysed_map.stepSize
+        assert loaded_map.phases[0].name == analysed_map.phases[0].name
+        assert loaded_map.homogPoints == analysed_map.homogPoints
+        for attr in ['phaseArray', 'eulerAngleArray', 'bandContrastArray',
+                     'boundaries', 'phaseBoundaries', 'grains', 'misOri',
+                     'misOriAxis', 'GOS', 'grainOffsets']:
+            assert np.array_equal(getattr(loaded_map, attr),
+                                  getattr(analysed_map, attr))
+        assert np.array_equal(loaded_map.kam, analysed_map.kam,
+                              equal_nan=True)
+        assert np.array_equal(loaded_map.quatArray.quatCoef,
+                              analysed_map.quatArray.quatCoef)
+        assert loaded_map.boundaryLines == analysed_map.boundaryLines
+
+        assert len(loaded_map) == len(analysed_map)
+        for loaded_grain, grain in zip(loaded_map, analysed_map):
+            assert loaded_grain.grainID == grain.grainID
+            assert loaded_grain.phase.name == grain.phase.name
+            assert np.array_equal(loaded_grain.refOri.quatCoef,
+                                  grain.refOri.quatCoef)
+            assert np.array_equal(loaded_grain.misOriList, grain.misOriList)
+            assert loaded_grain.averageMisOri == approx(grain.averageMisOri)
+
+    @staticmethod
+    def test_partial_load(analysed_map, tmp_path):
+        analysed_map.save("test", data_type="DefDAP", file_dir=tmp_path)
+        loaded_map = ebsd.Map(str(tmp_path / "test"), dataType="DefDAP",
+                              datasets=['grains'])
+
+        assert len(loaded_map) == len(analysed_map)
+        assert loaded_map.kam is None
+        assert loaded_map.misOri is None
+        assert loaded_map.boundaries is None
+
+    @staticmethod
+    def test_restore_order():
+        # data restored before the grains must not be reset by them
+        dependents = ebsd.Map.dependentAttributes()
+        reset_by_grains = set()
+        names = ['grains']
+        while names:
+            name = names.pop()
+            for dependent in dependents.get(name, []):
+                if dependent not in reset_by_grains:
+                    reset_by_grains.add(dependent)
+                    names.append(dependent)
+
+        assert reset_by_grains.isdisjoint(ebsd.Map.defdapBoundaryAttrs)
+        assert set(ebsd.Map.defdapGrainDataAttrs) <= reset_by_grains
+
+
+class TestMapCalcNeighbourMisOri:
+
+    @staticmethod
+    @pytest.fixture
+    def ebsd_map():
+        ebsd_map = ebsd.Map(EXAMPLE_EBSD)
+        ebsd_map.buildQuatArray()
+
+        return ebsd_map
+
+    @staticmethod
+    def test_calc(ebsd_map):
+        mis_ori, sym_idx = ebsd_map.calcNeighbourMisOri((0, 1))
+
+        assert mis_ori.shape == ebsd_map.shape
+        assert np.isnan(mis_ori[:, -1]).all()
+
+        quats = ebsd_map.quatArray
+        for y, x in [(0, 0), (100, 200), (50, 300)]:
+            expected, expected_sym = quats[y, x].misOri(
+                quats[y, x + 1], 'cubic', returnQuat=2
+            )
+            expected = 2 * np.arccos(min(expected, 1)) * 180 / np.pi
+            syms = crystal.crystalStructures['cubic'].symmetries
+            result_sym = syms[sym_idx[y, x]] * quats[y, x + 1]
+
+            assert mis_ori[y, x] == approx(expected)
+            assert np.allclose(result_sym.quatCoef, expected_sym.quatCoef)
+
+    @staticmethod
+    def test_cache(ebsd_map):
+        result = ebsd_map.calcNeighbourMisOri((1, 0))
+        ebsd_map.findBoundaries(boundDef=5)
+        ebsd_map.findBoundaries(boundDef=10)
+
+        assert ebsd_map.calcNeighbourMisOri((1, 0)) is result
+        assert set(ebsd_map.neighbourMisOriCache) == {(0, 1), (1, 0)}
+
+    @staticmethod
+    def test_invalidate(ebsd_map):
+        ebsd_map.calcNeighbourMisOri((1, 0))
+        ebsd_map.quatArray = ebsd_map.quatArray.copy()
+
+        assert ebsd_map.neighbourMisOriCache == {}
+
+
+
+class TestMapCalcKam:
+    # Depends on self.quatArray, self.phaseArray, self.phases, self.shape,
+    # self.grains
+    # Affects self.kam
+
+    @staticmethod
+    @pytest.fixture
+    def mock_map(good_quat_array, good_phase_array):
+        # create stub object on a small region of the map
+        mock_map = Mock(spec=ebsd.Map)
+        mock_map.quatArray = good_quat_array[40:52, 100:115]
+        mock_map.phaseArray = good_phase_array[40:52, 100:115].copy()
+        mock_map.phaseArray[5, 5] = 0
+        mock_map.shape = mock_map.phaseArray.shape
+        mock_phase = Mock(spec=crystal.Phase)
+        mock_phase.crystalStructure = crystal.crystalStructures['cubic']
+        mock_map.phases = [mock_phase]
+        mock_map.grains = None
+        mock_map.neighbourMisOriCache = {}
+        mock_map.tileSize = None
+        mock_map.calcNeighbourMisOri = partial(
+            ebsd.Map.calcNeighbourMisOri, mock_map
+        )
+
+        return mock_map
+
+    @staticmethod
+    def kam_brute_force(mock_map, kernel_order, cutoff):
+        quats = mock_map.quatArray
+        phases = mock_map.phaseArray
+        y_dim, x_dim = phases.shape
+        kam = np.full(phases.shape, np.nan)
+        for y, x in np.ndindex(phases.shape):
+            if phases[y, x] == 0:
+                continue
+            mis_oris = []
+            for dy in range(-kernel_order, kernel_order + 1):
+                for dx in range(-kernel_order, kernel_order + 1):
+                    if max(abs(dy), abs(dx)) != kernel_order:
+                        continue
+                    if not (0 <= y + dy < y_dim and 0 <= x + dx < x_dim):
+                        continue
+                    if phases[y + dy, x + dx] != phases[y, x]:
+                        continue
+                    mis_ori = quats[y, x].misOri(quats[y + dy, x + dx],
+                                                 'cubic')
+                    mis_ori = 2 * np.arccos(min(mis_ori, 1)) * 180 / np.pi
+                    if cutoff is None or mis_ori <= cutoff:
+                        mis_oris.append(mis_ori)
+            if mis_oris:
+                kam[y, x] = np.mean(mis_oris)
+
+        return kam
+
+    @staticmethod
+    def test_return_type(mock_map):
+        ebsd.Map.calcKam(mock_map)
+        result = mock_map.kam
+
+        assert type(result) is np.ndarray
+        assert result.shape == mock_map.shape
+        assert np.isnan(result[5, 5])
+
+    @staticmethod
+    @pytest.mark.parametrize('kernel_order, cutoff', [
+        (1, None), (2, None), (1, 5)
+    ])
+    def test_calc(mock_map, kernel_order, cutoff):
+        ebsd.Map.calcKam(mock_map, kernelOrder=kernel_order,
+                         misOriCutoff=cutoff)
+        result = mock_map.kam
+
+        expected = TestMapCalcKam.kam_brute_force(mock_map, kernel_order,
+                                                  cutoff)
+
+        assert np.allclose(result, expected, equal_nan=True)
+
+    @staticmethod
+    def test_same_grain_needs_grains(mock_map):
+        with pytest.raises(Exception):
+            ebsd.Map.calcKam(mock_map, sameGrain=True)
+
+
+
+class TestMapCalcNye:
+    # Depends on self.quatArray, self.phaseArray, self.phases, self.shape,
+    # self.stepSize
+    # Affects self.Nye, self.GND
+
+    @staticmethod
+    @pytest.fixture
+    def mock_map(good_quat_array, good_phase_array):
+        # create stub object on a small region of the map
+        mock_map = Mock(spec=ebsd.Map)
+        mock_map.quatArray = good_quat_array[40:60, 100:125]
+        mock_map.phaseArray = good_phase_array[40:60, 100:125].copy()
+        mock_map.phaseArray[5, 5] = 0
+        mock_map.shape = mock_map.phaseArray.shape
+        mock_map.stepSize = 0.12
+        mock_phase = Mock(spec=crystal.Phase)
+        mock_phase.crystalStructure = crystal.crystalStructures['cubic']
+        mock_phase.burgersVector = 2.5e-10
+        mock_map.phases = [mock_phase]
+        mock_map.neighbourMisOriCache = {}
+        mock_map.tileSize = None
+        mock_map.calcNeighbourMisOri = partial(
+            ebsd.Map.calcNeighbourMisOri, mock_map
+        )
+
+        return mock_map
+
+    @staticmethod
+    def test_return_type(mock_map):
+        ebsd.Map.calcNye(mock_map)
+
+        assert mock_map.Nye.shape == (3, 3) + mock_map.shape
+        assert mock_map.GND.shape == mock_map.shape
+        assert np.isnan(mock_map.GND[5, 5])
+
+    @staticmethod
+    def test_calc(mock_map):
+        ebsd.Map.calcNye(mock_map)
+        result = mock_map.Nye
+
+        # reference from individual quats at one point
+        quats = mock_map.quatArray
+        y, x = 10, 12
+        step_size = mock_map.stepSize * 1e-6
+        b = mock_map.phases[0].burgersVector
+
+        def distortion(q0, q1):
+            _, q1_sym = q0.misOri(q1, 'cubic', returnQuat=2)
+            return ((q1_sym.conjugate * q0).rotMatrix() - np.eye(3)) / step_size
+
+        beta_x = distortion(quats[y, x], quats[y, x + 1])
+        beta_y = distortion(quats[y, x], quats[y + 1, x])
+
+        assert result[0, 2, y, x] == approx((beta_y[0, 0] - beta_x[0, 1]) / b)
+        assert np.allclose(result[:, 1, y, x], beta_x[:, 2] / b)
+        assert np.allclose(result[:, 0, y, x], -beta_y[:, 2] / b)
+
+    @staticmethod
+    def test_chunked(mock_map):
+        ebsd.Map.calcNye(mock_map)
+        expected = mock_map.Nye
+
+        ebsd.Map.calcNye(mock_map, chunkSize=3)
+
+        assert np.allclose(mock_map.Nye, expected, equal_nan=True)
+
+
+
+class TestMapFilterData:
+    # Depends on self.quatArray, self.phaseArray, self.phases, self.shape
+    # Affects self.quatArray
+
+    @staticmethod
+    @pytest.fixture
+    def mock_map():
+        # uniform orientation with one noisy point and one non-indexed
+        # point, rotated by a cubic symmetry in the right half
+        ori = Quat.fromEulerAngles(0.5, 0.3, 0.2)
+        sym = crystal.crystalStructures['cubic'].symmetries[5]
+        quat_comps = np.empty((4, 10, 12))
+        quat_comps[:, :, :6] = ori.quatCoef[:, None, None]
+        quat_comps[:, :, 6:] = (sym * ori).quatCoef[:, None, None]
+        quat_comps[:, 4, 4] = Quat.fromEulerAngles(0.52, 0.31, 0.2).quatCoef
+        quat_comps[:, 7, 2] = Quat.fromEulerAngles(1.5, 1.0, 0.2).quatCoef
+
+        mock_map = Mock(spec=ebsd.Map)
+        mock_map.quatArray = QuatArray(quat_comps)
+        mock_map.phaseArray = np.ones((10, 12), dtype=int)
+        mock_map.phaseArray[7, 2] = 0
+        mock_map.shape = mock_map.phaseArray.shape
+        mock_phase = Mock(spec=crystal.Phase)
+        mock_phase.crystalStructure = crystal.crystalStructures['cubic']
+        mock_map.phases = [mock_phase]
+        mock_map.tileSize = None
+
+        return mock_map, ori, quat_comps[:, 7, 2].copy()
+
+    @staticmethod
+    def test_calc(mock_map):
+        mock_map, ori, non_indexed_quat = mock_map
+        ebsd.Map.filterData(mock_map, misOriTol=5, tileSize=3)
+        result = mock_map.quatArray
+
+        assert type(result) is QuatArray
+        assert result.shape == mock_map.shape
+        # noisy point replaced by the surrounding orientation
+        assert abs(result[4, 4].dot(ori)) == approx(1)
+        # symmetric equivalents are treated as the same orientation
+        mis_ori = result.misOri(ori, 'cubic')
+        mis_ori[7, 2] = 1
+        assert np.allclose(mis_ori, 1)
+        # non-indexed points are left unchanged
+        assert np.allclose(result[7, 2].quatCoef, non_indexed_quat)
+
+    @staticmethod
+    def test_bad_window_size(mock_map):
+        with pytest.raises(ValueError):
+            ebsd.Map.filterData(mock_map[0], windowSize=4)
+
+
+class TestMapCalcProxigram:
+    # Depends on self.boundaries
+    # Affects self.proxigramArr
+
+    @staticmethod
+    @pytest.fixture
+    def mock_map():
+        rng = np.random.default_rng(1)
+        boundaries = -(rng.random((15, 20)) < 0.05).astype(int)
+        # extra boundary along right and bottom edge
+        boundaries[:, -1] = -1
+        boundaries[-1, :] = -1
+
+        mock_map = Mock(spec=ebsd.Map)
+        mock_map.boundaries = boundaries
+        mock_map.proxigramArr = None
+
+        return mock_map
+
+    @staticmethod
+    def test_calc(mock_map):
+        ebsd.Map.calcProxigram(mock_map)
+        result = mock_map.proxigramArr
+
+        # distance to every boundary point, placed on the bottom right
+        # corner of its pixel
+        boundaries = mock_map.boundaries.copy()
+        boundaries[:, -1] = boundaries[:, -2]
+        boundaries[-1, :] = boundaries[-2, :]
+        y_locs, x_locs = np.nonzero(boundaries == -1)
+        y, x = np.indices(boundaries.shape)
+        expected = np.sqrt(
+            (y[..., None] - y_locs - 0.5)**2 + (x[..., None] - x_locs - 0.5)**2
+        ).min(axis=-1)
+
+        assert result.shape == boundaries.shape
+        assert np.array_equal(result, expected)
+
+
+class TestMapGrainDistances:
+    # Depends on self.grains, self.grainBoxes, self.shape
+
+    @staticmethod
+    @pytest.fixture
+    def mock_map():
+        grains = np.array([
+            [1, 1, 1, 2, 2, 2],
+            [1, 1, 1, 2, 2, 2],
+            [1, 1, 1, 2, 2, 2],
+            [3, 3, 3, 3, 2, 2],
+            [3, 3, 3, 3, 2, 2],
+        ])
+
+        mock_map = Mock(spec=ebsd.Map)
+        mock_map.grains = grains
+        mock_map.yDim, mock_map.xDim = grains.shape
+        mock_map.shape = grains.shape
+        mock_map.buildGrainStorage = partial(ebsd.Map.buildGrainStorage,
+                                             mock_map)
+        mock_map.findTripleJunctions = partial(ebsd.Map.findTripleJunctions,
+                                               mock_map)
+        mock_map.buildGrainStorage(3)
+
+        return mock_map
+
+    @staticmethod
+    def test_grain_proxigram(mock_map):
+        result = ebsd.Map.calcGrainProxigram(mock_map)
+
+        assert result[0, 0] == approx(3)
+        assert result[2, 2] == 1
+        assert result[4, 0] == 2
+        assert result[0, 5] == approx(3)
+
+    @staticmethod
+    def test_signed_grain_proxigram(mock_map):
+        result = ebsd.Map.calcGrainProxigram(mock_map, grainID=0)
+
+        assert result[0, 0] == 3
+        assert result[2, 2] == 1
+        assert result[3, 2] == -1
+        assert result[4, 5] == approx(-np.sqrt(13))
+
+    @staticmethod
+    def test_triple_junctions(mock_map):
+        junctions = ebsd.Map.findTripleJunctions(mock_map)
+        distances = ebsd.Map.calcTripleJunctionDistance(mock_map)
+
+        assert np.argwhere(junctions).tolist() == [[2, 2]]
+        assert distances[2, 2] == approx(np.sqrt(0.5))
+        assert distances[0, 0] == approx(np.sqrt(2.5**2 + 2.5**2))
+
+    @staticmethod
+    def test_nearest_boundary_segments(mock_map):
+        segment_map, grain_pairs = \
+            ebsd.Map.calcNearestBoundarySegments(mock_map)
+
+        assert grain_pairs.tolist() == [[0, 1], [0, 2], [1, 2]]
+        assert segment_map[0, 1] == 0
+        assert segment_map[4, 0] == 1
+        assert segment_map[4, 5] == 2
+
+
+class TestMapGrainStats:
+    # Depends on self.grains, len(self)
+
+    @staticmethod
+    @pytest.fixture
+    def mock_map():
+        mock_map = Mock(spec=ebsd.Map)
+        mock_map.grains = np.array([
+            [1, 1, 2, 2],
+            [1, -2, 2, 3],
+        ])
+        mock_map.__len__ = Mock(return_value=3)
+        mock_map.calcGrainStats = partial(ebsd.Map.calcGrainStats, mock_map)
+
+        return mock_map
+
+    @staticmethod
+    def test_grain_av(mock_map):
+        map_data = np.arange(8, dtype=float).reshape(2, 4)
+        result = ebsd.Map.calcGrainAv(mock_map, map_data, grainIds=[2, 0])
+
+        assert np.allclose(result, [7, 5 / 3])
+
+    @staticmethod
+    def test_grain_data_to_map(mock_map):
+        result = ebsd.Map.grainDataToMapData(mock_map, [5, 6],
+                                             grainIds=[0, 2], bg=-1)
+
+        expected = np.array([
+            [5, 5, -1, -1],
+            [5, -1, -1, 6],
+        ])
+        assert np.all(result == expected)
+
+
+class TestMapGrainMapData:
+    # Depends on self.grains, self.grainPoints, self.grainOffsets,
+    # self.grainBoxes
+
+    @staticmethod
+    @pytest.fixture
+    def mock_map():
+        mock_map = Mock(spec=ebsd.Map)
+        mock_map.grains = np.array([
+            [1, 1, 2, 2],
+            [1, -2, 2, 3],
+            [1, 1, 3, 3],
+        ])
+        ebsd.Map.buildGrainStorage(mock_map, 3)
+        grains = []
+        for i in range(3):
+            grain = ebsd.Grain(i, mock_map)
+            grain.storageID = i
+            grains.append(grain)
+        mock_map.__len__ = Mock(return_value=3)
+        mock_map.__getitem__ = Mock(side_effect=grains.__getitem__)
+
+        return mock_map
+
+    @staticmethod
+    def test_grain(mock_map):
+        map_data = np.arange(12, dtype=float).reshape(3, 4)
+        grain = mock_map[0]
+
+        assert np.array_equal(grain.grainMapData(map_data), np.array([
+            [0, 1],
+            [4, np.nan],
+            [8, 9],
+        ]), equal_nan=True)
+        assert np.array_equal(grain.grainOutline(bg=-1, fg=1), np.array([
+            [1, 1],
+            [1, -1],
+            [1, 1],
+        ]))
+
+    @staticmethod
+    def test_list(mock_map):
+        map_data = np.arange(12, dtype=float).reshape(3, 4)
+        result = ebsd.Map.grainMapDataList(mock_map, map_data,
+                                           grainIds=[2, 0])
+
+        assert len(result) == 2
+        for grain_map, grain_id in zip(result, [2, 0]):
+            assert np.array_equal(
+                grain_map, mock_map[grain_id].grainMapData(map_data),
+                equal_nan=True
+            )
+
+    @staticmethod
+    def test_coarse(mock_map):
+        map_data = np.arange(12, dtype=float).reshape(3, 4)
+        map_data[2, 3] = np.nan
+        grain_result = mock_map[0].grainMapDataCoarse(map_data, kernelSize=1)
+        result = ebsd.Map.grainMapDataCoarse(mock_map, map_data,
+                                             kernelSize=1)
+
+        assert np.allclose(grain_result, np.array([
+            [5 / 3, 5 / 3],
+            [22 / 5, np.nan],
+            [7, 7],
+        ]), equal_nan=True)
+        assert np.allclose(result[:, :2], grain_result, equal_nan=True)
+        assert result[0, 3] == approx(11 / 3)
+        assert result[2, 2] == approx(8.5)
+        assert np.isnan(result[2, 3])
+
+    @staticmethod
+    def test_stored_points(mock_map):
+        grain = ebsd.Grain(0, mock_map)
+        grain.coordList = [(1, 1), (2, 1)]
+        grain.quatList = []
+        assert grain.coordArray.shape == (2, 2)
+
+        grain.addPoint((2, 2), Quat(1., 0., 0., 0.))
+
+        assert grain.extremeCoords == (1, 1, 2, 2)
+        assert grain.coordArray.shape == (3, 2)
+
+        grain.coordList[0] = (0, 3)
+
+        assert grain.extremeCoords == (0, 1, 2, 3)
+        assert np.array_equal(grain.coordArray[0], [0, 3])
+
+
+class TestMapInvalidate:
+
+    @staticmethod
+    def test_rotate():
+        ebsd_map = ebsd.Map(EXAMPLE_EBSD)
+        ebsd_map.buildQuatArray()
+        ebsd_map.findBoundaries(boundDef=10)
+        ebsd_map.findGrains(minGrainSize=10)
+        ebsd_map.calcKam()
+        ebsd_map.calcProxigram()
+        ebsd_map.rotateData()
+
+        for attr in ['boundaries', 'boundariesX', 'boundaryLines', 'grains',
+                     'grainList', 'grainOffsets', 'kam', 'proxigramArr']:
+            assert getattr(ebsd_map, attr) is None
+        assert ebsd_map.quatArray is not None
+
+    @staticmethod
+    def test_new_grains():
+        ebsd_map = ebsd.Map(EXAMPLE_EBSD)
+        ebsd_map.buildQuatArray()
+        ebsd_map.findBoundaries(boundDef=10)
+        ebsd_map.findGrains(minGrainSize=10)
+        ebsd_map.calcGrainMisOri()
+        ebsd_map.findBoundaries(boundDef=5)
+
+        assert ebsd_map.grains is None
+        assert ebsd_map.misOri is None
+        assert ebsd_map.boundaries is not None
+
+
+
 
 ''' Functions left to test
 Map:
@@ -96,9 +1138,7 @@ plotBandContrastMap
 plotEulerMap
 plotIPFMap
 plotPhaseMap
-calcKam
 plotKamMap
-calcNye
 plotGNDMap
 checkDataLoaded
 buildQuatArray
@@ -107,7 +1147,6 @@ plotPhaseBoundaryMap
 plotBoundaryMap
 findGrains
 plotGrainMap
-floodFill
 calcGrainAvOris
 calcGrainMisOri
 plotMisOriMap
@@ -1,3 +1,68 @@
+import pytest
+
+import numpy as np
+import defdap.hrdic as hrdic
+
+
+DATA_DIR = "tests/data/"
+EXAMPLE_DIC = "testDataDIC.txt"
+
+
+@pytest.fixture
+def dic_map():
+    return hrdic.Map(DATA_DIR, EXAMPLE_DIC)
+
+
+class TestMapInvalidate:
+
+    @staticmethod
+    def test_set_crop(dic_map):
+        e11 = dic_map.e11
+        f21 = dic_map.f21
+        x_map = dic_map.x_map
+        dic_map.grains = np.ones((dic_map.yDim, dic_map.xDim), dtype=int)
+        dic_map.setCrop(xMin=5, yMax=10)
+
+        # maps cover the full frame so are kept, grains are reset
+        assert dic_map.grains is None
+        assert dic_map.e11 is e11
+        assert dic_map.f21 is f21
+        assert dic_map.x_map is x_map
+        assert dic_map.crop(dic_map.e11).shape == (190, 295)
+
+    @staticmethod
+    def test_apply_threshold_mask(dic_map):
+        e11 = dic_map.e11
+        f21 = dic_map.f21
+        x_map = dic_map.x_map
+        dic_map.mask = np.zeros(e11.shape, dtype=bool)
+        dic_map.mask[3, 4] = True
+        dic_map.applyThresholdMask()
+
+        for attr, old_value in [('e11', e11), ('f21', f21),
+                                ('x_map', x_map)]:
+            new_value = getattr(dic_map, attr)
+            assert new_value is not old_value
+            assert np.isnan(new_value[3, 4])
+            assert np.isnan(new_value).sum() == np.isnan(old_value).sum() + 1
+
+        dic_map.mask = np.zeros(e11.shape, dtype=bool)
+        dic_map.mask[5, 6] = True
+        dic_map.applyThresholdMask()
+
+        assert np.isnan(dic_map.e11[3, 4])
+        assert np.isnan(dic_map.e11[5, 6])
+
+    @staticmethod
+    def test_set_displacement(dic_map):
+        e11 = dic_map.e11
+        x_map = dic_map.x_map
+        dic_map.xd = dic_map.xd * 2
+
+        assert np.allclose(dic_map.x_map, x_map * 2)
+        assert not np.allclose(dic_map.e11, e11)
+
+
 
 # methods to test
 # '_grad',
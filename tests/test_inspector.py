@@ -0,0 +1,353 @@
+import pytest
+from unittest.mock import Mock, MagicMock
+from functools import partial
+
+import numpy as np
+import defdap.hrdic as hrdic
+from defdap.inspector import (GrainInspector, SlipLineStore, rdrSamplePoints,
+                              calcGrainRDR, calcMapRDR)
+
+
+LEGACY_FILE = """# This is a file generated by defdap which contains definitions of slip lines drawn in grains by grainInspector
+# [(x0, y0, x1, y1), angle, groupID]
+# and groups of lines, defined by an average angle and identified sip plane
+# [groupID, angle, [slip plane id], [angular deviation]
+
+Grain 3
+2 Lines
+[[1.0, 2.0, 3.0, 4.0], 45.0, 0]
+[[5.0, 6.0, 7.5, 8.0], 120.5, 1]
+2 Groups
+[0, 45.0, [1, 3], [0.5, -1.2], 0.3]
+[1, 120.5, [], [], 0]
+
+Grain 7
+1 Lines
+[[0.0, 0.0, 1.0, 1.0], 10.0, 0]
+1 Groups
+[0, 10.0, [2], [1.0], 0]
+
+"""
+
+
+@pytest.fixture
+def grain_lines():
+    """Lines and groups of grains, keyed by grain ID."""
+    return {
+        7: ([[[0.0, 0.0, 1.0, 1.0], 10.0, 0]],
+            [[0, 10.0, [2], [1.0], 0.0]]),
+        3: ([[[1.0, 2.0, 3.0, 4.0], 45.0, 0],
+             [[5.0, 6.0, 7.5, 8.0], 120.5, 1]],
+            [[0, 45.0, [1, 3], [0.5, -1.2], 0.3],
+             [1, 120.5, [], [], 0.0]]),
+    }
+
+
+@pytest.fixture
+def store(grain_lines):
+    store = SlipLineStore()
+    for grain_id, (points_list, groups_list) in grain_lines.items():
+        store.setGrain(grain_id, points_list, groups_list)
+    return store
+
+
+@pytest.fixture
+def dic_map():
+    """Map of 2 grains with a horizontal slip line in grain 0 and a
+    vertical slip line in grain 1. Points above the horizontal line are
+    displaced by (1, 2) and points right of the vertical line by (3, 1).
+
+    """
+    y, x = np.mgrid[0:40, 0:40]
+    horizontal = (y > 10) & (x < 20)
+    vertical = (x > 30) & (y > 20)
+
+    mock_map = MagicMock(spec=hrdic.Map)
+    mock_map.x_map = np.where(horizontal, 1., 0.) + np.where(vertical, 3., 0.)
+    mock_map.y_map = np.where(horizontal, 2., 0.) + np.where(vertical, 1., 0.)
+    mock_map.crop.side_effect = lambda map_data, binned=True: map_data
+
+    grains = []
+    for extreme_coords, points_list, groups_list in [
+        ((0, 0, 19, 19), [[[3., 10., 15., 10.], 90.0, 0]],
+         [[0, 90.0, [], [], 0], [1, 45.0, [], [], 0]]),
+        ((20, 20, 39, 39), [[[10., 5., 10., 15.], 0.0, 0]],
+         [[0, 0.0, [], [], 0]]),
+    ]:
+        mock_grain = Mock(spec=hrdic.Grain)
+        mock_grain.grainID = len(grains)
+        mock_grain.extremeCoords = extreme_coords
+        mock_grain.pointsList = points_list
+        mock_grain.groupsList = groups_list
+        grains.append(mock_grain)
+
+    mock_map.__getitem__.side_effect = grains.__getitem__
+    mock_map.__len__.return_value = len(grains)
+
+    return mock_map
+
+
+class TestSlipLineStore:
+
+    @staticmethod
+    def test_set_grain(store, grain_lines):
+        assert len(store) == 3
+        assert np.array_equal(store.grainIDs, [3, 7])
+        assert np.array_equal(store.lines.grainID, [3, 3, 7])
+        assert np.array_equal(store.groups.grainID, [3, 3, 7])
+        assert np.array_equal(store.planes.grainID, [3, 3, 7])
+        assert np.array_equal(store.linesOf(3).angle, [45.0, 120.5])
+        assert np.array_equal(store.planesOf(3).plane, [1, 3])
+        assert len(store.linesOf(5)) == 0
+
+        for grain_id, lists in grain_lines.items():
+            assert store.grainLists(grain_id) == lists
+
+    @staticmethod
+    def test_replace_grain(store, grain_lines):
+        store.setGrain(3, [[[0.0, 1.0, 2.0, 3.0], 60.0, 0]],
+                       [[0, 60.0, [], [], 0.0]])
+        store.setGrain(7, [], [])
+
+        assert np.array_equal(store.grainIDs, [3])
+        assert store.grainLists(3) == ([[[0.0, 1.0, 2.0, 3.0], 60.0, 0]],
+                                       [[0, 60.0, [], [], 0.0]])
+        assert store.grainLists(7) == ([], [])
+
+    @staticmethod
+    def test_append_line(store):
+        store.appendLine(5, [1.0, 1.0, 2.0, 2.0], 30.0)
+        store.appendLine(3, [9.0, 9.0, 9.5, 9.5], 80.0, group=2)
+
+        assert np.array_equal(store.lines.grainID, [3, 3, 3, 5, 7])
+        assert store.linesOf(3)[-1].angle == 80.0
+        assert store.linesOf(3)[-1].group == 2
+        assert store.grainLists(5)[0] == [[[1.0, 1.0, 2.0, 2.0], 30.0, -1]]
+
+    @staticmethod
+    def test_edit_order(store):
+        # edits are merged in the order they are made
+        store.appendLine(7, [1.0, 1.0, 2.0, 2.0], 30.0)
+        store.setGrain(7, [[[0.0, 1.0, 2.0, 3.0], 60.0, 0]], [])
+        store.appendLine(7, [4.0, 4.0, 5.0, 5.0], 50.0)
+        store.appendLine(1, [4.0, 4.0, 5.0, 5.0], 20.0)
+
+        assert np.array_equal(store.lines.grainID, [1, 3, 3, 7, 7])
+        assert np.array_equal(store.linesOf(7).angle, [60.0, 50.0])
+        assert len(store.groupsOf(7)) == 0
+        assert len(store.planesOf(7)) == 0
+
+    @staticmethod
+    def test_save_load(store, grain_lines, tmp_path):
+        store.save("test.npz", tmp_path)
+        loaded_store = SlipLineStore.load("test.npz", tmp_path)
+
+        for name in ['lines', 'groups', 'planes']:
+            assert np.array_equal(getattr(loaded_store, name),
+                                  getattr(store, name))
+        for grain_id, lists in grain_lines.items():
+            assert loaded_store.grainLists(grain_id) == lists
+
+    @staticmethod
+    def test_from_text(grain_lines, tmp_path):
+        (tmp_path / "test.txt").write_text(LEGACY_FILE)
+        store = SlipLineStore.load("test.txt", tmp_path)
+
+        assert np.array_equal(store.grainIDs, [3, 7])
+        for grain_id, lists in grain_lines.items():
+            assert store.grainLists(grain_id) == lists
+
+    @staticmethod
+    def test_to_text(store, grain_lines, tmp_path):
+        store.toText(tmp_path / "test.txt")
+        loaded_store = SlipLineStore.fromText(tmp_path / "test.txt")
+
+        for grain_id, lists in grain_lines.items():
+            assert loaded_store.grainLists(grain_id) == lists
+
+    @staticmethod
+    def test_map(dic_map):
+        store = SlipLineStore.fromMap(dic_map)
+
+        assert np.array_equal(store.lines.grainID, [0, 1])
+        assert np.array_equal(store.groups.grainID, [0, 0, 1])
+
+        store.setGrain(1, [], [])
+        store.appendLine(0, [1.0, 1.0, 2.0, 2.0], 30.0)
+        store.applyToMap(dic_map)
+
+        assert len(dic_map[0].pointsList) == 2
+        assert len(dic_map[1].pointsList) == 1
+
+    @staticmethod
+    def test_calc_map_rdr(dic_map):
+        store = SlipLineStore.fromMap(dic_map)
+        calcMapRDR(dic_map, store=store)
+
+        assert store.groupsOf(0).rdr[0] == pytest.approx(0.5)
+        assert store.groupsOf(0).rdr[1] == 0
+        assert store.groupsOf(1).rdr[0] == pytest.approx(3)
+
+
+class TestGrainInspectorAnnotations:
+
+    @staticmethod
+    @pytest.fixture
+    def inspector(dic_map, tmp_path):
+        # grain IDs differ from the index of grains in the map
+        grains = [dic_map[0], dic_map[1]]
+        for i, grain in enumerate(grains):
+            grain.grainID = i + 1
+            grain.ebsdGrain = Mock(slipTraceAngles=np.deg2rad([0., 90.]))
+        dic_map.grainList = grains
+        dic_map.path = str(tmp_path) + "/"
+
+        mock_inspector = Mock(spec=GrainInspector)
+        mock_inspector.currMap = dic_map
+        mock_inspector.grainID = 0
+        mock_inspector.currDICGrain = dic_map[0]
+        mock_inspector.corrAngle = 0
+        mock_inspector.filename = "test_RDR.npz"
+        mock_inspector.annotations = SlipLineStore.fromMap(dic_map)
+        for method in ['saveLine', 'groupLines', 'storeLines', 'calcRDR',
+                       'saveFile', 'loadFile']:
+            setattr(mock_inspector, method,
+                    partial(getattr(GrainInspector, method), mock_inspector))
+
+        return mock_inspector
+
+    @staticmethod
+    def test_save_line(inspector, dic_map):
+        inspector.grainPlot = Mock(p1=[2., 3.], p2=[12., 3.])
+        inspector.saveLine(None, None)
+
+        assert len(dic_map[0].pointsList) == 2
+        assert inspector.annotations.grainLists(0) == (
+            dic_map[0].pointsList, dic_map[0].groupsList
+        )
+        assert len(inspector.annotations.linesOf(1)) == 1
+
+    @staticmethod
+    def test_calc_rdr(inspector, dic_map):
+        inspector.calcRDR(dic_map[1], 0, showPlot=False)
+
+        assert inspector.annotations.groupsOf(1).rdr[0] == pytest.approx(3)
+        assert inspector.annotations.groupsOf(0).rdr[0] == 0
+
+    @staticmethod
+    def test_save_load_file(inspector, dic_map):
+        inspector.grainPlot = Mock(p1=[2., 3.], p2=[12., 3.])
+        inspector.saveLine(None, None)
+        expected = [(grain.pointsList, grain.groupsList)
+                    for grain in dic_map.grainList]
+        inspector.saveFile(None, None)
+
+        for grain in dic_map.grainList:
+            grain.pointsList = []
+            grain.groupsList = []
+        inspector.loadFile(None, None)
+
+        for grain, lists in zip(dic_map.grainList, expected):
+            assert (grain.pointsList, grain.groupsList) == lists
+
+    @staticmethod
+    def test_load_text_file(inspector, dic_map, tmp_path):
+        # files written by previous versions are found with the new name
+        inspector.annotations.toText(tmp_path / "test_RDR.txt")
+        expected = [(grain.pointsList, grain.groupsList)
+                    for grain in dic_map.grainList]
+
+        for grain in dic_map.grainList:
+            grain.pointsList = []
+            grain.groupsList = []
+        inspector.loadFile(None, None)
+
+        for grain, lists in zip(dic_map.grainList, expected):
+            assert (grain.pointsList, grain.groupsList) == lists
+
+
+class TestRdrSamplePoints:
+
+    @staticmethod
+    def test_horizontal():
+        x, y = rdrSamplePoints([3., 10., 15., 10.])
+
+        assert x.shape == (13, 3)
+        assert np.array_equal(x, np.repeat(np.arange(3, 16)[:, None], 3, 1))
+        assert np.array_equal(y, np.tile([8, 10, 12], (13, 1)))
+
+    @staticmethod
+    def test_vertical():
+        x, y = rdrSamplePoints([10., 5., 10., 15.])
+
+        assert x.shape == (11, 3)
+        assert np.array_equal(x, np.tile([12, 10, 8], (11, 1)))
+        assert np.array_equal(y, np.repeat(np.arange(5, 16)[:, None], 3, 1))
+
+    @staticmethod
+    def test_diagonal():
+        x, y = rdrSamplePoints([0., 0., 10., 10.], length=8)
+
+        # perpendicular lines run along (1, -1)
+        assert np.all(np.diff(x, axis=1) == -np.diff(y, axis=1))
+        assert np.all(x + y == (x + y)[:, :1])
+
+
+class TestCalcGrainRDR:
+
+    @staticmethod
+    @pytest.mark.parametrize('grain_id, expected, num_lines',
+                             [(0, 0.5, 13), (1, 3., 11)])
+    def test_calc(dic_map, grain_id, expected, num_lines):
+        result = calcGrainRDR(dic_map, dic_map[grain_id], 0)
+
+        assert result['linRegResults'].slope == pytest.approx(expected)
+        assert result['linRegResults'].rvalue == pytest.approx(1)
+        assert len(result['u']) == len(result['v']) == num_lines * 3
+        assert len(result['x']) == len(result['y']) == num_lines
+        # displacements are centred on each perpendicular line
+        assert np.sum(result['u']) == pytest.approx(0)
+
+    @staticmethod
+    def test_given_maps(dic_map):
+        result = calcGrainRDR(dic_map, dic_map[0], 0,
+                              xMap=dic_map.x_map, yMap=dic_map.y_map)
+
+        assert result['linRegResults'].slope == pytest.approx(0.5)
+        dic_map.crop.assert_not_called()
+
+    @staticmethod
+    def test_no_lines(dic_map):
+        assert calcGrainRDR(dic_map, dic_map[0], 1) is None
+
+
+class TestCalcMapRDR:
+
+    @staticmethod
+    @pytest.mark.parametrize('num_workers', [1, 2])
+    def test_calc(dic_map, num_workers):
+        table = calcMapRDR(dic_map, numWorkers=num_workers)
+
+        assert list(table.columns) == ['grainID', 'group', 'angle', 'RDR',
+                                       'intercept', 'rValue', 'stdErr',
+                                       'numPoints']
+        assert table['grainID'].tolist() == [0, 0, 1]
+        assert table['group'].tolist() == [0, 1, 0]
+        assert table['angle'].tolist() == [90.0, 45.0, 0.0]
+        assert table['RDR'].tolist()[0] == pytest.approx(0.5)
+        assert table['RDR'].tolist()[2] == pytest.approx(3)
+        assert table['numPoints'].tolist() == [39, 0, 33]
+        # group with no lines
+        assert np.isnan(table['RDR'][1])
+
+        assert dic_map[0].groupsList[0][4] == pytest.approx(0.5)
+        assert dic_map[0].groupsList[1][4] == 0
+        assert dic_map[1].groupsList[0][4] == pytest.approx(3)
+        assert dic_map.crop.call_count == 2
+
+    @staticmethod
+    def test_grain_ids(dic_map):
+        table = calcMapRDR(dic_map, grainIds=[1])
+
+        assert table['grainID'].tolist() == [1]
+        assert dic_map[0].groupsList[0][4] == 0
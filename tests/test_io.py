@@ -2,6 +2,9 @@ import pytest
 import numpy as np
 
 import defdap.file_readers
+import defdap.file_writers
+import defdap.ebsd
+import defdap.quat
 from defdap.crystal import crystalStructures, Phase
 
 DATA_DIR = "tests/data/"
@@ -90,12 +93,176 @@ class TestEBSDDataLoader:
         assert metadata_loaded_oxford_binary.loadedData['eulerAngle'].shape == (3, y_dim, x_dim)
         assert isinstance(metadata_loaded_oxford_binary.loadedData['eulerAngle'][0, 0, 0], np.float64)
 
+    @staticmethod
+    def test_load_oxford_crc_memmap(metadata_loaded_oxford_binary):
+        full_loader = defdap.file_readers.OxfordBinaryLoader()
+        full_loader.load(EXAMPLE_EBSD)
+
+        metadata_loaded_oxford_binary.loadOxfordCRC(EXAMPLE_EBSD, memmap=True)
+        loaded_data = metadata_loaded_oxford_binary.loadedData
+
+        assert isinstance(loaded_data['eulerAngle'].base, np.ndarray)
+        assert loaded_data['eulerAngle'].dtype == np.float32
+        assert not loaded_data['phase'].flags.writeable
+        for key in ['phase', 'bandContrast', 'eulerAngle']:
+            assert np.array_equal(loaded_data[key],
+                                  full_loader.loadedData[key])
+
+    @staticmethod
+    @pytest.mark.parametrize('memmap', [False, True])
+    def test_load_oxford_crc_roi(metadata_loaded_oxford_binary, memmap):
+        full_loader = defdap.file_readers.OxfordBinaryLoader()
+        full_loader.load(EXAMPLE_EBSD)
+
+        metadata_loaded_oxford_binary.loadOxfordCRC(
+            EXAMPLE_EBSD, memmap=memmap, roi=(10, 20, 110, 70)
+        )
+        metadata = metadata_loaded_oxford_binary.loadedMetadata
+        loaded_data = metadata_loaded_oxford_binary.loadedData
+
+        assert metadata["xDim"] == 100
+        assert metadata["yDim"] == 50
+        for key in ['phase', 'bandContrast', 'eulerAngle']:
+            assert np.array_equal(
+                loaded_data[key],
+                full_loader.loadedData[key][..., 20:70, 10:110]
+            )
+
+    @staticmethod
+    def test_load_oxford_crc_roi_bad(metadata_loaded_oxford_binary):
+        with pytest.raises(ValueError):
+            metadata_loaded_oxford_binary.loadOxfordCRC(
+                EXAMPLE_EBSD, roi=(0, 0, 1000, 10)
+            )
+
+    @staticmethod
+    def test_load_defdap_bad(tmp_path):
+        data_loader = defdap.file_readers.DefdapLoader()
+        with pytest.raises(FileNotFoundError):
+            data_loader.load("badger", fileDir=tmp_path)
+
+        np.savez(tmp_path / "not_defdap.npz", phase=np.zeros((2, 2)))
+        with pytest.raises(TypeError):
+            data_loader.load("not_defdap", fileDir=tmp_path)
+
     @staticmethod
     def test_load_oxford_crc_bad(metadata_loaded_oxford_binary):
         with pytest.raises(FileNotFoundError):
             metadata_loaded_oxford_binary.loadOxfordCRC("badger")
 
 
+    @staticmethod
+    @pytest.mark.parametrize('chunk_size', [None, 1000])
+    def test_load_oxford_ctf(tmp_path, chunk_size):
+        binary_loader = defdap.file_readers.OxfordBinaryLoader()
+        binary_loader.load(EXAMPLE_EBSD)
+        ebsd_map = defdap.ebsd.Map(EXAMPLE_EBSD)
+        ebsd_map.buildQuatArray()
+        ebsd_map.save("test", file_dir=tmp_path)
+
+        data_loader = defdap.file_readers.OxfordTextLoader()
+        data_loader.load("test", fileDir=tmp_path, chunkSize=chunk_size)
+        metadata = data_loader.loadedMetadata
+        loaded_data = data_loader.loadedData
+
+        assert metadata["xDim"] == 359
+        assert metadata["yDim"] == 243
+        assert metadata["stepSize"] == pytest.approx(0.12)
+        assert loaded_data['phase'].dtype == np.uint8
+        assert np.array_equal(loaded_data['phase'],
+                              binary_loader.loadedData['phase'])
+        assert np.array_equal(loaded_data['bandContrast'],
+                              binary_loader.loadedData['bandContrast'])
+        assert loaded_data['eulerAngle'].shape == (3, 243, 359)
+        assert loaded_data['eulerAngle'].dtype == np.float64
+
+        # compare orientations as Euler angles are not unique
+        loaded_quats = defdap.quat.QuatArray.fromEulerAngles(
+            loaded_data['eulerAngle']
+        )
+        dots = np.abs(np.einsum('i...,i...->...', loaded_quats.quatCoef,
+                                ebsd_map.quatArray.quatCoef))
+        assert dots == pytest.approx(1, abs=1e-6)
+
+
+class TestEBSDDataWriter:
+
+    @staticmethod
+    @pytest.fixture(scope="class")
+    def ebsd_map():
+        ebsd_map = defdap.ebsd.Map(EXAMPLE_EBSD)
+        ebsd_map.buildQuatArray()
+        return ebsd_map
+
+    @staticmethod
+    def test_write_oxford_ctf_columns(ebsd_map, tmp_path):
+        ebsd_map.save("test", file_dir=tmp_path)
+
+        data_loader = defdap.file_readers.OxfordTextLoader()
+        data_loader.load("test", fileDir=tmp_path)
+        loaded_data = data_loader.loadedData
+
+        assert np.array_equal(loaded_data['bandSlope'],
+                              ebsd_map.bandSlopeArray)
+        assert np.array_equal(loaded_data['numBands'],
+                              ebsd_map.numBandsArray)
+        assert loaded_data['meanAngularDeviation'] == pytest.approx(
+            ebsd_map.meanAngularDeviationArray, abs=1e-4
+        )
+
+    @staticmethod
+    def test_write_oxford_ctf_chunked(ebsd_map, tmp_path):
+        for name, chunk_size in [("whole", None), ("chunked", 1000)]:
+            data_writer = defdap.file_writers.OxfordTextWriter()
+            data_writer.metadata['shape'] = ebsd_map.shape
+            data_writer.metadata['step_size'] = ebsd_map.stepSize
+            data_writer.metadata['phases'] = ebsd_map.phases
+            data_writer.data['phase'] = ebsd_map.phaseArray
+            data_writer.data['quat'] = ebsd_map.quatArray
+            data_writer.data['band_contrast'] = ebsd_map.bandContrastArray
+            data_writer.write(name, file_dir=tmp_path, chunk_size=chunk_size)
+
+        whole = (tmp_path / "whole.ctf").read_text()
+        assert whole == (tmp_path / "chunked.ctf").read_text()
+
+        # missing columns are written as constants
+        first_row = whole.splitlines()[-ebsd_map.xDim * ebsd_map.yDim]
+        assert first_row.split('\t')[3] == '10'
+        assert first_row.split('\t')[-3:-1] == ['0.0000', str(
+            ebsd_map.bandContrastArray[0, 0]
+        )]
+        assert first_row.split('\t')[-1] == '0'
+
+    @staticmethod
+    def test_write_oxford_ctf_exists(ebsd_map, tmp_path):
+        ebsd_map.save("test", file_dir=tmp_path)
+        with pytest.raises(FileExistsError):
+            ebsd_map.save("test", file_dir=tmp_path)
+
+    @staticmethod
+    def test_write_defdap_lazy_read(tmp_path):
+        data_writer = defdap.file_writers.DefdapWriter()
+        data_writer.metadata['mapType'] = 'test'
+        data_writer.metadata['format'] = 'DaVis'
+        data_writer.data['first'] = np.arange(10)
+        data_writer.data['second'] = np.ones((3, 3))
+        data_writer.data['missing'] = None
+        data_writer.write("test", file_dir=tmp_path)
+
+        metadata, archive = defdap.file_readers.openDefdapFile(
+            tmp_path / "test.npz"
+        )
+        with archive:
+            assert metadata['mapType'] == 'test'
+            assert metadata['file_format'] == 'DefDAP'
+            assert metadata['format'] == 'DaVis'
+            assert sorted(archive.files) == ['first', 'metadata', 'second']
+            assert np.array_equal(archive['first'], np.arange(10))
+
+        with pytest.raises(FileExistsError):
+            data_writer.write("test", file_dir=tmp_path)
+
+
 class TestDICDataLoader:
 
     @staticmethod
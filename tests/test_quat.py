@@ -3,7 +3,7 @@ from pytest import approx
 from pytest_cases import parametrize, parametrize_with_cases
 
 import numpy as np
-from defdap.quat import Quat
+from defdap.quat import Quat, QuatArray
 
 
 # Initialisation tests
@@ -594,9 +594,207 @@ class TestSymEqv:
                     in zip(syms, outs[0])])
 
 
+# Test QuatArray
 
 
+@pytest.fixture
+def quat_array(single_quat, single_quat2) -> QuatArray:
+    """2x3 array of orientations."""
+    quatCoef = np.stack([single_quat.quatCoef, single_quat2.quatCoef,
+                         single_quat.conjugate.quatCoef] * 2, axis=1)
+    return QuatArray(quatCoef.reshape(4, 2, 3))
+
+
+class TestQuatArrayInit:
+
+    @staticmethod
+    def test_shape(quat_array):
+        assert quat_array.shape == (2, 3)
+        assert quat_array.ndim == 2
+        assert quat_array.size == 6
+        assert len(quat_array) == 2
+
+    @staticmethod
+    def test_flip_to_northern_hemisphere():
+        quats = QuatArray(np.array([[-1, 0.5], [0, 0.5], [0, 0.5], [0, 0.5]]))
+
+        assert np.allclose(quats.quatCoef, [[1, 0.5], [0, 0.5],
+                                            [0, 0.5], [0, 0.5]])
+
+    @staticmethod
+    def test_bad_shape():
+        with pytest.raises(TypeError):
+            QuatArray(np.zeros((3, 5)))
+
+    @staticmethod
+    def test_create_many_quats():
+        eulers = np.deg2rad([[20, 110], [10, 70], [40, 160]])
+        quats = Quat.createManyQuats(eulers)
+
+        assert type(quats) is QuatArray
+        assert quats.shape == (2,)
+        assert np.allclose(quats[1].quatCoef,
+                           Quat.fromEulerAngles(*eulers[:, 1]).quatCoef)
+
+
+class TestQuatArrayGetSetitem:
+
+    @staticmethod
+    def test_item_is_view(quat_array, single_quat2):
+        quat = quat_array[0, 1]
+
+        assert type(quat) is Quat
+        assert np.allclose(quat.quatCoef, single_quat2.quatCoef)
+        assert np.shares_memory(quat.quatCoef, quat_array.quatCoef)
+
+    @staticmethod
+    def test_slice(quat_array):
+        result = quat_array[:, 1:]
+
+        assert type(result) is QuatArray
+        assert result.shape == (2, 2)
+
+    @staticmethod
+    def test_mask(quat_array):
+        mask = np.array([[True, False, True], [False, False, True]])
+        result = quat_array[mask]
+
+        assert type(result) is QuatArray
+        assert result.shape == (3,)
+        assert len(Quat.extract_quat_comps(result)[0]) == 3
+
+    @staticmethod
+    def test_setitem(quat_array, single_quat):
+        quat_array[1, :] = single_quat
+
+        assert np.allclose(quat_array.quatCoef[:, 1, 2],
+                           single_quat.quatCoef)
+
+
+class TestQuatArrayOperations:
+
+    @staticmethod
+    def test_mul(quat_array, single_quat2):
+        result = quat_array * single_quat2
+
+        assert type(result) is QuatArray
+        for idx in np.ndindex(quat_array.shape):
+            expected = quat_array[idx] * single_quat2
+            assert np.allclose(result[idx].quatCoef, expected.quatCoef)
+
+    @staticmethod
+    def test_left_mul(quat_array, single_quat2):
+        result = single_quat2 * quat_array
+
+        assert type(result) is QuatArray
+        for idx in np.ndindex(quat_array.shape):
+            expected = single_quat2 * quat_array[idx]
+            assert np.allclose(result[idx].quatCoef, expected.quatCoef)
+
+    @staticmethod
+    def test_conjugate_dot_norm(quat_array, single_quat):
+        assert np.allclose(quat_array.conjugate.quatCoef[1:],
+                           -quat_array.quatCoef[1:])
+        assert np.allclose(quat_array.norm(), 1)
+        assert quat_array.dot(single_quat)[0, 0] == approx(1)
+        assert np.allclose(quat_array.dot(quat_array), 1)
+
+    @staticmethod
+    def test_bad_in_type(quat_array):
+        with pytest.raises(TypeError):
+            quat_array * 4
+
+    @staticmethod
+    def test_calc_sym_eqvs(quat_array):
+        result = quat_array.flatten().calcSymEqvs('cubic')
+        expected = Quat.calcSymEqvs(quat_array.flatten().toQuatList(),
+                                    'cubic')
+
+        assert result.shape == (24, 4, 6)
+        assert np.allclose(result, expected)
+
+    @staticmethod
+    @pytest.mark.parametrize('symGroup', ['cubic', 'hexagonal'])
+    def test_mis_ori(quat_array, single_quat2, symGroup):
+        misOri, minQuatSym = quat_array.misOri(single_quat2, symGroup,
+                                               returnQuat=2)
+
+        assert misOri.shape == quat_array.shape
+        assert minQuatSym.shape == quat_array.shape
+        for idx in np.ndindex(quat_array.shape):
+            expMisOri, expQuatSym = quat_array[idx].misOri(
+                single_quat2, symGroup, returnQuat=2
+            )
+            assert misOri[idx] == approx(expMisOri)
+            assert np.allclose(minQuatSym[idx].quatCoef,
+                               expQuatSym.quatCoef)
+
+    @staticmethod
+    def test_mis_ori_sym_idx(quat_array, single_quat2):
+        misOri, symIdx = quat_array.misOriSymIdx(single_quat2, 'cubic')
+        symEqv = QuatArray(
+            np.broadcast_to(single_quat2.quatCoef[:, None, None], (4, 2, 3))
+        ).applySym('cubic', symIdx)
+
+        assert symIdx.shape == quat_array.shape
+        assert np.allclose(np.abs(quat_array.dot(symEqv)), misOri)
+
+
+class TestQuatArrayConversions:
+
+    @staticmethod
+    @pytest.fixture
+    def gimbal_quat_array(quat_array) -> QuatArray:
+        """Orientations including both gimbal lock cases."""
+        quatCoef = np.concatenate([
+            quat_array.quatCoef.reshape(4, -1),
+            np.array([[np.cos(0.3), 0, 0, np.sin(0.3)],
+                      [0, np.cos(0.4), np.sin(0.4), 0],
+                      [1, 0, 0, 0]]).T
+        ], axis=1)
+        return QuatArray(quatCoef)
+
+    @staticmethod
+    def test_euler_angles(gimbal_quat_array):
+        result = gimbal_quat_array.eulerAngles()
+
+        assert result.shape == (3,) + gimbal_quat_array.shape
+        for i, quat in enumerate(gimbal_quat_array):
+            assert np.allclose(result[:, i], quat.eulerAngles())
+
+    @staticmethod
+    def test_from_euler_angles_round_trip(gimbal_quat_array):
+        result = QuatArray.fromEulerAngles(gimbal_quat_array.eulerAngles())
+
+        assert np.allclose(np.abs(result.dot(gimbal_quat_array)), 1)
+
+    @staticmethod
+    def test_rot_matrix(gimbal_quat_array):
+        result = gimbal_quat_array.rotMatrix()
+
+        assert result.shape == (3, 3) + gimbal_quat_array.shape
+        for i, quat in enumerate(gimbal_quat_array):
+            assert np.allclose(result[..., i], quat.rotMatrix())
+
+    @staticmethod
+    def test_from_axis_angle():
+        axes = np.array([[1, 0, 0], [1, 1, 0], [0, 0, 2]]).T
+        angles = np.array([0.1, np.pi / 2, np.pi])
+        result = QuatArray.fromAxisAngle(axes, angles)
+
+        for i in range(3):
+            expected = Quat.fromAxisAngle(axes[:, i], angles[i])
+            assert np.allclose(result[i].quatCoef, expected.quatCoef)
+
+    @staticmethod
+    def test_transform_vector(quat_array):
+        vector = np.array([0.3, -1., 2.])
+        result = quat_array.transformVector(vector)
 
+        assert result.shape == (3,) + quat_array.shape
+        for idx in np.ndindex(quat_array.shape):
+            assert np.allclose(result[(slice(None),) + idx],
+                               quat_array[idx].transformVector(vector))
 
 
 ''' Functions left to test
@@ -0,0 +1,296 @@
+import pytest
+from pytest import approx
+import numpy as np
+
+from defdap.utils import (tileSlices, labelConnected, removeSmallLabels,
+                          lazyAttribute, distanceTransform, labelStats,
+                          labelMap, LABEL_STATS)
+from defdap import base
+
+
+class TestTileSlices:
+
+    @staticmethod
+    def test_tiles():
+        result = list(tileSlices(10, 4, halo=2))
+
+        expected = [
+            (slice(0, 4), slice(0, 6), slice(0, 4)),
+            (slice(4, 8), slice(2, 10), slice(2, 6)),
+            (slice(8, 10), slice(6, 10), slice(2, 4)),
+        ]
+
+        assert result == expected
+
+    @staticmethod
+    def test_no_tile_size():
+        result = list(tileSlices(10))
+
+        assert result == [(slice(0, 10), slice(0, 10), slice(0, 10))]
+
+
+class TestLabelConnected:
+
+    @staticmethod
+    def test_mask():
+        mask = np.array([
+            [0, 1, 1, 0],
+            [0, 0, 1, 0],
+            [1, 0, 0, 1],
+            [1, 1, 0, 1],
+        ], dtype=bool)
+        labels, num_labels = labelConnected(mask)
+
+        expected = np.array([
+            [0, 1, 1, 0],
+            [0, 0, 1, 0],
+            [2, 0, 0, 3],
+            [2, 2, 0, 3],
+        ])
+
+        assert num_labels == 3
+        assert np.all(labels == expected)
+
+    @staticmethod
+    def test_boundaries():
+        mask = np.ones((3, 3), dtype=bool)
+        boundaries_x = np.zeros((3, 3), dtype=bool)
+        boundaries_x[:, 0] = True
+        boundaries_y = np.zeros((3, 3), dtype=bool)
+        boundaries_y[1, 1:] = True
+        labels, num_labels = labelConnected(mask, boundariesX=boundaries_x,
+                                            boundariesY=boundaries_y)
+
+        expected = np.array([
+            [1, 2, 2],
+            [1, 2, 2],
+            [1, 3, 3],
+        ])
+
+        assert num_labels == 3
+        assert np.all(labels == expected)
+
+
+    @staticmethod
+    @pytest.mark.parametrize('tile_size', [1, 2, 5])
+    def test_tiled(tile_size):
+        rng = np.random.default_rng(0)
+        mask = rng.random((12, 15)) < 0.7
+        boundaries_x = rng.random((12, 15)) < 0.2
+        boundaries_y = rng.random((12, 15)) < 0.2
+
+        expected, expected_num = labelConnected(
+            mask, boundariesX=boundaries_x, boundariesY=boundaries_y
+        )
+        labels, num_labels = labelConnected(
+            mask, boundariesX=boundaries_x, boundariesY=boundaries_y,
+            tileSize=tile_size
+        )
+
+        assert num_labels == expected_num
+        assert np.all(labels == expected)
+
+    @staticmethod
+    def test_tiled_seam():
+        # region split by the seam between tiles and joined below
+        mask = np.array([
+            [1, 0, 1],
+            [1, 0, 1],
+            [1, 1, 1],
+        ], dtype=bool)
+        labels, num_labels = labelConnected(mask, tileSize=2)
+
+        assert num_labels == 1
+        assert np.all(labels[mask] == 1)
+
+
+class TestRemoveSmallLabels:
+
+    @staticmethod
+    def test_calc():
+        labels = np.array([
+            [1, 1, 0, 2],
+            [-1, 3, 3, 3],
+        ])
+        result, num_labels = removeSmallLabels(labels, 2)
+
+        expected = np.array([
+            [1, 1, 0, -2],
+            [-1, 2, 2, 2],
+        ])
+
+        assert num_labels == 2
+        assert np.all(result == expected)
+
+    @staticmethod
+    def test_no_labels():
+        labels = np.array([
+            [0, 0, -1],
+            [-1, 0, 0],
+        ])
+        result, num_labels = removeSmallLabels(labels, 10)
+
+        assert num_labels == 0
+        assert np.all(result == labels)
+
+
+class TestDistanceTransform:
+
+    @staticmethod
+    @pytest.mark.parametrize('half_offset', [False, True])
+    def test_calc(half_offset):
+        rng = np.random.default_rng(0)
+        points = rng.random((12, 9)) < 0.1
+        result, indices = distanceTransform(points, halfOffset=half_offset,
+                                            returnIndices=True)
+
+        offset = 0.5 if half_offset else 0
+        y_locs, x_locs = np.nonzero(points)
+        y, x = np.indices(points.shape)
+        distances = np.sqrt((y[..., None] - y_locs - offset)**2 +
+                            (x[..., None] - x_locs - offset)**2)
+
+        assert np.array_equal(result, distances.min(axis=-1))
+        assert np.all(points[indices[0], indices[1]])
+
+    @staticmethod
+    def test_no_points():
+        result = distanceTransform(np.zeros((3, 4), dtype=bool))
+
+        assert np.all(result == np.inf)
+
+
+class TestLazyAttribute:
+
+    class LazyMap(base.Map):
+        derivedAttributes = dict(base.Map.derivedAttributes,
+                                 stored=('doubled',))
+
+        def __init__(self):
+            super().__init__()
+            self.data = np.arange(3)
+            self.numCalcs = 0
+            self.stored = None
+
+        @lazyAttribute('data')
+        def doubled(self):
+            self.numCalcs += 1
+            return 2 * self.data
+
+        @lazyAttribute('doubled')
+        def quadrupled(self):
+            return 2 * self.doubled
+
+    @staticmethod
+    def test_calculated_once():
+        lazy_map = TestLazyAttribute.LazyMap()
+
+        assert np.all(lazy_map.quadrupled == [0, 4, 8])
+        assert np.all(lazy_map.doubled == [0, 2, 4])
+        assert lazy_map.numCalcs == 1
+
+    @staticmethod
+    def test_invalidate():
+        lazy_map = TestLazyAttribute.LazyMap()
+        lazy_map.quadrupled
+        lazy_map.stored = np.zeros(3)
+        lazy_map.data = np.ones(3)
+
+        assert np.all(lazy_map.quadrupled == 4)
+        assert lazy_map.numCalcs == 2
+        assert lazy_map.stored is None
+
+    @staticmethod
+    def test_set():
+        lazy_map = TestLazyAttribute.LazyMap()
+        lazy_map.doubled = np.zeros(3)
+
+        assert np.all(lazy_map.quadrupled == 0)
+        assert lazy_map.numCalcs == 0
+
+
+class TestLabelStats:
+
+    @staticmethod
+    @pytest.fixture
+    def labelled_data():
+        rng = np.random.default_rng(2)
+        labels = rng.integers(-1, 5, (20, 25))
+        # region 3 has no points
+        labels[labels == 3] = 0
+        data = rng.random((2, 20, 25))
+        data[0, 0, :6] = np.nan
+
+        return labels, data
+
+    @staticmethod
+    def test_calc(labelled_data):
+        labels, data = labelled_data
+        result = labelStats(labels, data, 4, stats=LABEL_STATS,
+                            percentiles=(10, 90))
+
+        assert result['mean'].shape == (4, 2)
+        assert result['percentile'].shape == (4, 2, 2)
+        for label in [1, 2, 4]:
+            for field in range(2):
+                values = data[field][labels == label]
+                values = values[~np.isnan(values)]
+                i = label - 1
+                assert result['count'][i, field] == len(values)
+                assert result['sum'][i, field] == approx(values.sum())
+                assert result['mean'][i, field] == approx(values.mean())
+                assert result['std'][i, field] == approx(values.std())
+                assert result['min'][i, field] == values.min()
+                assert result['max'][i, field] == values.max()
+                assert result['median'][i, field] == approx(np.median(values))
+                assert result['percentile'][i, :, field] == approx(
+                    np.percentile(values, [10, 90])
+                )
+        assert np.all(np.isnan(result['mean'][2]))
+        assert np.all(result['count'][2] == 0)
+
+    @staticmethod
+    def test_nan(labelled_data):
+        labels, data = labelled_data
+        result = labelStats(labels, data[0], 4, stats=('mean', 'max'),
+                            ignoreNan=False)
+
+        has_nan = [np.isnan(data[0][labels == label]).any()
+                   for label in range(1, 5)]
+        assert np.array_equal(np.isnan(result['mean']),
+                              np.array(has_nan) | [False, False, True, False])
+
+    @staticmethod
+    def test_weights(labelled_data):
+        labels, data = labelled_data
+        weights = data[1]
+        result = labelStats(labels, data[0], 4, stats=('mean',),
+                            weights=weights)
+
+        in_label = (labels == 1) & ~np.isnan(data[0])
+        assert result['mean'][0] == approx(
+            np.average(data[0][in_label], weights=weights[in_label])
+        )
+
+    @staticmethod
+    def test_bad_stat(labelled_data):
+        with pytest.raises(ValueError):
+            labelStats(*labelled_data, 4, stats=('mode',))
+
+
+class TestLabelMap:
+
+    @staticmethod
+    def test_calc():
+        labels = np.array([
+            [1, 1, 0, 2],
+            [-1, 3, 3, 2],
+        ])
+        result = labelMap(labels, np.array([10, 20, 30]), bg=-5)
+
+        expected = np.array([
+            [10, 10, -5, 20],
+            [-5, 30, 30, 20],
+        ])
+
+        assert np.all(result == expected)